@@ -3,30 +3,218 @@ Structure Analysis Engine - AI-enhanced structure modeling
 Integrated from uncomment project with improvements
 """
 import re
+from collections.abc import MutableMapping
 from typing import Dict, Any, Optional, List
 from common.handler.trace_handler import TraceHandler
 from common.handler.path_handler import PathHandler
 
 
+class _Codebook:
+    """Codes of the values of one categorical metadata field, unknown values get the next code.
+
+    Values are told apart by type too, so 1, 1.0 and True get codes of their own.
+    """
+
+    __slots__ = ('values', 'codes')
+
+    def __init__(self, *values):
+        self.values = list(values)
+        self.codes = {(type(value), value): code for code, value in enumerate(values)}
+
+    def code(self, value) -> Optional[int]:
+        """Code of value, None if it is unhashable or the codebook is full."""
+        try:
+            code = self.codes.get((type(value), value))
+        except TypeError:
+            return None
+        if code is None and len(self.values) < _EXTRA_CODE:
+            code = self.codes[(type(value), value)] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+# Codes are 8 bits per field, the last code marks a value kept in the node's extra metadata
+_EXTRA_CODE = 255
+_CODED_FIELDS = {
+    "source": (0, _Codebook(None, "helm", "flat_json", "json_params", "both")),
+    "origin": (8, _Codebook("inferred", "parameter_definition", "parameter_tree", "directory_tree", "path_structure")),
+    "data_type": (16, _Codebook("unknown", "str", "int", "float", "bool", "dict", "list", "NoneType", "string")),
+    "mandatory": (24, _Codebook("no", "yes")),
+    "is_array_element": (32, _Codebook(False, True))
+}
+# Packed codes in use, nodes with the same codes share one int
+_PACKED_CODES: Dict[int, int] = {}
+_METADATA_FIELDS = ("source", "origin", "data_type", "mandatory", "depth", "description",
+                    "is_array_element", "confidence", "usage_count")
+
+
 class StructureNode:
-    """Enhanced structure node with metadata"""
+    """Enhanced structure node with metadata
+
+    Fields live in slots. source, origin, data_type, mandatory and
+    is_array_element are codes of their codebook, packed into one int.
+    metadata is a dict-like view of the fields, children a dict allocated
+    with the first child.
+    """
+
+    __slots__ = ('name', 'node_type', 'depth', '_children', '_codes', 'description', 'confidence',
+                 'usage_count', '_extra')
 
     def __init__(self, name: str, node_type: str = "key", depth: int = 0):
         self.name = name
         self.node_type = node_type  # 'object', 'array', 'string', 'boolean', etc.
         self.depth = depth
-        self.children: Dict[str, 'StructureNode'] = {}
-        self.metadata = {
-            "source": None,          # 'helm', 'json_params', 'both'
-            "origin": "inferred",    # 'parameter_tree', 'directory_tree', 'path_structure'
-            "data_type": "unknown",  # 'string', 'integer', etc.
-            "mandatory": "no",
-            "depth": depth,
-            "description": None,
-            "is_array_element": False,
-            "confidence": 1.0,       # AI confidence score
-            "usage_count": 0         # How often this path is referenced
-        }
+        self._children: Optional[Dict[str, 'StructureNode']] = None
+        self._codes = 0             # source None, origin 'inferred', data_type 'unknown', mandatory 'no', not in a list
+        self.description = None
+        self.confidence = 1.0       # AI confidence score
+        self.usage_count = 0        # How often this path is referenced
+        self._extra: Optional[Dict[str, Any]] = None
+
+    @property
+    def children(self) -> Dict[str, 'StructureNode']:
+        if self._children is None:
+            return _NoChildren(self)
+        return self._children
+
+    @children.setter
+    def children(self, children: Dict[str, 'StructureNode']):
+        self._children = children or None
+
+    @property
+    def metadata(self) -> 'NodeMetadata':
+        return NodeMetadata(self)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Codes depend on the order values were first seen in, pickles keep the values
+        state = {slot: getattr(self, slot) for slot in self.__slots__ if slot != '_codes'}
+        state.update((field, getattr(self, field)) for field in _CODED_FIELDS)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self._codes = 0
+        for key, value in state.items():
+            setattr(self, key, value)
+
+    def _pack(self, codes: int):
+        if codes != self._codes:
+            self._codes = _PACKED_CODES.setdefault(codes, codes)
+
+
+def _coded_field(field: str) -> property:
+    """Property of a coded metadata field of StructureNode."""
+    shift, codebook = _CODED_FIELDS[field]
+    values, codes, mask = codebook.values, codebook.codes, ~(0xFF << shift)
+
+    def get(node: StructureNode):
+        code = node._codes >> shift & 0xFF
+        return values[code] if code != _EXTRA_CODE else node._extra[field]
+
+    def set(node: StructureNode, value):
+        try:
+            code = codes.get((type(value), value))
+        except TypeError:
+            code = None
+        if code is None:
+            code = codebook.code(value)
+            if code is None:
+                code = _EXTRA_CODE
+                if node._extra is None:
+                    node._extra = {}
+                node._extra[field] = value
+        if code != _EXTRA_CODE and node._extra is not None:
+            node._extra.pop(field, None)
+        node._pack(node._codes & mask | code << shift)
+
+    return property(get, set)
+
+
+for _field in _CODED_FIELDS:
+    setattr(StructureNode, _field, _coded_field(_field))
+del _field
+
+
+class _NoChildren(MutableMapping):
+    """children of a node without any, the first child added allocates the node's dict."""
+
+    __slots__ = ('_node',)
+
+    def __init__(self, node: StructureNode):
+        self._node = node
+
+    def _dict(self) -> Dict[str, StructureNode]:
+        return self._node._children or {}
+
+    def __getitem__(self, name):
+        return self._dict()[name]
+
+    def __setitem__(self, name, child: StructureNode):
+        if self._node._children is None:
+            self._node._children = {}
+        self._node._children[name] = child
+
+    def __delitem__(self, name):
+        del self._dict()[name]
+
+    def __contains__(self, name) -> bool:
+        return name in self._dict()
+
+    def __iter__(self):
+        return iter(self._dict())
+
+    def __len__(self) -> int:
+        return len(self._dict())
+
+
+class NodeMetadata(MutableMapping):
+    """The metadata dict of a StructureNode as a view of its fields.
+
+    Keys other than the node's metadata fields are kept in its extra
+    metadata; the fields themselves cannot be deleted.
+    """
+
+    __slots__ = ('_node',)
+
+    def __init__(self, node: StructureNode):
+        self._node = node
+
+    def __getitem__(self, key):
+        if key in _METADATA_FIELDS:
+            return getattr(self._node, key)
+        extra = self._node._extra
+        if extra is None or key in _CODED_FIELDS or key not in extra:
+            raise KeyError(key)
+        return extra[key]
+
+    def __setitem__(self, key, value):
+        if key in _METADATA_FIELDS:
+            setattr(self._node, key, value)
+            return
+        if self._node._extra is None:
+            self._node._extra = {}
+        self._node._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _METADATA_FIELDS:
+            raise TypeError(f"Metadata field {key!r} of a structure node cannot be deleted")
+        extra = self._node._extra
+        if extra is None or key in _CODED_FIELDS or key not in extra:
+            raise KeyError(key)
+        del extra[key]
+
+    def __iter__(self):
+        yield from _METADATA_FIELDS
+        if self._node._extra:
+            yield from (key for key in self._node._extra if key not in _CODED_FIELDS)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+    def copy(self) -> Dict[str, Any]:
+        return dict(self)
 
 
 class StructureAnalysisEngine:
@@ -86,10 +274,10 @@ class StructureAnalysisEngine:
                 current = current.children[token]
 
                 # Update metadata
-                if current.metadata["source"] is None:
-                    current.metadata["source"] = "json_params"
-                elif current.metadata["source"] != "json_params":
-                    current.metadata["source"] = "both"
+                if current.source is None:
+                    current.source = "json_params"
+                elif current.source != "json_params":
+                    current.source = "both"
 
                 # Leaf node gets full parameter metadata
                 if is_leaf:
@@ -111,7 +299,7 @@ class StructureAnalysisEngine:
             # Direct match
             if token in current.children:
                 current = current.children[token]
-                current.metadata["usage_count"] += 1
+                current.usage_count += 1
 
             # Array element match
             elif "[N]" in current.children:
@@ -133,8 +321,8 @@ class StructureAnalysisEngine:
                     return None
 
         # Update confidence if it changed
-        if confidence < current.metadata["confidence"]:
-            current.metadata["confidence"] = confidence
+        if confidence < current.confidence:
+            current.confidence = confidence
             self.stats["confidence_adjustments"] += 1
 
         return current
@@ -147,14 +335,14 @@ class StructureAnalysisEngine:
         if isinstance(data, dict):
             for key, value in data.items():
                 node = self._get_or_create_node(parent_node, key, "key", depth)
-                node.metadata["source"] = source
-                node.metadata["data_type"] = type(value).__name__
+                node.source = source
+                node.data_type = type(value).__name__
                 self._ingest_dict(value, node, depth + 1, source=source)
 
         elif isinstance(data, list):
             node = self._get_or_create_node(parent_node, "[N]", "index", depth)
-            node.metadata["is_array_element"] = True
-            node.metadata["source"] = source
+            node.is_array_element = True
+            node.source = source
             if data:
                 self._ingest_dict(data[0], node, depth + 1, source=source)
 
@@ -173,14 +361,14 @@ class StructureAnalysisEngine:
             current = self._get_or_create_node(current, token_val, token_type, i)
 
             # Update source metadata
-            if current.metadata["source"] == "helm":
-                current.metadata["source"] = "both"
-            elif current.metadata["source"] is None:
-                current.metadata["source"] = source
+            if current.source == "helm":
+                current.source = "both"
+            elif current.source is None:
+                current.source = source
 
             # Set data type for leaf nodes
             if i == len(tokens) - 1:
-                current.metadata["data_type"] = type(value).__name__
+                current.data_type = type(value).__name__
 
     def _tokenize_complex_path(self, path: str) -> List[str]:
         """Enhanced path tokenization with AI assistance"""
@@ -267,7 +455,6 @@ class StructureAnalysisEngine:
         """Get existing node or create new one"""
         if name not in parent.children:
             new_node = StructureNode(name, node_type, depth)
-            new_node.metadata["depth"] = depth
             parent.children[name] = new_node
             self.stats["nodes_created"] += 1
             return new_node
@@ -287,8 +474,8 @@ class StructureAnalysisEngine:
         """Analyze usage patterns to adjust confidence scores"""
         def analyze_node(node: StructureNode):
             # Nodes with higher usage get higher confidence
-            if node.metadata["usage_count"] > 5:
-                node.metadata["confidence"] = min(1.0, node.metadata["confidence"] + 0.1)
+            if node.usage_count > 5:
+                node.confidence = min(1.0, node.confidence + 0.1)
 
             # Recurse to children
             for child in node.children.values():
@@ -318,7 +505,7 @@ class StructureAnalysisEngine:
         items = {}
         for name, child_node in node.children.items():
             new_path = f"{parent_path}.{name}" if parent_path else name
-            items[new_path] = child_node.metadata.get("source", "unknown")
+            items[new_path] = child_node.source
             items.update(self._flatten_node(child_node, new_path))
         return items
 
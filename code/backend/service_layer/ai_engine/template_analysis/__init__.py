@@ -3,8 +3,11 @@ Template Analysis Engine - AI-enhanced template processing
 """
 
 from .template_analysis_engine import TemplateAnalysisEngine, TemplateLine
+from .line_classifier import LineClassifier, default_line_classifier
 
 __all__ = [
     'TemplateAnalysisEngine',
-    'TemplateLine'
+    'TemplateLine',
+    'LineClassifier',
+    'default_line_classifier'
 ]
\ No newline at end of file
@@ -0,0 +1,170 @@
+"""
+Line Classifier - Trained classifier backend of the template analysis
+Decision tree over the columnar line features, trained on templates and their manually fixed gold files
+"""
+import difflib
+import glob
+import logging
+import os
+import pickle
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from common.handler.trace_handler import TraceHandler
+from common.handler.path_handler import PathHandler
+from backend.service_layer.ai_engine.structure_analysis.structure_analysis_engine import StructureAnalysisEngine
+from backend.service_layer.ai_engine.template_analysis.template_analysis_engine import (
+    TemplateAnalysisEngine, EMPTY, ACTIVE_DATA, INACTIVE_DATA, DOCUMENTATION, CONSTRAINT)
+
+try:
+    from sklearn.tree import DecisionTreeClassifier
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+MODEL_FORMAT = 1
+
+# Columns of the feature matrix, the ai_features of the per-line analysis
+FEATURES = ("has_comment", "has_colon", "has_helm_template", "is_list_item", "line_length", "word_count",
+            "has_quotes", "has_brackets", "indent_ratio", "uppercase_ratio", "has_constraint_words",
+            "has_doc_indicators", "has_technical_terms")
+
+# Gold files are named <template>_uncommented-by-<tool>_fixed-manually.yaml
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), *[os.pardir] * 5, 'data'))
+GOLD_SUFFIX = "_fixed-manually.yaml"
+GOLD_MARKER = "_uncommented-by-"
+
+logger = logging.getLogger(__name__)
+
+
+class LineClassifier:
+    """Classification codes and confidences of all lines of a template from one predict_proba call.
+
+    The model sees the feature columns of the columnar analysis as one
+    matrix, a line's confidence is the probability of the class it gets.
+    Empty lines stay EMPTY with confidence 1.0, as with the rules.
+    """
+
+    def __init__(self, model, features: Sequence[str] = FEATURES):
+        self.model = model
+        self.features = tuple(features)
+        self.classes = np.asarray(model.classes_, dtype=np.int8)
+
+    def feature_matrix(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        return np.column_stack([columns[name] for name in self.features]).astype(np.float64)
+
+    def classify(self, columns: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """(classification codes, confidence) of the lines of the feature columns"""
+        empty = columns["is_empty"]
+        classification = np.full(len(empty), EMPTY, dtype=np.int8)
+        confidence = np.ones(len(empty))
+        rows = np.flatnonzero(~empty)
+        if len(rows):
+            probabilities = self.model.predict_proba(self.feature_matrix(columns)[rows])
+            best = probabilities.argmax(axis=1)
+            classification[rows] = self.classes[best]
+            confidence[rows] = probabilities[np.arange(len(rows)), best]
+        return classification, confidence
+
+    @classmethod
+    def train(cls, pairs: List[Tuple[str, str]], max_depth: int = 8, min_samples_leaf: int = 3) -> "LineClassifier":
+        """Decision tree trained on (template path, gold path) pairs"""
+        if not SKLEARN_AVAILABLE:
+            raise ImportError("scikit-learn required")
+        matrices, labels = [], []
+        for template_path, gold_path in pairs:
+            columns, codes = training_data(_read_lines(template_path), _read_lines(gold_path))
+            rows = codes != EMPTY
+            matrices.append(np.column_stack([columns[name] for name in FEATURES]).astype(np.float64)[rows])
+            labels.append(codes[rows])
+        if not matrices or not sum(map(len, labels)):
+            raise ValueError("No template lines to train the line classifier on")
+        model = DecisionTreeClassifier(max_depth=max_depth, min_samples_leaf=min_samples_leaf, random_state=0)
+        model.fit(np.concatenate(matrices), np.concatenate(labels))
+        return cls(model)
+
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            pickle.dump({"format": MODEL_FORMAT, "features": self.features, "model": self.model}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str) -> "LineClassifier":
+        with open(path, 'rb') as f:
+            stored = pickle.load(f)
+        if not isinstance(stored, dict) or stored.get("format") != MODEL_FORMAT:
+            raise ValueError(f"Not a line classifier model: {path}")
+        return cls(stored["model"], stored["features"])
+
+
+def gold_pairs(data_dir: str = DATA_DIR) -> List[Tuple[str, str]]:
+    """(template, gold) pairs of the manually fixed gold files in data_dir"""
+    pairs = []
+    for gold_path in sorted(glob.glob(os.path.join(data_dir, '*' + GOLD_SUFFIX))):
+        name = os.path.basename(gold_path)
+        if GOLD_MARKER in name:
+            template_path = os.path.join(data_dir, name.split(GOLD_MARKER)[0] + '.yaml')
+            if os.path.exists(template_path):
+                pairs.append((template_path, gold_path))
+    return pairs
+
+
+def training_data(template_lines: List[str], gold_lines: List[str]) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """(feature columns, classification codes) of the template lines, labelled from the gold file
+
+    Uncommented lines are ACTIVE_DATA. A commented line is INACTIVE_DATA
+    if the gold file has it uncommented, otherwise CONSTRAINT if it has
+    constraint words and DOCUMENTATION if not.
+    """
+    tracer, path_handler = TraceHandler("AI_Platform", "1.0", "LineClassifier"), PathHandler()
+    engine = TemplateAnalysisEngine(tracer, path_handler, StructureAnalysisEngine(tracer, path_handler), columnar=True)
+    engine.process_template(template_lines)
+    if engine.columns is None:
+        raise ValueError("Template lines with line breaks inside cannot be labelled")
+    columns = engine.columns
+    commented = columns["starts_with_marker"]
+    codes = np.where(commented, np.where(columns["has_constraint_words"], CONSTRAINT, DOCUMENTATION), ACTIVE_DATA)
+    codes[_uncommented_in_gold(template_lines, gold_lines) & commented] = INACTIVE_DATA
+    codes[columns["is_empty"]] = EMPTY
+    return columns, codes.astype(np.int8)
+
+
+def _uncommented_in_gold(template_lines: List[str], gold_lines: List[str]) -> np.ndarray:
+    """Template lines matched, by their content after the hashes, to uncommented gold lines"""
+
+    def content(line: str) -> str:
+        return line.strip().lstrip('#').strip()
+
+    uncommented = np.zeros(len(template_lines), dtype=bool)
+    matcher = difflib.SequenceMatcher(None, [content(line) for line in template_lines],
+                                      [content(line) for line in gold_lines], autojunk=False)
+    for block in matcher.get_matching_blocks():
+        for offset in range(block.size):
+            gold = gold_lines[block.b + offset].strip()
+            uncommented[block.a + offset] = bool(gold) and not gold.startswith('#')
+    return uncommented
+
+
+def _read_lines(path: str) -> List[str]:
+    with open(path, encoding='utf-8') as f:
+        return f.readlines()
+
+
+# Classifiers loaded by default_line_classifier(), by model path
+_loaded: Dict[Optional[str], LineClassifier] = {}
+
+
+def default_line_classifier(model_path: Optional[str] = None) -> Optional[LineClassifier]:
+    """Classifier of the process, loaded from model_path or trained on the gold files once
+
+    None if scikit-learn is missing or there is nothing to train on, the
+    template analysis then classifies with its rules.
+    """
+    if model_path not in _loaded:
+        try:
+            _loaded[model_path] = LineClassifier.load(model_path) if model_path else LineClassifier.train(gold_pairs())
+        except (ImportError, OSError, ValueError, pickle.UnpicklingError) as e:
+            logger.warning(f"Line classifier unavailable, classifying with rules: {e}")
+            return None
+    return _loaded[model_path]
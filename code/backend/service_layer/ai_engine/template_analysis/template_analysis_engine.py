@@ -3,25 +3,65 @@ Template Analysis Engine - AI-enhanced template analysis and classification
 Integrated from uncomment project with improvements
 """
 import re
+from bisect import bisect_left
+from operator import methodcaller
 from typing import List, Dict, Optional, Any
+
+import numpy as np
 from common.handler.trace_handler import TraceHandler
 from common.handler.path_handler import PathHandler
 from backend.service_layer.ai_engine.structure_analysis.structure_analysis_engine import StructureAnalysisEngine
 
+TECHNICAL_TERMS = ["config", "enable", "disable", "port", "host", "path"]
+
+# Classifications of the columnar analysis, codes are indexes
+CLASSIFICATIONS = ("EMPTY", "ACTIVE_DATA", "INACTIVE_DATA", "DOCUMENTATION", "CONSTRAINT")
+EMPTY, ACTIVE_DATA, INACTIVE_DATA, DOCUMENTATION, CONSTRAINT = range(len(CLASSIFICATIONS))
+
+# Key of a data line, after comment markers and list dashes
+_DATA_KEY = re.compile(r'([a-zA-Z0-9_\-\.]+)\s*:')
+
+# ASCII code points str.split() separates words at
+_ASCII_SPACE = np.array([chr(code).isspace() for code in range(128)])
+
 
 class TemplateLine:
-    """Enhanced template line with AI classification"""
+    """Enhanced template line with AI classification
+
+    Fields live in slots, line_number is an alias of line_no and the
+    ai_features dict is allocated on first use.
+    """
+
+    __slots__ = ('raw_content', 'line_no', 'indent_level', 'classification', 'identified_path',
+                 'structure_node', 'confidence', '_ai_features')
 
     def __init__(self, raw_content: str, line_no: int):
         self.raw_content = raw_content
         self.line_no = line_no
-        self.line_number = line_no
         self.indent_level = self._calculate_indent(raw_content)
         self.classification = None  # DOC, CONSTRAINT, ACTIVE_DATA, INACTIVE_DATA
         self.identified_path = None
         self.structure_node = None
         self.confidence = 1.0  # AI confidence score
-        self.ai_features = {}  # AI-extracted features
+        self._ai_features: Optional[Dict[str, Any]] = None  # AI-extracted features
+
+    @property
+    def line_number(self) -> int:
+        return self.line_no
+
+    @line_number.setter
+    def line_number(self, line_no: int):
+        self.line_no = line_no
+
+    @property
+    def ai_features(self) -> Dict[str, Any]:
+        if self._ai_features is None:
+            self._ai_features = {}
+        return self._ai_features
+
+    @ai_features.setter
+    def ai_features(self, features: Dict[str, Any]):
+        self._ai_features = features
 
     def _calculate_indent(self, line_str: str) -> int:
         """Calculate indentation level"""
@@ -31,12 +71,21 @@ class TemplateLine:
 class TemplateAnalysisEngine:
     """AI-enhanced template analysis with hybrid rule-based and ML approaches"""
 
-    def __init__(self, tracer: TraceHandler, path_handler: PathHandler, structure_engine: StructureAnalysisEngine):
+    def __init__(self, tracer: TraceHandler, path_handler: PathHandler, structure_engine: StructureAnalysisEngine,
+                 columnar: bool = False, classifier=None):
         self.tracer = tracer
         self.path_handler = path_handler
         self.structure_engine = structure_engine
         self.lines: List[TemplateLine] = []
-        self.context_stack = []
+        # Frames of the open keys and their levels, ascending
+        self.context_stack: List[Dict[str, Any]] = []
+        self._context_levels: List[int] = []
+
+        # Columnar mode keeps features, classification codes and confidences as arrays
+        self.columnar = columnar
+        self.columns: Optional[Dict[str, np.ndarray]] = None
+        # Trained backend classifying the feature columns, the rules classify without one
+        self.classifier = classifier
 
         # Enhanced classification rules
         self.rules = {
@@ -63,8 +112,11 @@ class TemplateAnalysisEngine:
         """Main template processing with AI enhancements"""
         self.tracer.info("Starting AI-enhanced template analysis...")
 
-        self.context_stack = []
+        self._reset_context()
         self.lines = []
+        self.columns = None
+        if (self.columnar or self.classifier is not None) and self._process_template_columnar(raw_lines):
+            return
 
         for idx, raw_content in enumerate(raw_lines):
             line = TemplateLine(raw_content, idx + 1)
@@ -87,6 +139,215 @@ class TemplateAnalysisEngine:
 
         self.tracer.info(f"Template analysis complete: {self.stats['lines_processed']} lines processed")
 
+    def _process_template_columnar(self, raw_lines: List[str]) -> bool:
+        """process_template with features, classification and confidence computed as arrays
+
+        Lines get the classification and confidence the per-line analysis
+        gives them, their features are kept in self.columns instead of
+        ai_features. Path resolution stays per line, it follows the
+        context of the lines before. With a classifier, its predictions
+        replace the rules and every non-empty line counts as AI-classified.
+        Returns False, leaving the lines to the per-line analysis, if a line
+        has a line break inside.
+        """
+        self.lines = [TemplateLine(raw_content, idx + 1) for idx, raw_content in enumerate(raw_lines)]
+        columns = self._extract_features_columnar(raw_lines)
+        if columns is None:
+            self.lines = []
+            return False
+
+        if self.classifier is not None:
+            classification, confidence = self.classifier.classify(columns)
+            ai_classified = ~columns["is_empty"]
+        else:
+            classification, confidence, ai_classified = self._classify_columnar(columns)
+        columns["classification"], columns["confidence"] = classification, confidence
+        self.columns = columns
+
+        counts = np.bincount(classification, minlength=len(CLASSIFICATIONS))
+        self.stats["lines_processed"] += len(self.lines)
+        self.stats["ai_classifications"] += int(np.count_nonzero(ai_classified))
+        self.stats["active_data"] += int(counts[ACTIVE_DATA])
+        self.stats["inactive_data"] += int(counts[INACTIVE_DATA])
+        self.stats["documentation"] += int(counts[DOCUMENTATION])
+        self.stats["constraints"] += int(counts[CONSTRAINT])
+
+        for line, code, line_confidence in zip(self.lines, classification.tolist(), confidence.tolist()):
+            line.classification = CLASSIFICATIONS[code]
+            line.confidence = line_confidence
+
+        data_lines = np.flatnonzero((classification == ACTIVE_DATA) | (classification == INACTIVE_DATA)).tolist()
+        for idx in data_lines:
+            self._resolve_path_with_ai(self.lines[idx])
+        resolved = [idx for idx in data_lines if self.lines[idx].structure_node]
+        confidence[resolved] = [self.lines[idx].confidence for idx in resolved]
+
+        # Post-processing as _apply_ai_post_processing does it
+        self._analyze_classification_patterns_columnar(classification, confidence)
+        self._refine_path_resolutions()
+        confidence[resolved] = [self.lines[idx].confidence for idx in resolved]
+
+        self.tracer.info(f"Template analysis complete: {self.stats['lines_processed']} lines processed")
+        return True
+
+    def _extract_features_columnar(self, raw_lines: List[str]) -> Optional[Dict[str, np.ndarray]]:
+        """The ai_features of all lines as one array per feature, None if a line has a line break inside
+
+        The stripped lines are joined into one text, character features are
+        masks over its code points counted per line, keyword and template
+        features come from one finditer over the text. Lines with non-ASCII
+        characters get their word count and uppercase ratio from str methods.
+        """
+        count = len(raw_lines)
+        # map() keeps the per-line string calls out of the interpreter loop
+        contents = list(map(str.strip, raw_lines))
+        text = '\n'.join(contents)
+        codes = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+        if count and np.count_nonzero(codes == 10) != count - 1:
+            return None
+
+        lengths = np.fromiter(map(len, contents), dtype=np.int64, count=count)
+        raw_lengths = np.fromiter(map(len, raw_lines), dtype=np.int64, count=count)
+        indents = np.fromiter((line.indent_level for line in self.lines), dtype=np.int64, count=count)
+        starts = np.cumsum(lengths + 1) - lengths - 1
+        # Line of every code point, the newline after a line counted to it
+        line_of = np.repeat(np.arange(count), lengths + 1)[:len(codes)]
+
+        def per_line(mask: np.ndarray) -> np.ndarray:
+            return np.bincount(line_of[mask], minlength=count)
+
+        first = np.zeros(count, dtype=np.uint32)
+        first[lengths > 0] = codes[starts[lengths > 0]]
+
+        # Word starts and uppercase letters, exact for ASCII lines only
+        ascii_codes = np.minimum(codes, 127)
+        space = _ASCII_SPACE[ascii_codes]
+        word_start = ~space
+        word_start[1:] &= space[:-1]
+        word_count = per_line(word_start)
+        uppercase = per_line((codes >= 65) & (codes <= 90))
+        for idx in np.unique(line_of[codes > 127]).tolist():
+            word_count[idx] = len(contents[idx].split())
+            uppercase[idx] = sum(1 for c in contents[idx] if c.isupper())
+
+        text_lower = text.lower()
+        lower_line_of = np.cumsum(np.frombuffer(text_lower.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32) == 10)
+
+        columns = {
+            "has_comment": first == ord('#'),
+            "has_colon": per_line(codes == ord(':')) > 0,
+            "has_helm_template": self._pattern_lines(self.rules["helm_template"], text, line_of, contents),
+            "is_list_item": self._match_lines(self.rules["list_item"], contents),
+            "line_length": lengths,
+            "word_count": word_count,
+            "has_quotes": per_line((codes == ord('"')) | (codes == ord("'"))) > 0,
+            "has_brackets": per_line((codes == ord('[')) | (codes == ord(']'))) > 0,
+            "indent_ratio": indents / np.maximum(raw_lengths, 1),
+            "uppercase_ratio": uppercase / np.maximum(lengths, 1),
+            "has_constraint_words": self._keyword_lines(self.rules["constraint_keywords"], text_lower, lower_line_of, count),
+            "has_doc_indicators": self._keyword_lines(self.rules["documentation_indicators"], text_lower, lower_line_of, count),
+            "has_technical_terms": self._keyword_lines(TECHNICAL_TERMS, text_lower, lower_line_of, count)
+        }
+
+        # yaml_key of the line, after the comment markers of commented lines
+        comment_marker = self.rules["comment_marker"]
+        columns["is_empty"] = lengths == 0
+        if len(comment_marker) == 1:
+            marker = first == ord(comment_marker)
+        else:
+            marker = np.fromiter(map(methodcaller('startswith', comment_marker), contents), dtype=bool, count=count)
+        columns["starts_with_marker"] = marker
+        yaml_key = self._match_lines(self.rules["yaml_key"], contents)
+        commented = np.flatnonzero(marker).tolist()
+        after_hash = map(str.strip, map(methodcaller('lstrip', '#'), [contents[idx] for idx in commented]))
+        yaml_key[commented] = self._match_lines(self.rules["yaml_key"], list(after_hash))
+        columns["has_yaml_key"] = yaml_key
+        return columns
+
+    @staticmethod
+    def _match_lines(pattern, contents: List[str]) -> np.ndarray:
+        """Lines pattern.match matches"""
+        return np.fromiter(map(bool, map(pattern.match, contents)), dtype=bool, count=len(contents))
+
+    @staticmethod
+    def _pattern_lines(pattern, text: str, line_of: np.ndarray, contents: List[str]) -> np.ndarray:
+        """Lines pattern.search finds a match in"""
+        found = np.zeros(len(contents), dtype=bool)
+        for match in pattern.finditer(text):
+            if match.end() > match.start() and line_of[match.start()] != line_of[match.end() - 1]:
+                # Matches across lines, search every line on its own
+                return np.fromiter(map(bool, map(pattern.search, contents)), dtype=bool, count=len(contents))
+            if match.start() < len(line_of):
+                found[line_of[match.start()]] = True
+            elif contents:
+                found[-1] = True
+        return found
+
+    @staticmethod
+    def _keyword_lines(keywords: List[str], text_lower: str, lower_line_of: np.ndarray, count: int) -> np.ndarray:
+        """Lines of the lowered text containing any of the keywords"""
+        if '' in keywords:
+            return np.ones(count, dtype=bool)
+        found = np.zeros(count, dtype=bool)
+        if not keywords:
+            return found
+        # One match per line at most, the rest of the line is taken along
+        pattern = re.compile('(?:' + '|'.join(re.escape(keyword) for keyword in keywords) + ')[^\n]*')
+        # Keywords have no line breaks, the newlines before a match give its line
+        found[lower_line_of[[match.start() for match in pattern.finditer(text_lower)]]] = True
+        return found
+
+    @staticmethod
+    def _classify_columnar(columns: Dict[str, np.ndarray]):
+        """(classification codes, confidence, AI-classified mask) as _classify_line_hybrid decides them"""
+        comment, colon = columns["has_comment"], columns["has_colon"]
+        helm, constraint = columns["has_helm_template"], columns["has_constraint_words"]
+        doc, key = columns["has_doc_indicators"], columns["has_yaml_key"]
+        marker = columns["starts_with_marker"]
+
+        # _classify_with_rules
+        rule = np.select(
+            [~marker & (key | columns["is_list_item"]), ~marker,
+             key & helm, key & constraint, key & doc, key, constraint],
+            [ACTIVE_DATA, DOCUMENTATION, INACTIVE_DATA, CONSTRAINT, DOCUMENTATION, INACTIVE_DATA, CONSTRAINT],
+            default=DOCUMENTATION)
+
+        # _calculate_ai_confidence, boosters added in the same order
+        confidence = np.full(len(rule), 0.5)
+        for classification, boosters in (
+                (ACTIVE_DATA, [(colon & ~comment, 0.4), (helm, 0.2)]),
+                (INACTIVE_DATA, [(comment & colon, 0.3), (helm, 0.3)]),
+                (CONSTRAINT, [(constraint, 0.4)]),
+                (DOCUMENTATION, [(doc, 0.3), (columns["word_count"] > 5, 0.2)])):
+            for condition, boost in boosters:
+                confidence += np.where((rule == classification) & condition, boost, 0.0)
+        confidence = np.minimum(confidence, 1.0)
+
+        # _ai_classify
+        ai = np.select(
+            [colon & comment & helm, colon & comment & constraint, colon & comment, colon, constraint],
+            [INACTIVE_DATA, CONSTRAINT, INACTIVE_DATA, ACTIVE_DATA, CONSTRAINT],
+            default=DOCUMENTATION)
+
+        empty = columns["is_empty"]
+        use_rule = confidence > 0.8
+        classification = np.where(empty, EMPTY, np.where(use_rule, rule, ai)).astype(np.int8)
+        confidence = np.where(empty, 1.0, confidence)
+        return classification, confidence, ~empty & ~use_rule
+
+    def _analyze_classification_patterns_columnar(self, classification: np.ndarray, confidence: np.ndarray):
+        """_analyze_classification_patterns on the arrays, changed confidences copied to the lines"""
+        for code in np.unique(classification).tolist():
+            idx = np.flatnonzero(classification == code)
+            if len(idx) > 1:
+                group = confidence[idx]
+                # Sequential sum, as sum() adds the confidences
+                avg_confidence = np.cumsum(group)[-1] / len(idx)
+                adjust = np.abs(group - avg_confidence) > 0.3
+                confidence[idx[adjust]] = (group[adjust] + avg_confidence) / 2
+                for i, value in zip(idx[adjust].tolist(), confidence[idx[adjust]].tolist()):
+                    self.lines[i].confidence = value
+
     def _extract_ai_features(self, line: TemplateLine):
         """Extract AI features from template line"""
         content = line.raw_content.strip()
@@ -109,7 +370,7 @@ class TemplateAnalysisEngine:
         features.update({
             "has_constraint_words": any(kw in content_lower for kw in self.rules["constraint_keywords"]),
             "has_doc_indicators": any(ind in content_lower for ind in self.rules["documentation_indicators"]),
-            "has_technical_terms": any(term in content_lower for term in ["config", "enable", "disable", "port", "host", "path"])
+            "has_technical_terms": any(term in content_lower for term in TECHNICAL_TERMS)
         })
 
         line.ai_features = features
@@ -235,11 +496,23 @@ class TemplateAnalysisEngine:
         return "DOCUMENTATION"
 
     def _resolve_path_with_ai(self, line: TemplateLine):
-        """AI-enhanced path resolution with backtracking"""
-        content = line.raw_content.lstrip().lstrip('#').strip()
+        """AI-enhanced path resolution with backtracking
+
+        The context stack holds one frame per open key, indexed by the
+        indentation of the key's content. List items rank half a level
+        inside their indentation, as a dash may sit at the indentation of
+        its list's key. A line first closes the frames at its level or
+        deeper, the frames left are its ancestors. Only frames whose node
+        has the key, or list elements, are scored, from the nearest one up
+        to the first frame with the key as a child.
+        """
+        content = line.raw_content.lstrip().lstrip('#')
+        # Spaces after the comment markers indent the content, but for the one separating them
+        indent = line.indent_level + max(len(content) - len(content.lstrip(' ')) - 1, 0)
+        content = content.strip()
 
         # Extract key
-        key_match = self.rules["yaml_key"].match(content.lstrip('- '))
+        key_match = _DATA_KEY.match(content.lstrip('- '))
         current_key = key_match.group(1) if key_match else (
             "[N]" if content.startswith('-') else None
         )
@@ -247,49 +520,66 @@ class TemplateAnalysisEngine:
         if not current_key:
             return
 
-        # AI-enhanced backtracking
+        # Jump to the frames above the line's level, truncating in place
+        stack, levels = self.context_stack, self._context_levels
+        level = 2 * indent + content.startswith('-')
+        open_frames = bisect_left(levels, level)
+        del stack[open_frames:], levels[open_frames:]
+
+        # AI-enhanced backtracking over the ancestors that can be parents
         best_parent_node = None
         new_stack_depth = -1
         max_confidence = 0.0
-
-        # Search context stack with AI scoring
-        for depth in range(len(self.context_stack) - 1, -1, -1):
-            parent_info = self.context_stack[depth]
-            parent_node = parent_info.get('node')
-
-            if parent_node and self._can_be_child(parent_node, current_key):
+        for depth in range(len(stack) - 1, -1, -1):
+            parent_node = stack[depth]['node']
+            children = parent_node.children
+            if current_key in children or "[N]" in children:
                 confidence = self._calculate_parent_confidence(parent_node, current_key, line)
                 if confidence > max_confidence:
                     best_parent_node = parent_node
                     new_stack_depth = depth
                     max_confidence = confidence
+                if current_key in children:
+                    break
 
         if best_parent_node and max_confidence > 0.5:
             # Update context stack
-            self.context_stack = self.context_stack[:new_stack_depth + 1]
+            del stack[new_stack_depth + 1:], levels[new_stack_depth + 1:]
+            path = stack[-1]['path']
 
-            # Get child node
+            # Get child node, through the list element if the key is not a child
             child_node = self._get_child_node(best_parent_node, current_key)
-            if child_node:
-                line.structure_node = child_node
-                parent_path = self.context_stack[-1]['path']
-                line.identified_path = f"{parent_path}.{current_key}".strip('.')
-                line.confidence = max_confidence
-
-                # Add to context stack
-                self.context_stack.append({
-                    'indent': line.indent_level,
-                    'path': line.identified_path,
-                    'node': child_node
-                })
-
-                self.stats["path_resolutions"] += 1
-
-    def _can_be_child(self, parent_node, child_key: str) -> bool:
-        """Check if child_key can be a child of parent_node"""
-        return (child_key in parent_node.children or
-                "[N]" in parent_node.children or
-                parent_node.node_type in ["object", "key"])
+            if current_key in best_parent_node.children:
+                path = f"{path}.{current_key}"
+            else:
+                path = f"{path}.[N]"
+                if content.startswith('-') and current_key in child_node.children:
+                    # "- key: value" opens the element and its first key
+                    stack.append({'indent': indent, 'path': path.strip('.'), 'node': child_node})
+                    levels.append(level)
+                    indent += len(content) - len(content.lstrip('- '))
+                    level = 2 * indent
+                    child_node = child_node.children[current_key]
+                    path = f"{path}.{current_key}"
+
+            line.structure_node = child_node
+            line.identified_path = path.strip('.')
+            line.confidence = max_confidence
+
+            # Add to context stack
+            stack.append({
+                'indent': indent,
+                'path': line.identified_path,
+                'node': child_node
+            })
+            levels.append(level)
+
+            self.stats["path_resolutions"] += 1
+
+    def _reset_context(self):
+        """Context stack of the structure root only, below any indentation"""
+        self.context_stack = [{'indent': -1, 'path': '', 'node': self.structure_engine.root}]
+        self._context_levels = [-1]
 
     def _calculate_parent_confidence(self, parent_node, child_key: str, line: TemplateLine) -> float:
         """Calculate confidence that parent_node is correct parent for child_key"""
@@ -304,11 +594,11 @@ class TemplateAnalysisEngine:
             confidence += 0.3
 
         # Source consistency
-        if parent_node.metadata.get("source") in ["helm", "both"]:
+        if parent_node.source in ["helm", "both"]:
             confidence += 0.1
 
         # Usage frequency
-        usage_count = parent_node.metadata.get("usage_count", 0)
+        usage_count = parent_node.usage_count
         if usage_count > 0:
             confidence += min(0.2, usage_count * 0.02)
 
@@ -379,10 +669,17 @@ class TemplateAnalysisEngine:
             "ai_metrics": {
                 "ai_classifications": self.stats["ai_classifications"],
                 "path_resolutions": self.stats["path_resolutions"],
-                "avg_confidence": sum(line.confidence for line in self.lines) / len(self.lines) if self.lines else 0
+                "avg_confidence": self._average_confidence()
             }
         }
 
+    def _average_confidence(self) -> float:
+        if not self.lines:
+            return 0
+        if self.columns is not None:
+            return float(np.cumsum(self.columns["confidence"])[-1] / len(self.lines))
+        return sum(line.confidence for line in self.lines) / len(self.lines)
+
     def get_summary(self) -> Dict[str, Any]:
         """Get processing summary"""
         return self.stats
\ No newline at end of file
@@ -3,7 +3,9 @@ YAML Format Processing - Enhanced YAML processing services
 """
 
 from .yaml_processing_service import YAMLProcessingService
+from .knowledge_cache import KnowledgeModelCache
 
 __all__ = [
-    'YAMLProcessingService'
+    'YAMLProcessingService',
+    'KnowledgeModelCache'
 ]
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+Knowledge Model Cache - Knowledge models reused across templates and processing modes
+Models are keyed by digests of the MRCF file and the Helm charts they were built from
+"""
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class KnowledgeModelCache:
+    """Bounded LRU of knowledge models keyed by source_key().
+
+    A key digests the content of the MRCF file and of every Helm archive
+    and values.yaml under the Helm directory, so a changed source builds
+    a new model. File digests are remembered with the file's size and
+    mtime and only recomputed when those change. One cache can be shared
+    by several services; invalidate() drops the models of a source.
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._models: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Sources of each key, for invalidate()
+        self._sources: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        # abspath -> (size, mtime_ns, digest)
+        self._file_digests: Dict[str, Tuple[int, int, str]] = {}
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def source_key(self, mrcf_path: Optional[str], helm_path: Optional[str]) -> str:
+        """Key of the model built from mrcf_path and helm_path, missing sources count as absent."""
+        digest = hashlib.blake2b(digest_size=16)
+        if mrcf_path and os.path.isfile(mrcf_path):
+            digest.update(b'mrcf\0' + self._file_digest(mrcf_path).encode())
+        digest.update(b'\0helm\0')
+        for rel_path, file_digest in self._helm_files(helm_path):
+            digest.update(rel_path.encode('utf-8', 'surrogateescape') + b'\0' + file_digest.encode() + b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        model = self._models.get(key)
+        if model is None:
+            self.stats["misses"] += 1
+            return None
+        self._models.move_to_end(key)
+        self.stats["hits"] += 1
+        return model
+
+    def put(self, key: str, model: Dict[str, Any], mrcf_path: Optional[str] = None,
+            helm_path: Optional[str] = None):
+        self._models[key] = model
+        self._models.move_to_end(key)
+        self._sources[key] = (self._abspath(mrcf_path), self._abspath(helm_path))
+        while len(self._models) > self.max_entries:
+            old_key, _ = self._models.popitem(last=False)
+            self._sources.pop(old_key, None)
+
+    def invalidate(self, mrcf_path: Optional[str] = None, helm_path: Optional[str] = None) -> int:
+        """Drop the models built from mrcf_path or helm_path, everything if neither is given.
+
+        Returns the number of models dropped.
+        """
+        if mrcf_path is None and helm_path is None:
+            dropped = len(self._models)
+            self.clear()
+        else:
+            mrcf_path, helm_path = self._abspath(mrcf_path), self._abspath(helm_path)
+            keys = [key for key, (mrcf, helm) in self._sources.items()
+                    if (mrcf_path is not None and mrcf == mrcf_path) or (helm_path is not None and helm == helm_path)]
+            for key in keys:
+                del self._models[key], self._sources[key]
+            dropped = len(keys)
+        self.stats["invalidations"] += dropped
+        return dropped
+
+    def clear(self):
+        self._models.clear()
+        self._sources.clear()
+        self._file_digests.clear()
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def _helm_files(self, helm_path: Optional[str]) -> List[Tuple[str, str]]:
+        """(relative path, digest) of the archives and values files read_all_charts can read."""
+        if not helm_path or not os.path.isdir(helm_path):
+            return []
+        files = []
+        for root, dirs, names in os.walk(helm_path):
+            dirs.sort()
+            for name in sorted(names):
+                if name == 'values.yaml' or (root == helm_path and name.endswith('.tgz')):
+                    file_path = os.path.join(root, name)
+                    files.append((os.path.relpath(file_path, helm_path), self._file_digest(file_path)))
+        return files
+
+    def _file_digest(self, file_path: str) -> str:
+        abspath = os.path.abspath(file_path)
+        stat = os.stat(abspath)
+        known = self._file_digests.get(abspath)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+        digest = hashlib.blake2b(digest_size=16)
+        with open(abspath, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        self._file_digests[abspath] = (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _abspath(path: Optional[str]) -> Optional[str]:
+        return os.path.abspath(path) if path else None
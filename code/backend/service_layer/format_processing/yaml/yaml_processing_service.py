@@ -3,6 +3,7 @@ Enhanced YAML Processing Service - AI-integrated YAML processing
 Combines rule-based and AI approaches for comprehensive YAML processing
 """
 import os
+import re
 from typing import Dict, Any, List, Optional, Tuple
 from common.handler.trace_handler import TraceHandler
 from common.handler.error_handler import ErrorHandler, FormatProcessingError
@@ -10,14 +11,24 @@ from common.handler.path_handler import PathHandler
 from common.engine.io_engine.yaml_io_module import YAMLIOModule
 from common.engine.io_engine.json_io_module import JSONIOModule
 from common.engine.io_engine.helm_io_module import HelmIOModule
-from backend.service_layer.ai_engine.structure_analysis.structure_analysis_engine import StructureAnalysisEngine
+from backend.service_layer.ai_engine.structure_analysis.structure_analysis_engine import StructureAnalysisEngine, StructureNode
 from backend.service_layer.ai_engine.template_analysis.template_analysis_engine import TemplateAnalysisEngine
+from backend.service_layer.ai_engine.template_analysis.line_classifier import LineClassifier
+from .knowledge_cache import KnowledgeModelCache
+
+# Key of a commented-out "key: value" row, after the hashes
+_COMMENTED_KEY = re.compile(r'^([a-zA-Z0-9_\-\.]+)\s*:')
+
+# Processing modes, in the order the ML analysis workflow runs them
+PROCESSING_MODES = ("ai", "rule", "hybrid")
 
 
 class YAMLProcessingService:
     """Enhanced YAML processing with AI integration"""
 
-    def __init__(self, product: str = "AI_Platform", version: str = "1.0"):
+    def __init__(self, product: str = "AI_Platform", version: str = "1.0",
+                 knowledge_cache: Optional[KnowledgeModelCache] = None,
+                 columnar_analysis: bool = False, line_classifier: Optional[LineClassifier] = None):
         self.product = product
         self.version = version
 
@@ -30,7 +41,13 @@ class YAMLProcessingService:
 
         # AI engines
         self.structure_engine = StructureAnalysisEngine(self.tracer, self.path_handler)
-        self.template_engine = TemplateAnalysisEngine(self.tracer, self.path_handler, self.structure_engine)
+        # Columnar analysis extracts the line features as arrays, for large templates.
+        # A trained line classifier, loaded once and shared, classifies them instead of the rules
+        self.template_engine = TemplateAnalysisEngine(self.tracer, self.path_handler, self.structure_engine,
+                                                      columnar=columnar_analysis, classifier=line_classifier)
+
+        # Knowledge models by source digests, can be shared between services
+        self.knowledge_cache = knowledge_cache if knowledge_cache is not None else KnowledgeModelCache()
 
         self.stats = {
             "files_processed": 0,
@@ -62,8 +79,8 @@ class YAMLProcessingService:
             # Load input template
             template_lines = self.yaml_io.read_raw_lines(input_path)
 
-            # Build knowledge model
-            knowledge_model = self._build_knowledge_model(mrcf_path, helm_path)
+            # Build knowledge model, or reuse the one of the same sources
+            knowledge_model = self._get_knowledge_model(mrcf_path, helm_path)
 
             # Process based on mode
             if processing_mode == "rule":
@@ -86,6 +103,129 @@ class YAMLProcessingService:
             ErrorHandler.handle(e, self.tracer, "YAML template processing")
             return False
 
+    def process_yaml_template_modes(self, input_path: str, output_paths: Dict[str, str],
+                                    mrcf_path: Optional[str] = None,
+                                    helm_path: Optional[str] = None,
+                                    system_size: str = "standard-system") -> Dict[str, Any]:
+        """
+        Several processing modes from one read and one analysis of the template
+
+        The knowledge model is looked up and the template analysed once, then
+        each line is decided for every requested mode in a single pass. Each
+        output is what process_yaml_template writes for its mode.
+
+        Args:
+            input_path: Input YAML template file
+            output_paths: Output file per processing mode ('rule', 'ai', 'hybrid')
+            mrcf_path: Machine Readable Configuration File (JSON)
+            helm_path: Helm charts directory
+            system_size: System size flavor
+
+        Returns:
+            {"results": {mode: success}, "comparison": report of where the modes differ}
+        """
+        modes = [mode for mode in PROCESSING_MODES if mode in output_paths]
+        results = {mode: False for mode in output_paths}
+        try:
+            unknown = set(output_paths) - set(PROCESSING_MODES)
+            if unknown:
+                raise FormatProcessingError(f"Unknown processing modes: {sorted(unknown)}")
+            self.tracer.info(f"Starting YAML processing: {', '.join(modes)} modes in one pass")
+
+            template_lines = self.yaml_io.read_raw_lines(input_path)
+            knowledge_model = self._get_knowledge_model(mrcf_path, helm_path)
+            processed = self._process_modes(template_lines, knowledge_model, modes)
+
+            for mode in modes:
+                results[mode] = self.yaml_io.write_raw_lines(processed[mode], output_paths[mode])
+                if results[mode]:
+                    self.stats["files_processed"] += 1
+                    self.tracer.info(f"YAML processing completed: {output_paths[mode]}")
+
+            return {"results": results, "comparison": self._compare_modes(template_lines, processed)}
+
+        except Exception as e:
+            ErrorHandler.handle(e, self.tracer, "YAML multi-mode template processing")
+            return {"results": results, "comparison": {}}
+
+    def _process_modes(self, template_lines: List[str], knowledge_model: Dict[str, Any],
+                       modes: List[str]) -> Dict[str, List[str]]:
+        """Processed lines per mode, the rule and AI decisions of a line shared by the hybrid one"""
+        if "ai" in modes or "hybrid" in modes:
+            self.template_engine.process_template(template_lines)
+            lines = self.template_engine.lines
+        else:
+            lines = [None] * len(template_lines)
+
+        processed = {mode: [] for mode in modes}
+        uncommented = dict.fromkeys(modes, 0)
+        for raw_content, line in zip(template_lines, lines):
+            decisions = {}
+            rule_decision = self._should_uncomment_rule_based(raw_content, knowledge_model)
+            if "rule" in modes:
+                decisions["rule"] = (rule_decision, "rule")
+            if line is not None:
+                ai_decision = self._should_uncomment_ai_based(line)
+                if "ai" in modes:
+                    decisions["ai"] = (ai_decision, "ai")
+                if "hybrid" in modes:
+                    decisions["hybrid"] = self._hybrid_decision(line, ai_decision, rule_decision)
+
+            uncommented_line = None
+            for mode, (should_uncomment, decision_type) in decisions.items():
+                if not should_uncomment:
+                    processed[mode].append(raw_content)
+                    continue
+                if uncommented_line is None:
+                    uncommented_line = self._uncomment_line(raw_content)
+                processed[mode].append(uncommented_line)
+                uncommented[mode] += 1
+                self.stats[f"{decision_type}_decisions"] += 1
+
+        for mode in modes:
+            self.stats["lines_uncommented"] += uncommented[mode]
+            self.tracer.info(f"{mode} processing: {uncommented[mode]} lines uncommented")
+        return processed
+
+    @staticmethod
+    def _compare_modes(template_lines: List[str], processed: Dict[str, List[str]], limit: int = 50) -> Dict[str, Any]:
+        """Uncommented lines per mode, lines each pair of modes differs on and the first disagreements"""
+        modes = list(processed)
+        changed = {mode: {i for i, (before, after) in enumerate(zip(template_lines, processed[mode]))
+                          if before != after}
+                   for mode in modes}
+        disagreements = sorted(set().union(*changed.values()) - set.intersection(*changed.values())) if modes else []
+        return {
+            "uncommented_lines": {mode: len(changed[mode]) for mode in modes},
+            "pairwise_differences": {f"{first}/{second}": len(changed[first] ^ changed[second])
+                          for index, first in enumerate(modes) for second in modes[index + 1:]},
+            "disagreement_count": len(disagreements),
+            "disagreements": [
+                {"line": i + 1, "content": template_lines[i].strip(),
+                 "uncommented_by": [mode for mode in modes if i in changed[mode]]}
+                for i in disagreements[:limit]
+            ]
+        }
+
+    def _get_knowledge_model(self, mrcf_path: Optional[str], helm_path: Optional[str]) -> Dict[str, Any]:
+        """Knowledge model of the sources from the cache, built on a miss
+
+        The structure engine is switched to the structure tree of the model.
+        """
+        key = self.knowledge_cache.source_key(mrcf_path, helm_path)
+        knowledge = self.knowledge_cache.get(key)
+        if knowledge is None:
+            knowledge = self._build_knowledge_model(mrcf_path, helm_path)
+            self.knowledge_cache.put(key, knowledge, mrcf_path, helm_path)
+        else:
+            self.tracer.info("Reusing knowledge model of unchanged MRCF and Helm sources")
+            self.structure_engine.root = knowledge["structure_root"]
+        return knowledge
+
+    def invalidate_knowledge_cache(self, mrcf_path: Optional[str] = None, helm_path: Optional[str] = None) -> int:
+        """Drop cached knowledge models of the given sources, all of them if none is given"""
+        return self.knowledge_cache.invalidate(mrcf_path, helm_path)
+
     def _build_knowledge_model(self, mrcf_path: Optional[str], helm_path: Optional[str]) -> Dict[str, Any]:
         """Build comprehensive knowledge model from available sources"""
         knowledge = {
@@ -93,6 +233,8 @@ class YAMLProcessingService:
             "flat_json_data": {},
             "parameters": []
         }
+        # Each model has its own structure tree, kept with it in the cache
+        self.structure_engine.root = knowledge["structure_root"] = StructureNode("root")
 
         # Load Helm data
         if helm_path and os.path.exists(helm_path):
@@ -122,8 +264,33 @@ class YAMLProcessingService:
         if knowledge["parameters"]:
             self.structure_engine.ingest_json_parameters(knowledge["parameters"])
 
+        knowledge["key_index"] = self._build_key_index(knowledge["flat_json_data"], knowledge["helm_data"])
         return knowledge
 
+    def _build_key_index(self, flat_json_data: Dict[str, Any], helm_data: Dict[str, Any]) -> Dict[str, List[str]]:
+        """Inverted index of the known keys: key -> paths it appears on
+
+        Flat JSON paths are indexed under each of their '.' segments, Helm
+        data under every mapping key at any depth, with its dotted path.
+        """
+        index: Dict[str, List[str]] = {}
+        for path in flat_json_data:
+            for segment in path.split('.'):
+                index.setdefault(segment, []).append(path)
+
+        stack = [(helm_data, "")]
+        while stack:
+            data, path = stack.pop()
+            if isinstance(data, dict):
+                for key, value in data.items():
+                    key_path = f"{path}.{key}" if path else str(key)
+                    if isinstance(key, str):
+                        index.setdefault(key, []).append(key_path)
+                    stack.append((value, key_path))
+            elif isinstance(data, list):
+                stack.extend((item, f"{path}[{i}]") for i, item in enumerate(data))
+        return index
+
     def _process_rule_based(self, template_lines: List[str], knowledge_model: Dict[str, Any]) -> List[str]:
         """Rule-based processing (original uncomment-00 approach)"""
         self.tracer.info("Processing with rule-based approach")
@@ -221,21 +388,16 @@ class YAMLProcessingService:
             return False
 
         # Extract key
-        key_match = re.match(r'^([a-zA-Z0-9_\\-\\.]+)\\s*:', content_after_hash)
+        key_match = _COMMENTED_KEY.match(content_after_hash)
         if not key_match:
             return False
 
-        key = key_match.group(1)
-
-        # Check in flat JSON data
-        flat_data = knowledge_model.get("flat_json_data", {})
-        for path in flat_data.keys():
-            if key in path.split('.'):
-                return True
-
-        # Check in Helm data
-        helm_data = knowledge_model.get("helm_data", {})
-        return self._key_exists_in_dict(key, helm_data)
+        # Known from the flat JSON paths or the Helm data
+        key_index = knowledge_model.get("key_index")
+        if key_index is None:
+            key_index = knowledge_model["key_index"] = self._build_key_index(
+                knowledge_model.get("flat_json_data", {}), knowledge_model.get("helm_data", {}))
+        return key_match.group(1) in key_index
 
     def _should_uncomment_ai_based(self, line) -> bool:
         """AI-based decision for uncommenting"""
@@ -261,7 +423,11 @@ class YAMLProcessingService:
         # Rule-based decision
         rule_decision = self._should_uncomment_rule_based(line.raw_content, knowledge_model)
 
-        # Decision logic
+        return self._hybrid_decision(line, ai_decision, rule_decision)
+
+    @staticmethod
+    def _hybrid_decision(line, ai_decision: bool, rule_decision: bool) -> Tuple[bool, str]:
+        """Hybrid decision from the AI and rule-based decisions of a line"""
         if ai_decision and rule_decision:
             return True, "hybrid"
         elif ai_decision and line.confidence > 0.8:
@@ -285,20 +451,6 @@ class YAMLProcessingService:
             return indent + uncommented
         return line_content
 
-    def _key_exists_in_dict(self, key: str, data: Dict[str, Any]) -> bool:
-        """Check if key exists anywhere in nested dictionary"""
-        if isinstance(data, dict):
-            if key in data:
-                return True
-            for value in data.values():
-                if self._key_exists_in_dict(key, value):
-                    return True
-        elif isinstance(data, list):
-            for item in data:
-                if self._key_exists_in_dict(key, item):
-                    return True
-        return False
-
     def process_batch(self, input_dir: str, output_dir: str, **kwargs) -> Dict[str, bool]:
         """Process multiple YAML files in batch"""
         results = {}
@@ -335,6 +487,7 @@ class YAMLProcessingService:
                 "helm_io": self.helm_io.get_summary(),
                 "structure_engine": self.structure_engine.get_summary(),
                 "template_engine": self.template_engine.get_summary(),
-                "path_handler": self.path_handler.get_summary()
+                "path_handler": self.path_handler.get_summary(),
+                "knowledge_cache": dict(self.knowledge_cache.stats, models=len(self.knowledge_cache))
             }
         }
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""
+Artifact Sink - Atomic disk output for in-memory processing results
+Writes every artifact of a template to a temp file, then renames them all
+"""
+import os
+import stat
+import tempfile
+from typing import Dict, List
+
+MAIN_ARTIFACT = 'main'
+
+
+def artifact_path(output_path: str, name: str) -> str:
+    """File of artifact name, the main output or output_path with '_<name>' before '.yaml'."""
+    if name == MAIN_ARTIFACT:
+        return output_path
+    return output_path.replace('.yaml', f'_{name}.yaml')
+
+
+def output_mode(path: str) -> int:
+    """Mode open() would leave path with: its own if it exists, the umask default otherwise."""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+class ArtifactSink:
+    """Writes named artifacts next to an output path, all of them or none.
+
+    Each artifact goes to a temp file in the target directory first, the
+    renames only start once every temp file is written, so a reader never
+    sees a half-written file and a failure leaves the old outputs alone.
+    Temp files get the mode open() would have given the target, not the
+    0600 of mkstemp.
+    """
+
+    def __init__(self, output_path: str, encoding: str):
+        self.output_path = output_path
+        self.encoding = encoding
+
+    def write(self, artifacts: Dict[str, str]) -> List[str]:
+        """Write artifacts in their order, returns the written paths."""
+        staged = []
+        try:
+            for name, text in artifacts.items():
+                path = artifact_path(self.output_path, name)
+                fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.",
+                                                 suffix='.tmp', dir=os.path.dirname(path) or '.')
+                staged.append((temp_path, path))
+                with open(fd, 'w', encoding=self.encoding, newline='\n') as f:
+                    f.write(text)
+                os.chmod(temp_path, output_mode(path))
+            for temp_path, path in staged:
+                os.replace(temp_path, path)
+        except BaseException:
+            for temp_path, _ in staged:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            raise
+        return [path for _, path in staged]
@@ -0,0 +1,134 @@
+"""
+Row Block Engine - Line-based block processing for uncommenting
+Replaces the character-by-character reverse scan of _process_yaml_file2
+"""
+from typing import List
+
+
+class RowBlock:
+    """Block of rows collected bottom-up as a reversed list of row pieces."""
+
+    __slots__ = ('pieces', '_joined', '_joined_count', 'checker')
+
+    def __init__(self, checker=None):
+        self.pieces: List[str] = []
+        self._joined = ""
+        self._joined_count = 0
+        self.checker = checker
+
+    def prepend(self, piece: str):
+        """Put piece in front of the block (pieces are stored reversed)."""
+        self.pieces.append(piece)
+        if self.checker is not None:
+            self.checker.push(piece)
+
+    def is_correct_yaml(self, svc, head: str, row_num: int):
+        """Validity of head + block, incremental when the block has a checker."""
+        if self.checker is not None:
+            return self.checker.check(head, row_num)
+        return svc._is_correct_yaml(self.text(head), row_num)
+
+    def close(self, row_num: int):
+        """Block is complete, let the checker verify it if configured."""
+        if self.checker is not None and self.checker.close(row_num) is False:
+            print(f"WARNING: incremental YAML check differs from full parse for block ending at row #{row_num}")
+
+    def text(self, head: str = "") -> str:
+        """Block text, optionally with a head piece in front.
+
+        Only the pieces added since the previous call are joined, so asking
+        for the text after every row stays a single copy of the block.
+        """
+        if self._joined_count < len(self.pieces):
+            self._joined = ''.join(reversed(self.pieces[self._joined_count:])) + self._joined
+            self._joined_count = len(self.pieces)
+        return head + self._joined
+
+    def first_row(self) -> str:
+        """First non-empty row of the block, same as _first_row(self.text())."""
+        buffer = ""
+        for piece in reversed(self.pieces):
+            buffer += piece
+            if "\n" in buffer.lstrip("\n"):
+                break
+        return buffer.strip("\n").split('\n')[0]
+
+
+class RowBlockEngine:
+    """Bottom-up block engine working on a list of rows instead of characters."""
+
+    def __init__(self, service):
+        self.service = service
+
+    def process(self, content: str, template_file: str) -> str:
+        """Process YAML content by blocks, byte-identical to the character scan."""
+        svc = self.service
+        rows = content.split('\n')
+        print(f"Processing {len(content)} chars of YAML content...")
+
+        blocks: List[RowBlock] = []
+        checker = svc._new_validity_checker()
+        block = RowBlock(checker)
+        status = 0
+
+        # The character scan never reads content[0], so the first row is
+        # dropped and the second one is only reached through a preceding '\n'
+        lowest_row = 1 if rows[0] else 2
+
+        for row_num in range(len(rows) - 1, lowest_row - 1, -1):
+            last_row = "\n" + rows[row_num]
+            act_row = svc._first_row(last_row).strip()
+            last_row_is_json = act_row.startswith('@@@') and act_row.endswith('@@@')
+            last_row_is_yaml, last_row_content = svc._is_correct_yaml(act_row, row_num)
+
+            if last_row_is_json:
+                last_row = last_row.replace('@@@', '')
+            elif not last_row_is_yaml:
+                if svc._is_allowed_content(last_row_content):
+                    last_row_is_yaml = True
+                else:
+                    print(f"Wrong YAML content found in '{template_file}', breaking the tool...")
+                    print(f"Last row processed was: '{act_row}', but is this correct YAML? {last_row_is_yaml}")
+                    raise Exception(f"Invalid YAML content: {act_row}")
+
+            comment = last_row.strip().startswith("#")
+            comment_only = comment and last_row.strip().endswith("#")
+
+            if comment_only:
+                block.prepend(last_row)
+            elif comment:
+                last_row_uncom = svc._uncomment_row(last_row)
+                last_row_uncom_is_yaml, _ = svc._is_correct_yaml(svc._first_row(last_row_uncom), row_num)
+
+                if svc.config['verbose']:
+                    print(f"Last row uncommented: '{last_row_uncom}' is correct YAML? {last_row_uncom_is_yaml}")
+
+                last_block_uncom_is_yaml, _ = block.is_correct_yaml(svc, last_row_uncom, row_num)
+
+                if last_block_uncom_is_yaml:
+                    block.prepend(last_row_uncom)
+                    status = 1
+                elif last_row_uncom_is_yaml:
+                    ind1 = svc._indent_level(svc._first_row(last_row_uncom))
+                    ind2 = svc._indent_level(block.first_row())
+
+                    block.prepend(last_row_uncom)
+                    if ind1 > ind2:
+                        block.close(row_num)
+                        blocks.append(block)
+                        block = RowBlock(checker)
+                        status = 2
+                    else:
+                        status = 3
+                else:
+                    block.prepend(last_row)
+                    status = 4
+            else:
+                block.prepend(last_row)
+                status = 5
+
+        block.close(lowest_row)
+        if status > 0 and status != 2:
+            blocks.append(block)
+
+        return ''.join(piece for done in reversed(blocks) for piece in reversed(done.pieces))
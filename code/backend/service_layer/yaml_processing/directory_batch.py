@@ -0,0 +1,149 @@
+"""
+Directory Batch - Parallel processing of a directory of YAML templates
+Knowledge maps are loaded once and shared with forked worker processes
+"""
+import glob
+import multiprocessing
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Service of the current worker process, set by _init_worker
+_worker_service = None
+
+
+def _init_worker(service_class, config: Dict[str, Any], map_path_mrcf: Dict, map_path_helm: Dict,
+                 mrcf_flavor_defaults: Dict, knowledge_sources: Dict[str, Any], block_cache):
+    """Build the worker service around the maps and block cache the parent loaded.
+
+    With the fork start method they are inherited, not pickled, and stay
+    shared copy-on-write as long as nobody writes to them. The worker does
+    not write the cache files, the parent merges what it adds.
+    """
+    global _worker_service
+    _worker_service = service_class(config)
+    _worker_service.map_path_mrcf = map_path_mrcf
+    _worker_service.map_path_helm = map_path_helm
+    _worker_service.mrcf_flavor_defaults = mrcf_flavor_defaults
+    _worker_service.knowledge_sources = knowledge_sources
+    _worker_service.block_cache = block_cache
+    _worker_service.persist_caches = False
+
+
+def _process_task(task: Tuple[int, str, str, str, Any]) -> Tuple[int, Dict[str, Any], List[list], List[list]]:
+    """Process one template in a worker.
+
+    Returns its index, the timed result and the verdicts and block results
+    the template added to the worker's caches.
+    """
+    index, input_path, output_path, system_size, generate_variants = task
+    verdicts, blocks = _worker_service.verdict_cache, _worker_service.block_cache
+    if verdicts is not None:
+        verdicts.record()
+    blocks.record()
+    result = _timed(_worker_service, input_path, output_path, system_size, generate_variants)
+    return index, result, verdicts.take_recorded() if verdicts is not None else [], blocks.take_recorded()
+
+
+def _timed(service, input_path: str, output_path: str, system_size: str,
+           generate_variants: Union[bool, List[str]]) -> Dict[str, Any]:
+    started, cpu_started = time.perf_counter(), time.process_time()
+    try:
+        result = service.process_yaml_template(input_path, output_path, system_size=system_size,
+                                               generate_variants=generate_variants)
+    except Exception as e:
+        result = {
+            'success': False,
+            'error': str(e),
+            'input_path': input_path,
+            'message': f'Processing failed: {e}'
+        }
+    result['elapsed'] = time.perf_counter() - started
+    # Processes forked for the PyYAML variant are not counted
+    result['cpu_time'] = time.process_time() - cpu_started
+    result['worker'] = os.getpid()
+    return result
+
+
+class DirectoryBatchProcessor:
+    """process_yaml_template over every template of a directory tree.
+
+    Outputs mirror the input tree under the output directory. Templates
+    are handed out largest first so a big file does not finish the batch
+    alone, results come back in template order. Verdicts and block results
+    the workers add are merged into the service's caches.
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    def find_templates(self, input_dir: str, output_dir: str, pattern: str) -> List[str]:
+        """Templates under input_dir in name order, generated outputs left out."""
+        output_root = os.path.abspath(output_dir) + os.sep
+        templates = []
+        for path in sorted(glob.glob(os.path.join(input_dir, '**', pattern), recursive=True)):
+            if os.path.isfile(path) and not os.path.abspath(path).startswith(output_root):
+                templates.append(path)
+        return templates
+
+    def process(self, input_dir: str, output_dir: str, system_size: str,
+                generate_variants: Union[bool, List[str]],
+                workers: Optional[int] = None, pattern: str = '*.yaml') -> Dict[str, Any]:
+        """Process the templates of input_dir into output_dir."""
+        if os.path.abspath(input_dir) == os.path.abspath(output_dir):
+            raise ValueError("output directory must differ from the input directory")
+        started = time.perf_counter()
+        templates = self.find_templates(input_dir, output_dir, pattern)
+        tasks = []
+        for index, input_path in enumerate(templates):
+            output_path = os.path.join(output_dir, os.path.relpath(input_path, input_dir))
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            tasks.append((index, input_path, output_path, system_size, generate_variants))
+
+        workers = min(workers or os.cpu_count() or 1, len(tasks)) or 1
+        if workers == 1:
+            results = [_timed(self.service, *task[1:]) for task in tasks]
+        else:
+            results = self._process_in_pool(tasks, workers)
+
+        successful = sum(1 for result in results if result.get('success', False))
+        failed = len(results) - successful
+        elapsed = time.perf_counter() - started
+        return {
+            'success': failed == 0,
+            'input_dir': input_dir,
+            'output_dir': output_dir,
+            'results': results,
+            'total': len(results),
+            'successful': successful,
+            'failed': failed,
+            'workers': workers,
+            'elapsed': elapsed,
+            'cpu_time': sum(result['cpu_time'] for result in results),
+            'message': f'Processed {successful}/{len(results)} templates successfully in {elapsed:.1f}s'
+        }
+
+    def _process_in_pool(self, tasks: List[Tuple[int, str, str, str, Any]],
+                         workers: int) -> List[Dict[str, Any]]:
+        svc = self.service
+        # Workers must not race on the profile file, the parent writes it and the caches
+        config = dict(svc.config, profile_output=None)
+        if config['block_cache_path']:
+            svc._load_block_cache()
+        method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+        context = multiprocessing.get_context(method)
+        tasks = sorted(tasks, key=lambda task: os.path.getsize(task[1]), reverse=True)
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tasks)
+        with context.Pool(workers, _init_worker,
+                          (type(svc), config, svc.map_path_mrcf, svc.map_path_helm,
+                           svc.mrcf_flavor_defaults, svc.knowledge_sources, svc.block_cache)) as pool:
+            for index, result, verdicts, blocks in pool.imap_unordered(_process_task, tasks):
+                results[index] = result
+                if svc.verdict_cache is not None:
+                    svc.verdict_cache.merge(verdicts)
+                svc.block_cache.merge(blocks)
+                if svc.config['verbose']:
+                    print(f"{'✓' if result.get('success') else '✗'} {result['input_path']} "
+                          f"({result['elapsed']:.2f}s)")
+        return results
@@ -0,0 +1,220 @@
+"""
+Helm Values - Parallel ingestion of the values.yaml files of a chart tree
+Files are parsed in worker processes, their flattened leaves cached on disk
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from box import Box, __version__ as BOX_VERSION
+
+try:
+    from ai_platform.common.util.yaml_block_cache import YAMLBlockCache, block_key
+except ImportError:
+    from common.util.yaml_block_cache import YAMLBlockCache, block_key
+
+# Leaf of a values file: full key path, value, merged by value (string mapping values) or replacing
+HelmLeaf = Tuple[str, Any, bool]
+
+
+def helm_leaves(node, prev_key: Optional[str], delim: str) -> Iterator[HelmLeaf]:
+    """Leaves of a values tree in depth-first order, walked with an explicit stack.
+
+    String mapping values are merged with the values other files have for
+    their path, every other leaf replaces what the path had.
+    """
+    # Iterators over (key path, child, child is a list item) of the open nodes
+    stack = [_children(node, prev_key, delim)]
+    while stack:
+        for kk, value, in_list in stack[-1]:
+            if in_list and isinstance(value, (str, int, float, bool)):
+                yield kk, value, False
+            elif isinstance(value, (dict, list)):
+                stack.append(_children(value, kk, delim))
+                break
+            elif in_list:
+                print(f"loop_through_nodes error: unexpected node type {type(value)}")
+            elif isinstance(value, str):
+                yield kk, value.replace("\n", "\\n") if value.find("\n") != -1 else value, True
+            else:
+                yield kk, value, False
+        else:
+            stack.pop()
+
+
+def _children(node, prev_key: Optional[str], delim: str) -> Iterator[Tuple[str, Any, bool]]:
+    """(key path, child, child is a list item) of a mapping or list node."""
+    if isinstance(node, list):
+        for item_num, val in enumerate(node):
+            yield (prev_key or "") + f"[{item_num}]", val, True
+        return
+    if not isinstance(node, dict):
+        print(f"loop_through_nodes error: unexpected node type {type(node)}")
+        return
+
+    for key, value in node.items():
+        safe_key = str(key)
+        if isinstance(key, bool):
+            safe_key = 'true' if key else 'false'
+
+        if delim in safe_key or "." in safe_key or "/" in safe_key:
+            safe_key = "(" + safe_key + ")"
+
+        if prev_key is not None:
+            kk = str(prev_key) + delim + str(safe_key)
+        else:
+            kk = str(safe_key)
+
+        if delim == '/' and not kk.startswith(delim):
+            kk = delim + kk
+        yield kk, value, False
+
+
+class HelmMapBuilder:
+    """Adds leaves to a map_path_helm, each path's values and their files kept as dicts.
+
+    The map entries are {"values": [...], "files": [[...], ...]}, files[i]
+    listing the charts that have values[i]. Looking values and files up
+    in lists makes keys shared by many charts quadratic, so the builder
+    keeps value -> {file: None} per path and writes the list shape back
+    in finish(). Entries the map already had are taken over on first use.
+    """
+
+    def __init__(self, map_path_helm: Dict):
+        self.map_path_helm = map_path_helm
+        self._values: Dict[str, Dict[Any, Dict[str, None]]] = {}
+
+    def add(self, kk: str, value: Any, by_value: bool, path: str):
+        """Record one leaf of the values file at path."""
+        values = self._values.get(kk) if by_value else None
+        if values is None:
+            entry = self.map_path_helm.get(kk) if by_value else None
+            values = {}
+            if isinstance(entry, dict):
+                for known, files in zip(entry.get("values", []), entry.get("files", [])):
+                    values[known] = dict.fromkeys(files)
+            self._values[kk] = values
+        files = values.get(value)
+        if files is None:
+            values[value] = {path: None}
+        else:
+            files[path] = None
+
+    def finish(self) -> Dict:
+        """Write the recorded paths to the map in its list shape, returns the map."""
+        for kk, values in self._values.items():
+            self.map_path_helm[kk] = {"values": list(values), "files": [list(files) for files in values.values()]}
+        self._values.clear()
+        return self.map_path_helm
+
+
+def load_values_file(file_path: str, encoding: str) -> Box:
+    """Parsed values.yaml, duplicate keys allowed."""
+    return Box.from_yaml(
+        yaml_string=None,
+        filename=file_path,
+        encoding=encoding,
+        errors="strict",
+        box_duplicates='ignore',
+        allow_duplicate_keys=None,
+        ruamel_attrs={"allow_duplicate_keys": None}
+    )
+
+
+def _flatten_file(task: Tuple[int, str, str, str]) -> Tuple[int, Any]:
+    """Leaves of one values file in a worker, or the exception parsing it raised."""
+    index, file_path, encoding, delim = task
+    try:
+        return index, [list(leaf) for leaf in helm_leaves(load_values_file(file_path, encoding), None, delim)]
+    except Exception as e:
+        return index, e
+
+
+class HelmValuesLoader:
+    """Helm values of a chart tree merged into a path map, as _loop_through_nodes builds it.
+
+    Every values.yaml is parsed and flattened on its own, in a process pool
+    when more than one needs parsing, then the leaves are merged file by
+    file in chart tree order, subcharts sorted by name. Flattened files are
+    kept in the service's Helm cache, keyed by path, size, mtime and
+    content hash, so files that did not change are not parsed again.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        # (cache key, chart path) of every file of the last load
+        self.file_keys: List[Tuple[str, str]] = []
+
+    def find_values_files(self, path: str) -> List[Tuple[str, str]]:
+        """(file path, chart path) of every values.yaml under path, in tree order."""
+        delim = self.service.config['delimiter']
+        found = []
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            if 'values.yaml' in files:
+                path_clean = str(root).replace("\\", "/").replace("/charts/", delim)
+                if path_clean.startswith("./"):
+                    path_clean = path_clean[2:]
+                found.append((str(root) + os.sep + 'values.yaml', path_clean))
+        return found
+
+    def load(self, path: str, map_path_helm: Dict) -> Dict[str, int]:
+        """Merge the values files under path into map_path_helm, returns the file counts."""
+        svc = self.service
+        cache: YAMLBlockCache = svc.helm_cache
+        encoding, delim = svc.config['encoding'], svc.config['delimiter']
+        files = self.find_values_files(path)
+
+        keys: List[Optional[str]] = []
+        leaves: List[Any] = []
+        for file_path, _ in files:
+            key = self._file_key(file_path, encoding, delim)
+            keys.append(key)
+            leaves.append(cache.get(key))
+
+        missing = [(index, file_path, encoding, delim)
+                   for index, (file_path, _) in enumerate(files) if leaves[index] is None]
+        for index, result in self._flatten(missing):
+            leaves[index] = result
+            if not isinstance(result, Exception) and _json_safe(result):
+                cache.put(keys[index], result)
+
+        builder = HelmMapBuilder(map_path_helm)
+        try:
+            for (file_path, path_clean), file_leaves in zip(files, leaves):
+                if isinstance(file_leaves, Exception):
+                    raise file_leaves
+                for kk, value, by_value in file_leaves:
+                    builder.add(kk, value, by_value, path_clean)
+        finally:
+            builder.finish()
+        self.file_keys = [(key, path_clean) for key, (_, path_clean) in zip(keys, files)]
+        return {'files': len(files), 'files_parsed': len(missing)}
+
+    def _flatten(self, tasks: List[Tuple[int, str, str, str]]) -> List[Tuple[int, Any]]:
+        workers = min(self.service.config['helm_workers'] or os.cpu_count() or 1, len(tasks))
+        if workers <= 1:
+            return [_flatten_file(task) for task in tasks]
+        method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+        # Largest files first so a big one does not finish the pool alone
+        tasks = sorted(tasks, key=lambda task: os.path.getsize(task[1]), reverse=True)
+        with multiprocessing.get_context(method).Pool(workers) as pool:
+            return list(pool.imap_unordered(_flatten_file, tasks))
+
+    @staticmethod
+    def _file_key(file_path: str, encoding: str, delim: str) -> str:
+        stat = os.stat(file_path)
+        with open(file_path, 'rb') as f:
+            digest = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+        return block_key('helm-values', BOX_VERSION, os.path.abspath(file_path),
+                         stat.st_size, stat.st_mtime_ns, digest, encoding, delim)
+
+
+def _json_safe(leaves: List[list]) -> bool:
+    """Leaves survive a JSON round trip unchanged, dates and the like are not cached."""
+    try:
+        return json.loads(json.dumps(leaves)) == leaves
+    except (TypeError, ValueError):
+        return False
@@ -0,0 +1,135 @@
+"""
+Incremental Blocks - Reprocessing only the top-level blocks of a template that changed
+Block results come from a YAMLBlockCache, the changed blocks go through the section stages
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from ai_platform.common.util.yaml_block_cache import YAMLBlockCache, block_key
+    from ai_platform.common.util.yaml_sections import iter_sections
+except ImportError:
+    from common.util.yaml_block_cache import YAMLBlockCache, block_key
+    from common.util.yaml_sections import iter_sections
+from .section_stream import fix_section_indentation, lint_fix_section, uncomment_section
+
+# Bump when a change to the section stages changes their results
+STAGES_VERSION = 1
+# Options that do not change the result of a block
+_RUN_OPTIONS = frozenset({
+    'debug', 'verbose', 'force_rewriting', 'variants', 'variant_fork_threshold',
+    'stop_on_ruamel_error', 'stop_on_pyyaml_error', 'windowed_relint', 'streaming',
+    'verdict_cache', 'verdict_cache_path', 'block_cache_path', 'mrcf_index_path', 'helm_cache_path',
+    'helm_workers', 'compact_paths', 'profile', 'profile_stage', 'profile_output',
+})
+
+
+class IncrementalBlockProcessor:
+    """Main, fixed and values-set content of a template, block by block through a cache.
+
+    Blocks are the top-level sections streaming mode works on and go
+    through the same stages, so the results are those of streaming mode.
+    A block is uncommented again only if its rows or the commented JSON
+    block state it starts in changed. It is fixed again only if its
+    uncommented rows, the row following it or the lint state carried from
+    the blocks before it changed; that state holds the top-level keys seen
+    so far, so adding or removing a top-level key refixes the blocks after
+    it. Every key includes the configuration, the fix stage also the
+    digests of the MRCF/Helm sources and the system size.
+    """
+
+    def __init__(self, service, cache: YAMLBlockCache):
+        self.service = service
+        self.cache = cache
+
+    def process(self, content: str, template_name: str,
+                system_size: str) -> Tuple[str, str, str, Dict[str, int]]:
+        """(main, fixed, values-set) content and the block counts of content."""
+        svc = self.service
+        config = block_key(STAGES_VERSION, {key: value for key, value in svc.config.items()
+                                            if key not in _RUN_OPTIONS})
+        uncomment = "#" in content and svc._has_commented_rows(content)
+        rows = content.split('\n')
+        if uncomment and not content.endswith('\n'):
+            # Uncommenting ends the content with a newline
+            rows.append('')
+
+        blocks = list(iter_sections(rows))
+        reused = [True] * len(blocks)
+        if uncomment:
+            block_state: Dict[str, Any] = {}
+            for index, block in enumerate(blocks):
+                key = block_key('uncomment', config, index == 0, block_state, block)
+                entry = self.cache.get(key)
+                if entry is None:
+                    reused[index] = False
+                    block = uncomment_section(svc, block, index == 0, block_state, template_name)
+                    entry = {'rows': block, 'block_state': dict(block_state)}
+                    self.cache.put(key, entry)
+                blocks[index] = entry['rows']
+                block_state = dict(entry['block_state'])
+
+        knowledge = _knowledge_key(svc)
+        carry: Dict[str, Any] = {}
+        texts: Dict[str, List[str]] = {'main': [], 'fixed': [], 'values': []}
+        for index, block in enumerate(blocks):
+            next_row = blocks[index + 1][0] if index + 1 < len(blocks) else None
+            states = carry.get('states')
+            key = block_key('fix', config, knowledge, system_size, uncomment,
+                            next_row if uncomment else next_row is None, _states_json(states), block)
+            entry = self.cache.get(key)
+            if entry is None:
+                reused[index] = False
+                entry = self._fix_block(block, next_row, uncomment, system_size, carry)
+                self.cache.put(key, entry)
+            if entry['states'] is not None:
+                carry['states'] = _carried(states, entry['states'])
+            for name in texts:
+                texts[name].append(entry[name])
+
+        counts = {'blocks': len(blocks), 'blocks_reused': sum(reused)}
+        return '\n'.join(texts['main']), '\n'.join(texts['fixed']), '\n'.join(texts['values']), counts
+
+    def _fix_block(self, rows: List[str], next_row: Optional[str], uncomment: bool,
+                   system_size: str, carry: Dict[str, Any]) -> Dict[str, Any]:
+        """Cache entry of one block, the lint state it passes on as keys added per pass."""
+        svc = self.service
+        if uncomment:
+            rows = fix_section_indentation(svc, rows, next_row)
+        main = '\n'.join(rows)
+
+        states = carry.get('states')
+        fixed = lint_fix_section(svc, rows, next_row is None, carry)
+        values = fixed
+        if "{{" in fixed and "}}" in fixed:
+            with svc.stage_hooks.stage('value_fix', len(rows)):
+                values = svc._fix_values_comprehensive(fixed, system_size)
+
+        passes = None
+        if carry.get('states') is not states:
+            base = states or [(None, None, frozenset())]
+            passes = [[broken, pending_column, sorted(root_keys - base[min(i, len(base) - 1)][2])]
+                      for i, (broken, pending_column, root_keys) in enumerate(carry['states'])]
+        return {'main': main, 'fixed': fixed, 'values': values, 'states': passes}
+
+
+def _knowledge_key(service) -> str:
+    """Key of the MRCF/Helm knowledge, from the digests of the sources it was loaded from.
+
+    Maps set directly, with no source loaded, are hashed themselves.
+    """
+    if service.knowledge_sources:
+        return block_key('sources', list(service.knowledge_sources.items()))
+    return block_key('maps', service.map_path_mrcf, service.map_path_helm)
+
+
+def _states_json(states: Optional[List[Tuple]]) -> Optional[List[list]]:
+    if states is None:
+        return None
+    return [[broken, pending_column, sorted(root_keys)] for broken, pending_column, root_keys in states]
+
+
+def _carried(states: Optional[List[Tuple]], passes: List[list]) -> List[Tuple]:
+    """Lint state after a block, from the state before it and the keys it added."""
+    base = states or [(None, None, frozenset())]
+    return [(broken, pending_column, base[min(i, len(base) - 1)][2] | frozenset(added))
+            for i, (broken, pending_column, added) in enumerate(passes)]
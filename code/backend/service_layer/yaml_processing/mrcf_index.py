@@ -0,0 +1,111 @@
+"""
+MRCF Index - Compiled MRCF parameter index persisted between runs
+Normalized paths and per-flavor defaults, stored as one pickle checked against the MRCF content
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+INDEX_FORMAT = 1
+
+
+def normalize_mrcf_path(path: str) -> str:
+    """MRCF parameter path without its list indexes."""
+    return path.replace("[N]", "").replace("[0]", "").replace("[1]", "").replace("[2]", "")
+
+
+def compile_mrcf_index(mrcf_json: Dict[str, Any], system_size_mapping: Dict[str, str]) -> Dict[str, Any]:
+    """Index of a parsed MRCF: normalized path -> parameter, and the per-flavor defaults.
+
+    flavor_defaults holds for every path the value MRCF.default_per_flavor
+    picks per system size, an empty dict for parameters without per-flavor
+    defaults.
+    """
+    parameters = {}
+    for param in mrcf_json.get("parameters", []):
+        if "path" not in param:
+            print("FATAL ERROR: missing 'path' field in parameter:")
+            continue
+        parameters[normalize_mrcf_path(param["path"])] = param
+
+    flavor_defaults = {}
+    for path, param in parameters.items():
+        if any(isinstance(key, str) and key.startswith("default_") for key in param):
+            flavor_defaults[path] = {size: param.get(mapped) for size, mapped in system_size_mapping.items()}
+        else:
+            flavor_defaults[path] = {}
+    return {'parameters': parameters, 'flavor_defaults': flavor_defaults}
+
+
+class MRCFIndexStore:
+    """Compiled MRCF indexes, from memory, from the index file or compiled from the MRCF.
+
+    The index file holds the index of the last MRCF compiled with it and
+    the size, mtime and content hash of that MRCF. An index is reused
+    while the size and mtime match, or the content hash does if they do
+    not, and while system_size_mapping is the one it was compiled for.
+    """
+
+    def __init__(self):
+        self._memory: Dict[str, Dict[str, Any]] = {}
+
+    def load(self, mrcf_path: str, index_path: Optional[str], encoding: str,
+             system_size_mapping: Dict[str, str]) -> Tuple[Dict[str, Any], bool]:
+        """(index of mrcf_path, whether the MRCF had to be compiled)."""
+        source = os.path.abspath(mrcf_path)
+        stat = os.stat(source)
+
+        def usable(index):
+            return index is not None and index['source'] == source and index['mapping'] == system_size_mapping
+
+        stored = self._memory.get(source)
+        if not (usable(stored) and (stored['size'], stored['mtime_ns']) == (stat.st_size, stat.st_mtime_ns)):
+            from_file = _read_index(index_path)
+            if usable(from_file):
+                stored = from_file
+        if usable(stored) and (stored['size'], stored['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+            self._memory[source] = stored
+            return stored, False
+
+        with open(source, 'rb') as f:
+            data = f.read()
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        compiled = not (usable(stored) and stored['digest'] == digest)
+        if compiled:
+            stored = dict(compile_mrcf_index(json.loads(data.decode(encoding)), system_size_mapping),
+                          source=source, mapping=dict(system_size_mapping), digest=digest)
+        index = dict(stored, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        self._memory[source] = index
+        if index_path:
+            _write_index(index, index_path)
+        return index, compiled
+
+
+def _read_index(index_path: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Index stored at index_path, None if there is none of this format."""
+    if not index_path or not os.path.exists(index_path):
+        return None
+    try:
+        with open(index_path, 'rb') as f:
+            index = pickle.loads(f.read())
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    return index if isinstance(index, dict) and index.get('format') == INDEX_FORMAT else None
+
+
+def _write_index(index: Dict[str, Any], index_path: str):
+    """Write an index to index_path atomically."""
+    directory = os.path.dirname(os.path.abspath(index_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(dict(index, format=INDEX_FORMAT), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
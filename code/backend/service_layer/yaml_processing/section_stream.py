@@ -0,0 +1,373 @@
+"""
+Section Stream - Bounded-memory processing of very large YAML templates
+Runs the process_yaml_template stages over one top-level section at a time
+"""
+import itertools
+import os
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import yaml
+
+try:
+    from ai_platform.common.util.yaml_sections import iter_sections
+except ImportError:
+    from common.util.yaml_sections import iter_sections
+from .artifact_sink import output_mode
+from .variant_rewriter import VARIANT_SUFFIXES
+
+_part_ids = itertools.count()
+# Closes a section for ruamel the way the next top-level key would
+_SECTION_END = '__section_stream_end__: 0'
+
+
+def iter_file_rows(path: str, encoding: str, final_newline: bool = False) -> Iterator[str]:
+    """Rows of a file as content.split('\\n') gives them, read line by line.
+
+    final_newline adds the empty last row the file would have if it ended
+    with a newline.
+    """
+    with open(path, 'r', encoding=encoding) as f:
+        ended = True
+        for line in f:
+            ended = line.endswith('\n')
+            yield line[:-1] if ended else line
+        if ended or final_newline:
+            yield ''
+
+
+def uncomment_section(service, rows: List[str], first: bool, block_state: Dict[str, Any],
+                      template_name: str) -> List[str]:
+    """Uncommented rows of one section, block_state carries to the next section."""
+    with service.stage_hooks.stage('preprocess', len(rows)):
+        content = service._preprocess_yaml_file2('\n'.join(rows) + '\n', block_state)
+        content = service._preprocess_yaml_file2b(content)
+    with service.stage_hooks.stage('block_processing', len(rows)):
+        content = service._process_yaml_file2(content, template_name)
+        content = service._postprocess_yaml_file2(content)
+    # Uncommenting keeps the rows, they come back between '\n' and '\n'
+    rows = content[1:].split('\n')[:-1]
+    return [''] + rows if first else rows
+
+
+def fix_section_indentation(service, rows: List[str], next_row: Optional[str]) -> List[str]:
+    """Indentation check of an uncommented section, seeing the first row of the next one."""
+    lookahead = [] if next_row is None else [next_row]
+    with service.stage_hooks.stage('indentation_fix', len(rows)):
+        return service._check_and_fix_indentation_level('\n'.join(rows + lookahead)).split('\n')[:len(rows)]
+
+
+def lint_fix_section(service, rows: List[str], last: bool, carry: Dict[str, Any]) -> str:
+    """Lint fixes of one section, carry is passed on from section to section."""
+    rows = list(rows)
+    try:
+        with service.stage_hooks.stage('lint_fix', len(rows)):
+            return service.lint_fixer.fix_section(rows, service._fix_lint_problems,
+                                                  service.config['max_errors_to_fix'], carry, last)
+    except Exception as e:
+        if service.config['debug']:
+            print(f"YAML error fixing failed: {e}")
+        return "\n".join(rows)
+
+
+class SectionOutput:
+    """Output file written section by section.
+
+    Text goes to a part file next to the target, close() moves it in place
+    or drops it.
+    """
+
+    def __init__(self, path: str, encoding: str):
+        self.path = path
+        self.encoding = encoding
+        self.changed = False
+        self._part_path = f"{path}.{os.getpid()}-{next(_part_ids)}.part"
+        self._file = open(self._part_path, 'w', encoding=encoding, newline='\n')
+
+    def write(self, text: str):
+        self._file.write(text)
+
+    def close(self, keep: bool = True) -> bool:
+        """Finish the file, returns whether it was kept."""
+        if self._file.closed:
+            return False
+        self._file.close()
+        if keep:
+            os.chmod(self._part_path, output_mode(self.path))
+            os.replace(self._part_path, self.path)
+        else:
+            os.remove(self._part_path)
+        return keep
+
+
+class _VariantOutput(SectionOutput):
+    """Rewritten variant built from the sections one by one.
+
+    A variant the whole document would fail to load for is written empty,
+    one whose generation raises is dropped, as _generate_rewritten_variants
+    does for the whole document.
+    """
+
+    def __init__(self, path: str, service):
+        super().__init__(path, service.config['encoding'])
+        self.service = service
+        self.failed = False
+        self.empty = False
+        self._last: Optional[Tuple[str, Any]] = None
+
+    def add_section(self, text: str, last: bool, reuse: Optional['_VariantOutput'] = None):
+        """Add the rewrite of one section, taken from reuse if it just did the same text."""
+        if self.failed or self.empty:
+            return
+        if reuse is not None and reuse._last is not None and reuse._last[0] == text:
+            converted = reuse._last[1]
+        else:
+            try:
+                converted = self._convert(text, last)
+            except Exception as e:
+                if self.service.config['debug']:
+                    print(f"{self.name} variant generation failed: {e}")
+                self.failed = True
+                return
+        self._last = (text, converted)
+        self._add(converted)
+
+    def finish(self) -> bool:
+        """Close the variant, returns whether it was kept."""
+        if self.empty and not self._file.closed:
+            self._file.seek(0)
+            self._file.truncate()
+        return self.close(keep=not self.failed)
+
+    def close(self, keep: bool = True) -> bool:
+        self._last = None
+        return super().close(keep)
+
+
+class RuamelVariantOutput(_VariantOutput):
+    """Ruamel rewrite, the section dumps follow each other."""
+
+    name = "Ruamel"
+
+    def _convert(self, text: str, last: bool) -> str:
+        svc = self.service
+        if last:
+            return svc._postprocess_yaml_file1(svc._process_yaml_file1(text))
+        # Blank rows and comments closing the section are kept only before another key
+        converted = svc._postprocess_yaml_file1(svc._process_yaml_file1(text + '\n' + _SECTION_END))
+        if converted and not converted.endswith(_SECTION_END + '\n'):
+            raise ValueError("section end marker missing from the dump")
+        return converted[:-len(_SECTION_END) - 1]
+
+    def _add(self, converted: str):
+        if not converted:
+            self.empty = True
+        else:
+            self.write(converted)
+
+
+class PyYAMLVariantOutput(_VariantOutput):
+    """PyYAML rewrite, top-level keys sorted across all sections.
+
+    yaml.dump() sorts the top-level keys of the whole document, so every
+    key is dumped on its own into a spill file and the keys are put in
+    order when the variant is finished. Only the keys stay in memory.
+    """
+
+    name = "PyYAML"
+
+    def __init__(self, path: str, service):
+        super().__init__(path, service)
+        self._spill = tempfile.TemporaryFile()
+        self._index: Dict[Any, Tuple[int, int]] = {}
+        self._root: Any = None
+        self._documents = 0
+
+    def _convert(self, text: str, last: bool) -> Tuple[bool, Any, List[Tuple[Any, bytes]]]:
+        svc = self.service
+        loaded, data = svc._load_yaml_file0(svc._preprocess_yaml_file0(text))
+        chunks = []
+        if isinstance(data, dict):
+            chunks = [(key, yaml.dump({key: value}).encode(self.encoding)) for key, value in data.items()]
+        return loaded, data, chunks
+
+    def _add(self, converted: Tuple[bool, Any, List[Tuple[Any, bytes]]]):
+        loaded, data, chunks = converted
+        if not loaded:
+            self.empty = True
+            return
+        if data is None:
+            return
+        self._documents += 1
+        if not isinstance(data, dict) or self._root is not None:
+            if self._documents > 1:
+                # Sections that are not all mappings do not load as one document
+                print("CRITICAL! PYYAML ERROR ON LOADING YAML CONTENT: %s",
+                      "top-level sections do not form one mapping")
+                self.empty = True
+                return
+            self._root = data
+        for key, chunk in chunks:
+            offset = self._spill.seek(0, os.SEEK_END)
+            self._spill.write(chunk)
+            self._index[key] = (offset, len(chunk))
+
+    def finish(self) -> bool:
+        if not (self.failed or self.empty):
+            try:
+                if self._root is not None:
+                    self.write(yaml.dump(self._root))
+                elif not self._index:
+                    self.write(yaml.dump({} if self._documents else None))
+                else:
+                    keys = list(self._index)
+                    try:
+                        keys = sorted(keys)
+                    except TypeError:
+                        pass
+                    for key in keys:
+                        offset, length = self._index[key]
+                        self._spill.seek(offset)
+                        self.write(self._spill.read(length).decode(self.encoding))
+            except Exception as e:
+                if self.service.config['debug']:
+                    print(f"{self.name} variant generation failed: {e}")
+                self.failed = True
+        return super().finish()
+
+    def close(self, keep: bool = True) -> bool:
+        self._spill.close()
+        self._index.clear()
+        return super().close(keep)
+
+
+class SectionStreamProcessor:
+    """process_yaml_template over one top-level section at a time.
+
+    Sections are split where an uncommented key starts at column 0, rows
+    before the first key go with the first section. Each stage gets what
+    it would see of the whole document: uncommenting carries the commented
+    JSON block state, the indentation check sees the first row of the next
+    section, the lint fix loop carries the top-level keys and whether the
+    document broke, and the PyYAML variant sorts keys across sections.
+    Anchors and aliases are resolved within their section only.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.uncomment = False
+        self.lint_carry: Dict[str, Any] = {}
+        self.outputs: List[SectionOutput] = []
+        self.main: Optional[SectionOutput] = None
+        self.fixed: Optional[SectionOutput] = None
+        self.values: Optional[SectionOutput] = None
+        self.variants: List[_VariantOutput] = []
+        self.value_variants: List[_VariantOutput] = []
+
+    def process(self, input_path: str, output_path: str, system_size: str,
+                fixed_variants: Sequence[str] = (), value_variants: Sequence[str] = ()) -> Dict[str, Any]:
+        """Process input_path into output_path and its companion files, section by section.
+
+        fixed_variants and value_variants name the rewritten variants written
+        for the fixed and for the values-set content.
+        """
+        svc = self.service
+        encoding = svc.config['encoding']
+        values_path = output_path.replace('.yaml', '_values_set.yaml')
+        self.uncomment = any(row.lstrip().startswith("#") for row in iter_file_rows(input_path, encoding))
+        self.lint_carry = {}
+        self.outputs = []
+
+        try:
+            self.main = self._open(SectionOutput(output_path, encoding))
+            self.fixed = self._open(SectionOutput(output_path.replace('.yaml', '_fixed.yaml'), encoding))
+            self.variants = self._open_variants(output_path, fixed_variants)
+            self.values = self._open(SectionOutput(values_path, encoding))
+            self.value_variants = self._open_variants(values_path, value_variants)
+
+            sections = self._document_sections(input_path)
+            count = 0
+            previous = next(sections)
+            for current in sections:
+                self._write_section(previous, count, current[0], system_size)
+                previous = current
+                count += 1
+            self._write_section(previous, count, None, system_size)
+            count += 1
+        except BaseException:
+            for output in self.outputs:
+                output.close(keep=False)
+            raise
+
+        files_generated = [self.main.path]
+        self.main.close()
+        if self.fixed.close(keep=self.fixed.changed):
+            files_generated.append(self.fixed.path)
+        files_generated.extend(variant.path for variant in self.variants if variant.finish())
+        if self.values.close(keep=self.values.changed):
+            files_generated.append(self.values.path)
+            files_generated.extend(variant.path for variant in self.value_variants if variant.finish())
+        else:
+            for variant in self.value_variants:
+                variant.close(keep=False)
+
+        return {
+            'success': True,
+            'input_path': input_path,
+            'output_path': output_path,
+            'files_generated': files_generated,
+            'sections': count,
+        }
+
+    def _open(self, output: SectionOutput) -> SectionOutput:
+        self.outputs.append(output)
+        return output
+
+    def _open_variants(self, base_path: str, names: Sequence[str]) -> List[_VariantOutput]:
+        classes = {'ruamel': RuamelVariantOutput, 'pyyaml': PyYAMLVariantOutput}
+        return [self._open(classes[name](base_path.replace('.yaml', VARIANT_SUFFIXES[name]), self.service))
+                for name in names]
+
+    def _document_sections(self, input_path: str) -> Iterator[List[str]]:
+        """Rows of the uncommented document, one top-level section at a time."""
+        svc = self.service
+        rows_in = iter_file_rows(input_path, svc.config['encoding'], final_newline=self.uncomment)
+        block_state: Dict[str, Any] = {}
+        for index, rows in enumerate(iter_sections(rows_in)):
+            if not self.uncomment:
+                yield rows
+                continue
+            yield uncomment_section(svc, rows, index == 0, block_state, input_path)
+
+    def _write_section(self, rows: List[str], index: int, next_row: Optional[str], system_size: str):
+        svc = self.service
+        if self.uncomment:
+            rows = fix_section_indentation(svc, rows, next_row)
+
+        separator = '' if index == 0 else '\n'
+        content = '\n'.join(rows)
+        self.main.write(separator + content)
+
+        fixed_content = lint_fix_section(svc, rows, next_row is None, self.lint_carry)
+        self.fixed.write(separator + fixed_content)
+        self.fixed.changed |= fixed_content != content
+        content = fixed_content
+
+        hooks = svc.stage_hooks
+        if self.variants:
+            with hooks.stage('variants', len(rows)):
+                for variant in self.variants:
+                    variant.add_section(content, next_row is None)
+
+        values_content = content
+        if "{{" in content and "}}" in content:
+            with hooks.stage('value_fix', len(rows)):
+                values_content = svc._fix_values_comprehensive(content, system_size)
+        self.values.write(separator + values_content)
+        self.values.changed |= values_content != content
+        # Sections without placeholders take the rewrite made for the fixed content
+        made = {type(variant): variant for variant in self.variants}
+        if self.value_variants:
+            with hooks.stage('variants', len(rows)):
+                for variant in self.value_variants:
+                    variant.add_section(values_content, next_row is None, made.get(type(variant)))
@@ -0,0 +1,97 @@
+"""
+Variant Rewriter - Rewritten ruamel/PyYAML variants on demand
+Only requested variants are made, large contents rewritten in parallel
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+# Variant name -> suffix replacing '.yaml' in the output path
+VARIANT_SUFFIXES = {
+    'ruamel': '_rewritten_ruamel.yaml',
+    'pyyaml': '_rewritten_pyyaml.yaml',
+}
+VARIANT_LABELS = {'ruamel': 'Ruamel', 'pyyaml': 'PyYAML'}
+# Variant name -> artifact name of the in-memory result
+VARIANT_ARTIFACTS = {name: suffix[1:-len('.yaml')] for name, suffix in VARIANT_SUFFIXES.items()}
+
+# Service whose rewrite a forked child runs, set right before forking
+_forked_rewriter = None
+
+
+def _rewrite_in_child(name: str, content: str) -> str:
+    return _forked_rewriter._rewrite(name, content)
+
+
+def variant_plan(generate_variants: Union[bool, Iterable[str]], config: Dict) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Variants to write for the fixed content and for the values-set content.
+
+    True writes config['variants'] for both, False writes them for the fixed
+    content only when force_rewriting is on, a list of names writes exactly
+    those variants for both.
+    """
+    if isinstance(generate_variants, bool):
+        names = tuple(config['variants'])
+        if generate_variants:
+            return names, names
+        return (names if config['force_rewriting'] else ()), ()
+    names = tuple(generate_variants)
+    unknown = [name for name in names if name not in VARIANT_SUFFIXES]
+    if unknown:
+        raise ValueError(f"Unknown rewritten variants: {', '.join(unknown)}")
+    return names, names
+
+
+class VariantRewriter:
+    """Rewrites YAML content with ruamel or PyYAML.
+
+    When several variants of a large content are needed at once, PyYAML
+    runs in a forked child while ruamel runs here, the two loaders are pure
+    Python and would otherwise take turns on the GIL. Daemonic processes,
+    like the process_directory workers, cannot fork children and rewrite
+    one variant after the other.
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    def rewrite(self, name: str, content: str) -> str:
+        """Variant name of content."""
+        return self.rewrite_all([name], content)[name]
+
+    def rewrite_all(self, names: Iterable[str], content: str) -> Dict[str, Union[str, Exception]]:
+        """Every requested variant of content, or the exception that stopped it."""
+        names = list(names)
+        results: Dict[str, Union[str, Exception]] = {}
+        executor = self._child_executor(names, content)
+        try:
+            future = executor.submit(_rewrite_in_child, 'pyyaml', content) if executor else None
+            # The forked variant is collected last, after the ones made here
+            for name in sorted(names, key=lambda name: future is not None and name == 'pyyaml'):
+                try:
+                    results[name] = future.result() if future and name == 'pyyaml' else self._rewrite(name, content)
+                except Exception as e:
+                    results[name] = e
+        finally:
+            if executor:
+                executor.shutdown()
+        return {name: results[name] for name in names}
+
+    def _child_executor(self, names, content: str) -> Optional[ProcessPoolExecutor]:
+        global _forked_rewriter
+        if (len(names) < 2 or 'pyyaml' not in names
+                or len(content) < self.service.config['variant_fork_threshold']
+                or 'fork' not in multiprocessing.get_all_start_methods()
+                or multiprocessing.current_process().daemon or (os.cpu_count() or 1) < 2):
+            return None
+        _forked_rewriter = self
+        return ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('fork'))
+
+    def _rewrite(self, name: str, content: str) -> str:
+        svc = self.service
+        if name == 'ruamel':
+            return svc._postprocess_yaml_file1(svc._process_yaml_file1(content))
+        if name == 'pyyaml':
+            return svc._process_yaml_file0(svc._preprocess_yaml_file0(content))
+        raise ValueError(f"Unknown rewritten variant: {name}")
@@ -2,19 +2,71 @@
 YAML Processing Service - Full Integration
 Complete merge of uncomment-00 functionality into AI Platform
 """
+import contextlib
 import io
 import re
-import os
 import json
 import glob
 import yaml
 from ruamel import yaml as yml
 from yamllint.config import YamlLintConfig
-from yamllint import linter
-from box import Box
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, Iterator, List, Optional, Any, Tuple, Union
 from pathlib import Path
 
+try:
+    from ai_platform.common.util.yaml_validity_checker import IncrementalYAMLChecker
+    from ai_platform.common.util.yaml_verdict_cache import YAMLVerdictCache, scalar_verdict, shared_verdict_cache
+    from ai_platform.common.util.yaml_fast_path import PROBE_ERROR, probe_yaml_structure
+    from ai_platform.common.util.yaml_lint_windows import WindowedYAMLLinter
+    from ai_platform.common.util.pattern_matcher import multi_replacer, pattern_matcher
+    from ai_platform.common.util.yaml_block_cache import YAMLBlockCache
+    from ai_platform.common.util.stage_profiler import StageHooks, StageProfiler, write_profile
+    from ai_platform.common.util.path_store import PathStore
+except ImportError:
+    from common.util.yaml_validity_checker import IncrementalYAMLChecker
+    from common.util.yaml_verdict_cache import YAMLVerdictCache, scalar_verdict, shared_verdict_cache
+    from common.util.yaml_fast_path import PROBE_ERROR, probe_yaml_structure
+    from common.util.yaml_lint_windows import WindowedYAMLLinter
+    from common.util.pattern_matcher import multi_replacer, pattern_matcher
+    from common.util.yaml_block_cache import YAMLBlockCache
+    from common.util.stage_profiler import StageHooks, StageProfiler, write_profile
+    from common.util.path_store import PathStore
+from .artifact_sink import MAIN_ARTIFACT, ArtifactSink
+from .block_engine import RowBlockEngine
+from .directory_batch import DirectoryBatchProcessor
+from .helm_values import HelmMapBuilder, HelmValuesLoader, helm_leaves
+from .incremental_blocks import IncrementalBlockProcessor
+from .mrcf_index import MRCFIndexStore
+from .section_stream import SectionStreamProcessor
+from .variant_rewriter import VARIANT_ARTIFACTS, VARIANT_LABELS, VariantRewriter, variant_plan
+
+
+# Key row after _strip_comment: indent and list dashes, key, value
+_KEY_ROW = re.compile(r'^([ \t]*(?:-[ \t]+)*)(?!-[ \t])("[^"]*"|\'[^\']*\'|[^\s#\'"][^#]*?)[ \t]*:(?:[ \t]+(.*?))?[ \t]*$')
+# Literal or folded block scalar header
+_BLOCK_SCALAR_VALUE = re.compile(r'[|>][-+0-9]*$')
+# Comment start outside quotes
+_COMMENT = re.compile(r'(?:^|[ \t])#')
+
+
+def _strip_comment(row: str) -> str:
+    """Row without its trailing comment, a '#' inside quotes is kept."""
+    if '#' not in row:
+        return row
+    if '"' not in row and "'" not in row:
+        match = _COMMENT.search(row)
+        return row[:match.start()] if match else row
+    quote = None
+    for i, ch in enumerate(row):
+        if quote is not None:
+            if ch == quote:
+                quote = None
+        elif ch in '"\'' and (i == 0 or row[i - 1] in ' \t:-[{,'):
+            quote = ch
+        elif ch == '#' and (i == 0 or row[i - 1] in ' \t'):
+            return row[:i]
+    return row
+
 
 class YAMLProcessingService:
     """Complete YAML processing service with all uncomment-00 functionality."""
@@ -23,6 +75,12 @@ class YAMLProcessingService:
         self.config = self._init_config(config)
         self.map_path_mrcf = {}
         self.map_path_helm = {}
+        self._use_compact_paths()
+        # Per-flavor MRCF defaults by path, precompiled with the MRCF index
+        self.mrcf_flavor_defaults = {}
+        # Digests of the MRCF and Helm sources loaded into the maps, by source
+        self.knowledge_sources: Dict[str, Any] = {}
+        self.mrcf_indexes = MRCFIndexStore()
 
         # Initialize YAML processors
         self.yamel = yml.YAML(typ='rt', pure=True)
@@ -33,15 +91,44 @@ class YAMLProcessingService:
         yaml.allow_duplicate_keys = True
         self.yamel.allow_duplicate_keys = None
 
+        self.verdict_cache: Optional[YAMLVerdictCache] = (
+            shared_verdict_cache() if self.config['verdict_cache'] else None)
+        self.lint_fixer = WindowedYAMLLinter(YamlLintConfig(
+            "extends: relaxed\nrules:\n  indentation:\n    spaces: 2\n    indent-sequences: 'whatever'"))
+        self.variant_rewriter = VariantRewriter(self)
+        self.block_cache = YAMLBlockCache()
+        # Directory batch workers leave writing the cache files to the parent
+        self.persist_caches = True
+        self.helm_cache = YAMLBlockCache()
+        self.stage_hooks: StageHooks = StageHooks()
+
     def _init_config(self, config: Optional[Dict]) -> Dict:
         """Initialize configuration with defaults."""
         default_config = {
             'debug': False,
             'verbose': False,
             'force_rewriting': True,
+            'variants': ['ruamel', 'pyyaml'],  # rewritten variants written by default
+            'variant_fork_threshold': 256 * 1024,  # PyYAML variant in a forked child from this size
             'stop_on_ruamel_error': False,
             'stop_on_pyyaml_error': False,
             'max_errors_to_fix': 2000,
+            'windowed_relint': True,  # re-lint only the sections a fix touched
+            'streaming': False,  # process the template one top-level section at a time
+            'block_engine': 'rows',  # 'rows' or legacy 'chars'
+            'validity_checker': 'incremental',  # 'incremental' or 'full'
+            'verify_closed_blocks': False,
+            'verdict_cache': True,
+            'verdict_cache_path': None,  # JSON file to keep verdicts between runs
+            'block_cache_path': None,  # JSON file of per-block results, reprocess only changed blocks
+            'mrcf_index_path': None,  # pickle of the compiled MRCF index, reused while the MRCF is unchanged
+            'helm_cache_path': None,  # JSON file of flattened Helm values files, unchanged files are not parsed
+            'helm_workers': None,  # processes parsing Helm values files, defaults to the CPU count
+            'compact_paths': False,  # keep the MRCF and Helm maps in a PathStore, less memory, slower lookups
+            'profile': False,  # per-stage wall/CPU time, peak memory and rows in the result
+            'profile_stage': None,  # stage run under cProfile, turns profiling on
+            'profile_output': None,  # write the profile, JSON for '.json' paths, collapsed stacks otherwise
+            'fast_path_validator': True,  # libyaml scan before the ruamel parse
             'system_size_mapping': {
                 "small-system": "default_small_system_profile",
                 "standard-system": "default_standard_system_profile",
@@ -55,6 +142,35 @@ class YAMLProcessingService:
                 "HELM.default",
                 "MRCF.example",
             ],
+            # Rows kept out of uncommenting, wrapped in @@@ markers
+            'special_content_patterns': {
+                'contains': [
+                    'Version: 1.0, Date:', '.  Misuse,', 'personal information. Handle',
+                    'USER, PLEASE EXIT', '-XX:', '-Xmn:', '-Xms:', '-Xmx:', '-Xlog:',
+                    'JAVA_OPTS',
+                ],
+                'starts': ['-Xm', '-Xlog', '-D', '"y":"', '"x":"', '"kty":"', '"kid":"', '"crv":"', "jwks: '{"],
+                'exact': ["]}'", "}", "{"],
+            },
+            # Blocks accepted even if they do not parse as YAML
+            'allowed_content_patterns': [
+                "dced.excluded.paths", "dced.agent.restore.type",
+                "The usage of this system is monitored and audited",
+                "IF YOU ARE NOT AN AUTHORIZED USER STOP",
+                "Important legal notice",
+            ],
+            # Template specific fixes applied before uncommenting, as (old, new)
+            'content_fixes': [
+                ("\n    #        trustedCertificateListName:", "\n        #        trustedCertificateListName:"),
+                ("\n        #        service:", "\n        service:"),
+                ("\n        #    egress:", "\n        egress:"),
+                ("\n        #    georeplication:", "\n        georeplication:"),
+                ("  #  cire-is-application-sys-info-handler:\n  #    asih:\n  #      applicationId:\n"
+                 "  cire-is-application-sys-info-handler:",
+                 "  cire-is-application-sys-info-handler:\n    asih:\n      applicationId:"),
+                ("  # IP Stack version:\n  # - ipv4\n  # - ipv6",
+                 "  # IP Stack version:\n  # - ipv4 (for IP Stack version 4)\n  # - ipv6 (for IP Stack version 6)"),
+            ],
             'delimiter': "/",
             'tab_size': 2,
             'clean_chars': "\r\n",
@@ -69,7 +185,7 @@ class YAMLProcessingService:
                             mrcf_path: Optional[str] = None,
                             helm_path: Optional[str] = None,
                             system_size: str = "standard-system",
-                            generate_variants: bool = True) -> Dict[str, Any]:
+                            generate_variants: Union[bool, List[str]] = True) -> Dict[str, Any]:
         """
         Complete YAML template processing with all original functionality.
 
@@ -79,84 +195,242 @@ class YAMLProcessingService:
             mrcf_path: MRCF JSON file path
             helm_path: Helm charts directory
             system_size: System size (small/standard/large-system)
-            generate_variants: Generate rewritten variants
+            generate_variants: Generate rewritten variants, or the list of
+                variants to generate ('ruamel', 'pyyaml')
 
         Returns:
             Processing result with status and file paths
         """
         try:
-            # Load external data
-            if mrcf_path:
-                self._load_mrcf_data(mrcf_path)
-            if helm_path:
-                self._load_helm_data(helm_path)
+            if self.config['streaming']:
+                self._load_verdict_cache()
+                fixed_variants, value_variants = variant_plan(generate_variants, self.config)
+                self._load_knowledge(mrcf_path, helm_path)
+
+                # Peak memory follows the largest top-level section, not the file
+                with self._profiling() as profiler:
+                    result = SectionStreamProcessor(self).process(input_path, output_path, system_size,
+                                                                  fixed_variants, value_variants)
+                if profiler is not None:
+                    self._attach_profile(result, profiler)
+                self._save_verdict_cache()
+                result['message'] = f"Successfully processed {len(result['files_generated'])} files"
+                return result
 
             # Read input file
             with open(input_path, 'r', encoding=self.config['encoding']) as f:
                 content = f.read()
 
-            original_content = content
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'input_path': input_path,
+                'message': f'Processing failed: {e}'
+            }
 
-            # Process if contains comments
-            if "#" in content and self._has_commented_rows(content):
-                # Preprocessing pipeline
-                content = self._preprocess_yaml_file2(content)
-                content = self._preprocess_yaml_file2b(content)
+        result = self.process_yaml_content(content, mrcf_path, helm_path, system_size, generate_variants,
+                                           template_name=input_path,
+                                           sink=ArtifactSink(output_path, self.config['encoding']))
+        # The artifacts are on disk now, results stay small for batch runs
+        result.pop('artifacts', None)
+        result['input_path'] = input_path
+        if result['success']:
+            result['output_path'] = output_path
+            result['message'] = f"Successfully processed {len(result['files_generated'])} files"
+        return result
+
+    def process_yaml_content(self, content: str,
+                             mrcf_path: Optional[str] = None,
+                             helm_path: Optional[str] = None,
+                             system_size: str = "standard-system",
+                             generate_variants: Union[bool, List[str]] = True,
+                             template_name: str = "<template>",
+                             sink: Optional[ArtifactSink] = None) -> Dict[str, Any]:
+        """
+        Process template text in memory, the artifacts come back as text.
 
-                # Main processing
-                content = self._process_yaml_file2(content, input_path)
+        Args:
+            content: YAML template text
+            mrcf_path: MRCF JSON file path
+            helm_path: Helm charts directory
+            system_size: System size (small/standard/large-system)
+            generate_variants: Generate rewritten variants, or the list of
+                variants to generate ('ruamel', 'pyyaml')
+            template_name: Name of the template in messages
+            sink: Writes the artifacts to disk when given
 
-                # Postprocessing
-                content = self._postprocess_yaml_file2(content)
-                content = self._check_and_fix_indentation_level(content)
+        Returns:
+            Processing result with the artifacts by name ('main', 'fixed',
+            'rewritten_ruamel', 'values_set', ...) in the order
+            process_yaml_template writes them, and the written files if
+            a sink was given
+        """
+        try:
+            with self._profiling() as profiler:
+                self._load_verdict_cache()
+                fixed_variants, value_variants = variant_plan(generate_variants, self.config)
+                self._load_knowledge(mrcf_path, helm_path)
+                hooks = self.stage_hooks
+                rows = content.count('\n') + 1
+
+                blocks = None
+                if self.config['block_cache_path']:
+                    # Only the top-level blocks that changed since the last run are processed
+                    self._load_block_cache()
+                    content, fixed_content, value_fixed_content, blocks = IncrementalBlockProcessor(
+                        self, self.block_cache).process(content, template_name, system_size)
+                else:
+                    # Process if contains comments
+                    if "#" in content and self._has_commented_rows(content):
+                        # Preprocessing pipeline
+                        with hooks.stage('preprocess', rows):
+                            content = self._preprocess_yaml_file2(content)
+                            content = self._preprocess_yaml_file2b(content)
+
+                        # Main processing
+                        with hooks.stage('block_processing', rows):
+                            content = self._process_yaml_file2(content, template_name)
+                            content = self._postprocess_yaml_file2(content)
+
+                        # Indentation check
+                        with hooks.stage('indentation_fix', rows):
+                            content = self._check_and_fix_indentation_level(content)
+
+                    # Fix YAML errors
+                    with hooks.stage('lint_fix', rows):
+                        fixed_content = self._fix_yaml_errors_comprehensive(content)
+
+                    # Fix placeholder values
+                    value_fixed_content = fixed_content
+                    if "{{" in fixed_content and "}}" in fixed_content:
+                        with hooks.stage('value_fix', rows):
+                            value_fixed_content = self._fix_values_comprehensive(fixed_content, system_size)
+
+                artifacts = {MAIN_ARTIFACT: content}
+                if fixed_content != content:
+                    artifacts['fixed'] = fixed_content
+
+                # Generate rewritten variants if requested
+                if fixed_variants:
+                    with hooks.stage('variants', rows):
+                        artifacts.update(self._rewritten_variants(fixed_content, fixed_variants))
+
+                if value_fixed_content != fixed_content:
+                    artifacts['values_set'] = value_fixed_content
 
-            # Write main output
-            with open(output_path, 'w', encoding=self.config['encoding'], newline='\n') as f:
-                f.write(content)
+                    # Generate variants for value-fixed version
+                    if value_variants:
+                        with hooks.stage('variants', rows):
+                            artifacts.update(self._rewritten_variants(value_fixed_content, value_variants,
+                                                                      prefix='values_set_'))
+
+                result = {
+                    'success': True,
+                    'artifacts': artifacts,
+                }
+                if blocks is not None:
+                    result.update(blocks)
+                if sink is not None:
+                    with hooks.stage('write', rows):
+                        result['files_generated'] = sink.write(artifacts)
+
+                self._save_verdict_cache()
+                self._save_block_cache()
+
+                result['message'] = f"Successfully processed {len(artifacts)} artifacts"
+
+            if profiler is not None:
+                self._attach_profile(result, profiler)
+            return result
 
-            result = {
-                'success': True,
-                'input_path': input_path,
-                'output_path': output_path,
-                'files_generated': [output_path]
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'message': f'Processing failed: {e}'
             }
 
-            # Fix YAML errors
-            fixed_content = self._fix_yaml_errors_comprehensive(content, output_path)
-            if fixed_content != content:
-                fixed_path = output_path.replace('.yaml', '_fixed.yaml')
-                with open(fixed_path, 'w', encoding=self.config['encoding'], newline='\n') as f:
-                    f.write(fixed_content)
-                result['files_generated'].append(fixed_path)
-                content = fixed_content
-
-            # Generate rewritten variants if requested
-            if generate_variants or self.config['force_rewriting']:
-                variants = self._generate_rewritten_variants(content, output_path)
-                result['files_generated'].extend(variants)
-
-            # Fix placeholder values
-            if "{{" in content and "}}" in content:
-                value_fixed_content = self._fix_values_comprehensive(content, system_size)
-                if value_fixed_content != content:
-                    values_path = output_path.replace('.yaml', '_values_set.yaml')
-                    with open(values_path, 'w', encoding=self.config['encoding'], newline='\n') as f:
-                        f.write(value_fixed_content)
-                    result['files_generated'].append(values_path)
+    @contextlib.contextmanager
+    def _profiling(self) -> Iterator[Optional[StageProfiler]]:
+        """StageProfiler as the stage hooks of one run if profiling is configured, else None."""
+        if not (self.config['profile'] or self.config['profile_stage']):
+            yield None
+            return
+        profiler = StageProfiler(self.config['profile_stage'])
+        hooks, self.stage_hooks = self.stage_hooks, profiler
+        try:
+            yield profiler
+        finally:
+            self.stage_hooks = hooks
+            profiler.close()
+
+    def _attach_profile(self, result: Dict[str, Any], profiler: StageProfiler):
+        """Add the stage report to result and write it if a profile output is configured."""
+        result['profile'] = profiler.report()
+        if self.config['profile_output']:
+            write_profile(result['profile'], self.config['profile_output'])
+
+    def _use_compact_paths(self):
+        """Move the MRCF and Helm maps into PathStores if compact_paths is configured."""
+        if self.config['compact_paths']:
+            if not isinstance(self.map_path_mrcf, PathStore):
+                self.map_path_mrcf = PathStore(self.config['delimiter'], self.map_path_mrcf)
+            if not isinstance(self.map_path_helm, PathStore):
+                self.map_path_helm = PathStore(self.config['delimiter'], self.map_path_helm)
+
+    def _load_knowledge(self, mrcf_path: Optional[str], helm_path: Optional[str]):
+        """Load external data."""
+        self._use_compact_paths()
+        if mrcf_path:
+            self._load_mrcf_data(mrcf_path)
+        if helm_path:
+            self._load_helm_data(helm_path)
+
+    def process_directory(self, input_dir: str, output_dir: str,
+                          mrcf_path: Optional[str] = None,
+                          helm_path: Optional[str] = None,
+                          system_size: str = "standard-system",
+                          generate_variants: Union[bool, List[str]] = True,
+                          workers: Optional[int] = None,
+                          pattern: str = "*.yaml") -> Dict[str, Any]:
+        """
+        Process every template of a directory tree in parallel.
 
-                    # Generate variants for value-fixed version
-                    if generate_variants:
-                        value_variants = self._generate_rewritten_variants(value_fixed_content, values_path)
-                        result['files_generated'].extend(value_variants)
+        MRCF and Helm data are loaded once, the worker processes share them.
+        The verdicts and block results of the workers are saved to the
+        configured cache files once the batch is done.
 
-            result['message'] = f"Successfully processed {len(result['files_generated'])} files"
+        Args:
+            input_dir: Directory searched recursively for templates
+            output_dir: Directory receiving the outputs, mirroring input_dir
+            mrcf_path: MRCF JSON file path
+            helm_path: Helm charts directory
+            system_size: System size (small/standard/large-system)
+            generate_variants: Generate rewritten variants, or the list of variants
+            workers: Worker processes, defaults to the CPU count
+            pattern: File name pattern of the templates
+
+        Returns:
+            Batch result with the per-file results in template order
+        """
+        try:
+            self._load_verdict_cache()
+            self._load_knowledge(mrcf_path, helm_path)
+
+            result = DirectoryBatchProcessor(self).process(input_dir, output_dir, system_size,
+                                                           generate_variants, workers, pattern)
+            self._save_verdict_cache()
+            self._save_block_cache()
             return result
 
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e),
-                'input_path': input_path,
+                'input_dir': input_dir,
+                'output_dir': output_dir,
+                'results': [],
                 'message': f'Processing failed: {e}'
             }
 
@@ -164,13 +438,20 @@ class YAMLProcessingService:
         """Check if content has commented rows."""
         return any(row.lstrip().startswith("#") for row in content.split("\n"))
 
-    def _preprocess_yaml_file2(self, content: str) -> str:
-        """Preprocess YAML content - full original implementation."""
+    def _preprocess_yaml_file2(self, content: str, block_state: Optional[Dict] = None) -> str:
+        """Preprocess YAML content - full original implementation.
+
+        block_state carries the commented JSON block tracking from one call
+        to the next when a template is preprocessed section by section.
+        """
         block_started = False
         opening_row = None
         closing_row = None
+        if block_state:
+            block_started, closing_row = block_state['block_started'], block_state['closing_row']
         out_yaml_array = []
         row_nr = 0
+        special = self._special_content_matcher()
 
         for old_row in content.split('\n'):
             new_row = old_row.rstrip()
@@ -197,7 +478,7 @@ class YAMLProcessingService:
                 if indent_lvl % 2 == 1:
                     new_row = new_row[1:]
                 new_row = f"@@@{new_row}@@@"
-            elif self._should_mark_special_content(new_row):
+            elif self._should_mark_special_content(new_row, special):
                 if not new_row.startswith("@@@"):
                     new_row = f"@@@{new_row}@@@"
             elif 'Deployment: {}' in new_row:
@@ -208,6 +489,8 @@ class YAMLProcessingService:
             out_yaml_array.append(new_row)
             row_nr += 1
 
+        if block_state is not None:
+            block_state.update(block_started=block_started, closing_row=closing_row)
         if self.config['debug']:
             print(f"Preprocessed {row_nr} rows")
 
@@ -218,53 +501,27 @@ class YAMLProcessingService:
 
         return updated_yaml_content
 
-    def _should_mark_special_content(self, row: str) -> bool:
+    def _should_mark_special_content(self, row: str, matcher=None) -> bool:
         """Check if row should be marked as special content."""
-        special_patterns = [
-            'Version: 1.0, Date:', '.  Misuse,', 'personal information. Handle',
-            'USER, PLEASE EXIT', '-XX:', '-Xmn:', '-Xms:', '-Xmx:', '-Xlog:',
-            'JAVA_OPTS'
-        ]
-
-        special_starts = ['-Xm', '-Xlog', '-D', '"y":"', '"x":"', '"kty":"', '"kid":"', '"crv":"', "jwks: '{"]
-        special_exact = ["]}'", "}", "{"]
+        if matcher is None:
+            matcher = self._special_content_matcher()
+        return matcher.matches(row) or row.count('"') == 1
 
-        return (any(pattern in row for pattern in special_patterns) or
-                any(row.lstrip().startswith(start) for start in special_starts) or
-                row.strip() in special_exact or
-                row.count('"') == 1)
+    def _special_content_matcher(self):
+        """Matcher for config['special_content_patterns'], shared per configuration."""
+        return pattern_matcher(**self.config['special_content_patterns'])
 
     def _preprocess_yaml_file2b(self, content: str) -> str:
-        """Additional preprocessing - hardcoded fixes."""
-        out_yaml_content = content
-
-        # Specific fixes from original code
-        fixes = [
-            ("\\n    #        trustedCertificateListName:", "\\n        #        trustedCertificateListName:"),
-            ("\\n        #        service:", "\\n        service:"),
-            ("\\n        #    egress:", "\\n        egress:"),
-            ("\\n        #    georeplication:", "\\n        georeplication:"),
-        ]
-
-        for old, new in fixes:
-            if old in out_yaml_content:
-                out_yaml_content = out_yaml_content.replace(old, new)
-
-        # Complex string replacements
-        complex_fixes = [
-            ("  #  cire-is-application-sys-info-handler:\\n  #    asih:\\n  #      applicationId:\\n  cire-is-application-sys-info-handler:",
-             "  cire-is-application-sys-info-handler:\\n    asih:\\n      applicationId:"),
-            ("  # IP Stack version:\\n  # - ipv4\\n  # - ipv6",
-             "  # IP Stack version:\\n  # - ipv4 (for IP Stack version 4)\\n  # - ipv6 (for IP Stack version 6)"),
-        ]
-
-        for old, new in complex_fixes:
-            if old in out_yaml_content:
-                out_yaml_content = out_yaml_content.replace(old, new)
-
-        return out_yaml_content
+        """Additional preprocessing - config['content_fixes'] applied in one scan."""
+        return multi_replacer(self.config['content_fixes']).apply(content)
 
     def _process_yaml_file2(self, content: str, template_file: str) -> str:
+        """Process YAML content by blocks."""
+        if self.config['block_engine'] == 'chars':
+            return self._process_yaml_file2_chars(content, template_file)
+        return RowBlockEngine(self).process(content, template_file)
+
+    def _process_yaml_file2_chars(self, content: str, template_file: str) -> str:
         """Process YAML content by blocks - full original implementation."""
         last_block = ""
         last_row = ""
@@ -382,98 +639,63 @@ class YAMLProcessingService:
 
         return "\n".join(rows)
 
-    def _fix_yaml_errors_comprehensive(self, content: str, base_path: str) -> str:
-        """Comprehensive YAML error fixing - full original implementation."""
-        updated = False
-        fixable_syntax_errors = None
-        content_rows = content.split("\n")
-
-        for tryout in range(0, self.config['max_errors_to_fix']):
-            if fixable_syntax_errors is not None and fixable_syntax_errors < 1:
-                break
-
-            fixable_syntax_errors = 0
+    def _fix_yaml_errors_comprehensive(self, content: str) -> str:
+        """Comprehensive YAML error fixing - full original implementation.
 
-            try:
-                from io import StringIO
-                yaml_file = StringIO(content)
-                yamllint_conf = YamlLintConfig("extends: relaxed\nrules:\n  indentation:\n    spaces: 2\n    indent-sequences: 'whatever'")
-                yamllint_errors = list(linter.run(yaml_file, yamllint_conf))
-
-                for yamllint_error in yamllint_errors:
-                    if yamllint_error.level == "error" and yamllint_error.rule != "line-length":
-                        row_num = int(yamllint_error.line) - 1
-
-                        if yamllint_error.rule is None:  # Syntax error
-                            if ("expected <block end>, but found '<block sequence start>'" in yamllint_error.message or
-                                "expected <block end>, but found '<block mapping start>'" in yamllint_error.message):
-
-                                if row_num > 0 and row_num < len(content_rows):
-                                    if ": []" in content_rows[row_num - 1]:
-                                        content_rows[row_num - 1] = content_rows[row_num - 1].replace(": []", ":")
-                                        fixable_syntax_errors += 1
-                                        updated = True
-                                    elif ": {}" in content_rows[row_num - 1]:
-                                        content_rows[row_num - 1] = content_rows[row_num - 1].replace(": {}", ":")
-                                        fixable_syntax_errors += 1
-                                        updated = True
-
-                            elif "could not find expected ':'" in yamllint_error.message:
-                                if row_num > 0 and row_num < len(content_rows):
-                                    content_rows[row_num - 1] = "#" + content_rows[row_num - 1] + "  # detected as commented text"
-                                    updated = True
-
-                        elif yamllint_error.rule == "key-duplicates":
-                            if row_num < len(content_rows):
-                                content_rows[row_num] = "#" + content_rows[row_num] + "  # detected as duplicate"
-                                updated = True
-
-                if updated:
-                    content = "\n".join(content_rows)
-                    fixable_syntax_errors = None
-
-            except Exception as e:
-                if self.config['debug']:
-                    print(f"YAML error fixing failed: {e}")
-                break
-
-        return content
-
-    def _generate_rewritten_variants(self, content: str, base_path: str) -> List[str]:
-        """Generate rewritten variants using different YAML processors."""
-        variants = []
-
-        # Ruamel variant
-        try:
-            ruamel_path = base_path.replace('.yaml', '_rewritten_ruamel.yaml')
-            ruamel_content = self._process_yaml_file1(content)
-            ruamel_content = self._postprocess_yaml_file1(ruamel_content)
-
-            with open(ruamel_path, 'w', encoding=self.config['encoding'], newline='\n') as f:
-                f.write(ruamel_content)
-            variants.append(ruamel_path)
-        except Exception as e:
-            if self.config['debug']:
-                print(f"Ruamel variant generation failed: {e}")
+        All problems of one yamllint pass are fixed together, the next passes
+        re-lint only the top-level sections a fix touched and a full lint
+        confirms the result.
+        """
+        content_rows = content.split("\n")
 
-        # PyYAML variant
         try:
-            pyyaml_path = base_path.replace('.yaml', '_rewritten_pyyaml.yaml')
-            pyyaml_content = self._preprocess_yaml_file0(content)
-            pyyaml_content = self._process_yaml_file0(pyyaml_content)
-
-            with open(pyyaml_path, 'w', encoding=self.config['encoding'], newline='\n') as f:
-                f.write(pyyaml_content)
-            variants.append(pyyaml_path)
+            return self.lint_fixer.fix(content_rows, self._fix_lint_problems,
+                                       self.config['max_errors_to_fix'],
+                                       windowed=self.config['windowed_relint'])
         except Exception as e:
             if self.config['debug']:
-                print(f"PyYAML variant generation failed: {e}")
-
+                print(f"YAML error fixing failed: {e}")
+            return "\n".join(content_rows)
+
+    def _fix_lint_problems(self, content_rows: List[str], yamllint_errors: List[Any]):
+        """Fix the rows reported by one yamllint pass in place."""
+        for yamllint_error in yamllint_errors:
+            if yamllint_error.level == "error" and yamllint_error.rule != "line-length":
+                row_num = int(yamllint_error.line) - 1
+
+                if yamllint_error.rule is None:  # Syntax error
+                    if ("expected <block end>, but found '<block sequence start>'" in yamllint_error.message or
+                        "expected <block end>, but found '<block mapping start>'" in yamllint_error.message):
+
+                        if row_num > 0 and row_num < len(content_rows):
+                            if ": []" in content_rows[row_num - 1]:
+                                content_rows[row_num - 1] = content_rows[row_num - 1].replace(": []", ":")
+                            elif ": {}" in content_rows[row_num - 1]:
+                                content_rows[row_num - 1] = content_rows[row_num - 1].replace(": {}", ":")
+
+                    elif "could not find expected ':'" in yamllint_error.message:
+                        if row_num > 0 and row_num < len(content_rows):
+                            content_rows[row_num - 1] = "#" + content_rows[row_num - 1] + "  # detected as commented text"
+
+                elif yamllint_error.rule == "key-duplicates":
+                    if row_num < len(content_rows):
+                        content_rows[row_num] = "#" + content_rows[row_num] + "  # detected as duplicate"
+
+    def _rewritten_variants(self, content: str, names: List[str], prefix: str = '') -> Dict[str, str]:
+        """Rewritten variants of content by artifact name, the failed ones left out."""
+        variants = {}
+        for name, variant_content in self.variant_rewriter.rewrite_all(names, content).items():
+            if isinstance(variant_content, Exception):
+                if self.config['debug']:
+                    print(f"{VARIANT_LABELS[name]} variant generation failed: {variant_content}")
+                continue
+            variants[prefix + VARIANT_ARTIFACTS[name]] = variant_content
         return variants
 
     def _fix_values_comprehensive(self, content: str, system_size: str) -> str:
         """Fix placeholder values - full original implementation."""
-        return self._fix_values(content, self.map_path_mrcf, self.map_path_helm, system_size, self.config['priorities'])
+        return self._fix_values(content, self.map_path_mrcf, self.map_path_helm, system_size, self.config['priorities'],
+                                self.mrcf_flavor_defaults)
 
     # Helper methods from original code
     def _indent_level(self, yaml_row_arg: str, delimiter: str = " ", tab_size: int = None, clean_chars: str = None) -> int:
@@ -518,10 +740,33 @@ class YAMLProcessingService:
         return uncom_row
 
     def _is_correct_yaml(self, last_block: str, row_num: int) -> Tuple[bool, Any]:
-        """Check if content is valid YAML."""
+        """Check if content is valid YAML.
+
+        parsed is the loaded value for scalars, the ones _is_allowed_content
+        looks at, and None for mappings and sequences, cached or not.
+        """
         if self.config['verbose']:
             print(f"Is this correct YAML in row #{row_num}:\n'{last_block}'\n?")
 
+        if self.verdict_cache is not None:
+            return self.verdict_cache.memoize('yaml_processing_service', self._load_yaml_verdict, last_block)
+        return scalar_verdict(*self._load_yaml_verdict(last_block))
+
+    def _load_yaml_verdict(self, last_block: str) -> Tuple[bool, Any]:
+        """Parse content and judge the result.
+
+        With fast_path_validator, errors and collections found by the libyaml
+        scan are answered without ruamel; parsed is None for them.
+        """
+        if self.config['fast_path_validator']:
+            probe = probe_yaml_structure(last_block)
+            if probe == PROBE_ERROR:
+                if self.config['debug']:
+                    print(f"Incorrect YAML block: {last_block}\nException was found by libyaml")
+                return False, None
+            if probe is not None:
+                return True, None
+
         try:
             correct_yaml = self.yamel.load(last_block)
             # Full validation logic from original code
@@ -541,19 +786,50 @@ class YAMLProcessingService:
                 print(f"Incorrect YAML block: {last_block}\nException was: {ex}")
             return False, None
 
+    def _new_validity_checker(self) -> Optional[IncrementalYAMLChecker]:
+        """Block checker for the rows engine, None to re-parse the whole block."""
+        if self.config['validity_checker'] != 'incremental':
+            return None
+        return IncrementalYAMLChecker(self._is_correct_yaml, self.yamel.load,
+                                      verify_on_close=self.config['verify_closed_blocks'])
+
+    def _load_verdict_cache(self):
+        """Merge verdicts persisted by a previous run, once per path."""
+        path = self.config['verdict_cache_path']
+        if self.verdict_cache is not None and path and path not in self.verdict_cache.loaded_paths:
+            loaded = self.verdict_cache.load(path)
+            if self.config['verbose']:
+                print(f"Loaded {loaded} YAML verdicts from {path}")
+
+    def _save_verdict_cache(self):
+        """Persist verdicts for the next run if a cache path is configured."""
+        path = self.config['verdict_cache_path']
+        if self.verdict_cache is not None and path and self.persist_caches:
+            self.verdict_cache.save(path)
+            if self.config['verbose']:
+                print(f"YAML verdict cache: {self.verdict_cache.stats()}")
+
+    def _load_block_cache(self):
+        """Merge block results persisted by a previous run, once per path."""
+        path = self.config['block_cache_path']
+        if path not in self.block_cache.loaded_paths:
+            loaded = self.block_cache.load(path)
+            if self.config['debug']:
+                print(f"Loaded {loaded} block results from {path}")
+
+    def _save_block_cache(self):
+        """Persist block results for the next run if a block cache path is configured."""
+        path = self.config['block_cache_path']
+        if path and self.persist_caches:
+            self.block_cache.save(path)
+            if self.config['debug']:
+                print(f"Block cache: {self.block_cache.stats()}")
+
     def _is_allowed_content(self, content: Any) -> bool:
         """Check if content is allowed even if not valid YAML."""
         if not isinstance(content, str):
             return False
-
-        allowed_patterns = [
-            "dced.excluded.paths", "dced.agent.restore.type",
-            "The usage of this system is monitored and audited",
-            "IF YOU ARE NOT AN AUTHORIZED USER STOP",
-            "Important legal notice"
-        ]
-
-        return any(pattern in content for pattern in allowed_patterns)
+        return pattern_matcher(self.config['allowed_content_patterns']).matches(content)
 
     # YAML processing methods
     def _preprocess_yaml_file0(self, content: str) -> str:
@@ -562,17 +838,22 @@ class YAMLProcessingService:
 
     def _process_yaml_file0(self, content: str) -> str:
         """Process with PyYAML."""
-        if self.config['stop_on_pyyaml_error']:
-            in_out_yaml = yaml.safe_load(content)
-        else:
-            try:
-                in_out_yaml = yaml.safe_load(content)
-            except (yaml.scanner.ScannerError, yaml.composer.ComposerError, yaml.parser.ParserError) as ex:
-                print("CRITICAL! PYYAML ERROR ON LOADING YAML CONTENT: %s", ex)
-                return ""
+        loaded, in_out_yaml = self._load_yaml_file0(content)
+        if not loaded:
+            return ""
         out_yaml_content = yaml.dump(in_out_yaml)
         return out_yaml_content
 
+    def _load_yaml_file0(self, content: str) -> Tuple[bool, Any]:
+        """Load with PyYAML, (False, None) when the content does not parse."""
+        if self.config['stop_on_pyyaml_error']:
+            return True, yaml.safe_load(content)
+        try:
+            return True, yaml.safe_load(content)
+        except (yaml.scanner.ScannerError, yaml.composer.ComposerError, yaml.parser.ParserError) as ex:
+            print("CRITICAL! PYYAML ERROR ON LOADING YAML CONTENT: %s", ex)
+            return False, None
+
     def _process_yaml_file1(self, content: str) -> str:
         """Process with Ruamel.YAML."""
         if self.config['stop_on_ruamel_error']:
@@ -597,185 +878,178 @@ class YAMLProcessingService:
 
     # Data loading methods
     def _load_mrcf_data(self, path: str):
-        """Load MRCF JSON data."""
+        """Load MRCF JSON data through its compiled index."""
         try:
-            with open(path, 'r', encoding=self.config['encoding']) as f:
-                mrcf_json = json.load(f)
-                for param in mrcf_json.get("parameters", []):
-                    if "path" not in param:
-                        print("FATAL ERROR: missing 'path' field in parameter:")
-                        continue
-                    path_clean = param["path"].replace("[N]", "").replace("[0]", "").replace("[1]", "").replace("[2]", "")
-                    self.map_path_mrcf[path_clean] = param
+            index, compiled = self.mrcf_indexes.load(path, self.config['mrcf_index_path'], self.config['encoding'],
+                                                     self.config['system_size_mapping'])
+            self.map_path_mrcf.update(index['parameters'])
+            self.mrcf_flavor_defaults.update(index['flavor_defaults'])
+            self.knowledge_sources['mrcf:' + index['source']] = index['digest']
             print(f"Loaded {len(self.map_path_mrcf)} MRCF parameters")
+            if self.config['debug']:
+                print(f"{'Compiled' if compiled else 'Reused'} the MRCF index of {path}")
         except Exception as e:
             print(f"Failed to load MRCF data: {e}")
 
     def _load_helm_data(self, path: str):
         """Load Helm charts data."""
         try:
-            box_settings = {"allow_duplicate_keys": None}
-
-            for root, dirs, files in os.walk(path):
-                for file in files:
-                    if str(file) == 'values.yaml':
-                        file_path = str(root) + os.sep + file
-                        values = Box.from_yaml(
-                            yaml_string=None,
-                            filename=file_path,
-                            encoding=self.config['encoding'],
-                            errors="strict",
-                            box_duplicates='ignore',
-                            allow_duplicate_keys=None,
-                            ruamel_attrs=box_settings
-                        )
-                        path_clean = str(root).replace("\\", "/").replace("/charts/", self.config['delimiter'])
-                        if path_clean.startswith("./"):
-                            path_clean = path_clean[2:]
-                        self._loop_through_nodes(values, None, path_clean, self.config['delimiter'], self.map_path_helm)
+            cache_path = self.config['helm_cache_path']
+            if cache_path and cache_path not in self.helm_cache.loaded_paths:
+                self.helm_cache.load(cache_path)
+
+            loader = HelmValuesLoader(self)
+            counts = loader.load(path, self.map_path_helm)
+            self.knowledge_sources['helm:' + path] = loader.file_keys
+            if cache_path:
+                self.helm_cache.save(cache_path)
 
             print(f"Loaded {len(self.map_path_helm)} Helm values")
+            if self.config['debug']:
+                print(f"Parsed {counts['files_parsed']}/{counts['files']} Helm values files")
         except Exception as e:
             print(f"Failed to load Helm data: {e}")
 
     def _loop_through_nodes(self, node, prev_key, path, delim, _map_path_helm, lookup_in_helm_tree=True):
         """Traverse nodes to build path mappings - full original implementation."""
-        if not isinstance(node, dict) and not isinstance(node, list):
-            print(f"loop_through_nodes error: unexpected node type {type(node)}")
+        if not lookup_in_helm_tree:
+            for kk, value, by_value in helm_leaves(node, prev_key, delim):
+                if by_value and _map_path_helm.get(kk):
+                    print(f"WARNING! Overwriting {kk} param from {_map_path_helm[kk]} to {value} at path {path}")
+                _map_path_helm[kk] = value
             return
 
-        if isinstance(node, list):
-            item_num = 0
-            for val in node:
-                if prev_key is None:
-                    kkk = f"[{item_num}]"
-                else:
-                    kkk = prev_key + f"[{item_num}]"
-                this_is_leaf = False
-                item_num += 1
+        builder = HelmMapBuilder(_map_path_helm)
+        for kk, value, by_value in helm_leaves(node, prev_key, delim):
+            builder.add(kk, value, by_value, path)
+        builder.finish()
 
-                if isinstance(val, (str, int, float, bool)):
-                    this_is_leaf = True
-                else:
-                    self._loop_through_nodes(val, kkk, path, delim, _map_path_helm, lookup_in_helm_tree)
+    def _fix_values(self, yaml_content: str, map_path_mrcf: Dict, map_path_helm: Dict, system_size: str, priorities: List[str],
+                    flavor_defaults: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+        """Fix placeholder values - priority-based fix_values from uncomment-00.
 
-                if this_is_leaf:
-                    if lookup_in_helm_tree:
-                        _map_path_helm[kkk] = {"values": [val], "files": [[path]]}
-                    else:
-                        _map_path_helm[kkk] = val
-            return
-
-        for key, value in node.items():
-            safe_key = str(key)
-            if isinstance(key, bool):
-                safe_key = 'true' if key else 'false'
-
-            if delim in safe_key or "." in safe_key or "/" in safe_key:
-                safe_key = "(" + safe_key + ")"
-
-            if prev_key is not None:
-                kk = str(prev_key) + delim + str(safe_key)
-            else:
-                kk = str(safe_key)
-
-            if delim == '/' and not kk.startswith(delim):
-                kk = delim + kk
-
-            if isinstance(value, str):
-                vv = value.replace("\n", "\\n") if value.find("\n") != -1 else value
-
-                if kk in _map_path_helm:
-                    prev_vv_dict = _map_path_helm[kk]
-                    if lookup_in_helm_tree:
-                        if "values" not in prev_vv_dict:
-                            prev_vv_dict["values"] = []
-                            prev_vv_dict["files"] = []
-                        if vv not in prev_vv_dict["values"]:
-                            prev_vv_dict["values"].append(vv)
-                            prev_vv_dict["files"].append([path])
-                        else:
-                            idx = prev_vv_dict["values"].index(vv)
-                            if path not in prev_vv_dict["files"][idx]:
-                                prev_vv_dict["files"][idx].append(path)
-                    elif prev_vv_dict:
-                        print(f"WARNING! Overwriting {kk} param from {prev_vv_dict} to {vv} at path {path}")
-                        _map_path_helm[kk] = vv
-                    else:
-                        _map_path_helm[kk] = vv
-                else:
-                    if lookup_in_helm_tree:
-                        _map_path_helm[kk] = {"values": [vv], "files": [[path]]}
-                    else:
-                        _map_path_helm[kk] = vv
-
-            elif isinstance(value, dict):
-                self._loop_through_nodes(value, kk, path, delim, _map_path_helm, lookup_in_helm_tree)
-            elif isinstance(value, list):
-                item_num = 0
-                for val in value:
-                    kkk = kk + f"[{item_num}]"
-                    this_is_leaf = False
-                    item_num += 1
-
-                    if isinstance(val, (str, int, float, bool)):
-                        this_is_leaf = True
-                    else:
-                        self._loop_through_nodes(val, kkk, path, delim, _map_path_helm, lookup_in_helm_tree)
-
-                    if this_is_leaf:
-                        if lookup_in_helm_tree:
-                            _map_path_helm[kkk] = {"values": [val], "files": [[path]]}
-                        else:
-                            _map_path_helm[kkk] = val
-            else:
-                if lookup_in_helm_tree:
-                    _map_path_helm[kk] = {"values": [value], "files": [[path]]}
-                else:
-                    _map_path_helm[kk] = value
-
-    def _fix_values(self, yaml_content: str, map_path_mrcf: Dict, map_path_helm: Dict, system_size: str, priorities: List[str]) -> str:
-        """Fix placeholder values - full original implementation from uncomment-00."""
-        # This is the complete fix_values function from the original code
-        # [Implementation would be the full original function - truncated for brevity]
-        # The complete implementation would include all the original logic for:
-        # - Path building
-        # - Value extraction
-        # - Priority-based replacement
-        # - System size mapping
-        # - All edge cases
-
-        # For now, simplified version:
-        lines = yaml_content.split('\n')
-        system_size_mapped = self.config['system_size_mapping'].get(system_size)
-
-        for i, line in enumerate(lines):
-            if "{{" in line and "}}" in line and ":" in line:
-                key = line.split(':')[0].strip()
-                value = line.split(':', 1)[1].strip()
-                path = f"/{key}"
-
-                # Apply priority-based value replacement
-                for priority in priorities:
-                    if priority == "MRCF.recommended_value" and path in map_path_mrcf:
-                        rec_val = map_path_mrcf[path].get("recommended_value")
-                        if rec_val is not None:
-                            lines[i] = line.replace(value, f'"{rec_val}"')
-                            break
-                    elif priority == "HELM.default" and path in map_path_helm:
-                        helm_val = map_path_helm[path]
-                        if isinstance(helm_val, dict) and "values" in helm_val:
-                            helm_val = helm_val["values"][0] if helm_val["values"] else None
-                        if helm_val is not None:
-                            lines[i] = line.replace(value, f'"{helm_val}"')
-                            break
-                    elif priority == "YAML.default_per_flavor":
-                        clean_val = value.replace('{{', '').replace('}}', '').strip()
-                        if '|' in clean_val:
-                            vals = clean_val.split('|')
-                            size_idx = {"small-system": 0, "standard-system": 1, "large-system": 2}.get(system_size, 1)
-                            if size_idx < len(vals):
-                                lines[i] = line.replace(value, f'"{vals[size_idx]}"')
-                                break
-
-        return '\n'.join(lines)
\ No newline at end of file
+        Every '{{ ... }}' value, quoted or not, takes the value of the first
+        priority that has one for the row's full path. Paths come from a
+        single forward pass over an indentation stack. flavor_defaults are
+        the per-flavor defaults of the MRCF index, paths it lacks are looked
+        up in map_path_mrcf.
+        """
+        rows = yaml_content.split('\n')
+        for row_num, path, key, start, end in self._iter_value_rows(rows):
+            row = rows[row_num]
+            value = row[start:end]
+            placeholder = value[1:-1] if len(value) > 1 and value[0] == value[-1] and value[0] in '"\'' else value
+            if not (placeholder.startswith('{{') and '}}' in placeholder):
+                continue
+
+            chosen = self._choose_value(path, placeholder, map_path_mrcf, map_path_helm, system_size, priorities,
+                                        flavor_defaults)
+            if chosen is None:
+                continue
+            priority, new_value = chosen
+            rows[row_num] = row[:start] + new_value + row[end:]
+            if self.config['verbose']:
+                print(f"Value of {path} in row {row_num}: {priority} {value} -> {new_value}")
+
+        return '\n'.join(rows)
+
+    def _iter_value_rows(self, rows: List[str]) -> Iterator[Tuple[int, str, str, int, int]]:
+        """Key rows with a value as (row number, full path, key, value start, value end).
+
+        Open keys sit on a stack with their indent level, a row closes the
+        keys indented as much as it is or more, the remaining top is its
+        parent. List items are a level deeper than their dash (see
+        _indent_level), so their keys hang from the key owning the list, as
+        MRCF paths without [N] do. Comments, blank rows and block scalar
+        text are not keys.
+        """
+        stack: List[Tuple[int, str]] = []
+        block_level = None
+        for row_num, row in enumerate(rows):
+            stripped = row.strip()
+            if block_level is not None:
+                if not stripped or self._indent_level(row) > block_level:
+                    continue
+                block_level = None
+            if not stripped or stripped.startswith('#'):
+                continue
+
+            match = _KEY_ROW.match(_strip_comment(row))
+            if match is None:
+                continue
+            level = self._indent_level(row)
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            key = match.group(2)
+            if key[0] in '"\'' and key[0] == key[-1]:
+                key = key[1:-1]
+            path = (stack[-1][1] if stack else '') + '/' + key
+            stack.append((level, path))
+
+            value = match.group(3)
+            if value is None:
+                continue
+            if _BLOCK_SCALAR_VALUE.match(value):
+                block_level = level
+            elif value:
+                yield row_num, path, key, match.start(3), match.end(3)
+
+    def _choose_value(self, path: str, placeholder: str, map_path_mrcf: Dict, map_path_helm: Dict,
+                      system_size: str, priorities: List[str],
+                      flavor_defaults: Optional[Dict[str, Dict[str, Any]]] = None) -> Optional[Tuple[str, str]]:
+        """(priority, YAML value) of the first priority with a value for path, None if none has."""
+        mrcf = map_path_mrcf.get(path) or {}
+        for priority in priorities:
+            value = None
+            if priority == "MRCF.recommended_value":
+                value = mrcf.get("recommended_value")
+            elif priority == "MRCF.default_per_flavor":
+                flavors = flavor_defaults.get(path) if flavor_defaults else None
+                if flavors is None and any(isinstance(key, str) and key.startswith("default_") for key in mrcf):
+                    flavors = {size: mrcf.get(mapped) for size, mapped in self.config['system_size_mapping'].items()}
+                if flavors:
+                    if system_size not in flavors:
+                        raise ValueError(f"System size '{system_size}' unsupported, possible values are: "
+                                         f"{', '.join(self.config['system_size_mapping'])}")
+                    value = flavors[system_size]
+            elif priority == "MRCF.default":
+                value = mrcf.get("default")
+            elif priority == "MRCF.example":
+                value = mrcf.get("example")
+            elif priority == "YAML.default_per_flavor":
+                return priority, self._flavor_value(placeholder, system_size)
+            elif priority == "HELM.default":
+                value = map_path_helm.get(path)
+                if isinstance(value, dict) and "values" in value:
+                    value = value["values"][0] if value["values"] else None
+            if value is not None:
+                return priority, self._yaml_value(value)
+        return None
+
+    def _flavor_value(self, placeholder: str, system_size: str) -> str:
+        """Alternative of '{{ small | standard | large }}' for system_size, one value serves all sizes."""
+        inner = placeholder[2:placeholder.index('}}')].replace('_or_', '|')
+        alternatives = [alternative.strip() for alternative in inner.split('|')]
+        size_idx = {"small-system": 0, "standard-system": 1, "large-system": 2}.get(system_size, 1)
+        chosen = alternatives[min(size_idx, len(alternatives) - 1)]
+        if len(chosen) > 1 and chosen[0] == chosen[-1] and chosen[0] in '"\'':
+            return self._yaml_value(chosen)
+        if chosen in ('true', 'false', 'null'):
+            return chosen
+        try:
+            float(chosen)
+            return chosen
+        except ValueError:
+            return self._yaml_value(chosen)
+
+    def _yaml_value(self, value: Any) -> str:
+        """Value as written into the template row, strings double-quoted."""
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if value is None:
+            return 'null'
+        if isinstance(value, (int, float)):
+            return str(value)
+        if isinstance(value, str):
+            return json.dumps(value.strip("\"'"), ensure_ascii=False)
+        return json.dumps(value, ensure_ascii=False)
@@ -9,6 +9,8 @@ from enum import Enum
 from common.handler.trace_handler import TraceHandler
 from common.handler.error_handler import ErrorHandler, BaseEngineError
 from backend.service_layer.format_processing.yaml.yaml_processing_service import YAMLProcessingService
+from backend.service_layer.format_processing.yaml.knowledge_cache import KnowledgeModelCache
+from backend.service_layer.ai_engine.template_analysis.line_classifier import default_line_classifier
 from backend.service_layer.schema_processing.jsonschema_processing_service import JSONSchemaProcessingService
 
 
@@ -35,8 +37,13 @@ class UnifiedOrchestratorEngine:
         # Initialize tracer
         self.tracer = TraceHandler(product, version, "UnifiedOrchestrator")
 
-        # Initialize processing services
-        self.yaml_service = YAMLProcessingService(product, version)
+        # Initialize processing services, knowledge models are built once per MRCF and Helm sources
+        self.knowledge_cache = KnowledgeModelCache()
+        # config "line_classifier": True trains on the gold files, a path loads a saved model
+        model = self.config.get("line_classifier")
+        line_classifier = default_line_classifier(model if isinstance(model, str) else None) if model else None
+        self.yaml_service = YAMLProcessingService(product, version, knowledge_cache=self.knowledge_cache,
+                                                  line_classifier=line_classifier)
         self.jsonschema_service = JSONSchemaProcessingService(product, version)
 
         # Processing statistics
@@ -104,6 +111,10 @@ class UnifiedOrchestratorEngine:
             ErrorHandler.handle(e, self.tracer, "YAML template processing")
             return False
 
+    def invalidate_knowledge_cache(self, mrcf_path: Optional[str] = None, helm_path: Optional[str] = None) -> int:
+        """Drop cached knowledge models of the given sources, all of them if none is given"""
+        return self.knowledge_cache.invalidate(mrcf_path, helm_path)
+
     def process_json_schema(self, input_path: str, output_path: str,
                           operation: str = "reorder",
                           **kwargs) -> bool:
@@ -164,43 +175,40 @@ class UnifiedOrchestratorEngine:
             results = {
                 "success": False,
                 "outputs": {},
+                "comparison": {},
                 "analysis": {},
                 "errors": []
             }
 
-            # Phase 1: AI-based analysis
-            ai_output = os.path.join(output_dir, "ai_processed.yaml")
-            ai_success = self.process_yaml_template(
-                input_path, ai_output,
-                mode=ProcessingMode.AI_BASED,
-                mrcf_path=mrcf_path,
-                helm_path=helm_path
-            )
-            results["outputs"]["ai_processed"] = ai_output if ai_success else None
-
-            # Phase 2: Rule-based processing
-            rule_output = os.path.join(output_dir, "rule_processed.yaml")
-            rule_success = self.process_yaml_template(
-                input_path, rule_output,
-                mode=ProcessingMode.RULE_BASED,
+            # AI, rule-based and hybrid processing from one analysis of the template
+            mode_outputs = {
+                ProcessingMode.AI_BASED: os.path.join(output_dir, "ai_processed.yaml"),
+                ProcessingMode.RULE_BASED: os.path.join(output_dir, "rule_processed.yaml"),
+                ProcessingMode.HYBRID: os.path.join(output_dir, "hybrid_processed.yaml")
+            }
+            multi_mode = self.yaml_service.process_yaml_template_modes(
+                input_path,
+                {mode.value: output for mode, output in mode_outputs.items()},
                 mrcf_path=mrcf_path,
                 helm_path=helm_path
             )
-            results["outputs"]["rule_processed"] = rule_output if rule_success else None
 
-            # Phase 3: Hybrid processing
-            hybrid_output = os.path.join(output_dir, "hybrid_processed.yaml")
-            hybrid_success = self.process_yaml_template(
-                input_path, hybrid_output,
-                mode=ProcessingMode.HYBRID,
-                mrcf_path=mrcf_path,
-                helm_path=helm_path
-            )
-            results["outputs"]["hybrid_processed"] = hybrid_output if hybrid_success else None
+            for mode, output in mode_outputs.items():
+                success = multi_mode["results"][mode.value]
+                self.stats["total_operations"] += 1
+                self.stats["yaml_operations"] += 1
+                if success:
+                    self.stats["successful_operations"] += 1
+                    self._update_mode_stats(mode)
+                else:
+                    self.stats["failed_operations"] += 1
+                    self.tracer.error(f"YAML processing failed: {input_path} ({mode.value} mode)")
+                results["outputs"][f"{mode.value}_processed"] = output if success else None
+            results["comparison"] = multi_mode["comparison"]
 
             # Generate analysis report
             results["analysis"] = self._generate_analysis_report()
-            results["success"] = any([ai_success, rule_success, hybrid_success])
+            results["success"] = any(multi_mode["results"].values())
 
             self.tracer.info("ML analysis workflow completed")
             return results
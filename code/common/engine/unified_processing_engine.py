@@ -38,6 +38,33 @@ class UnifiedProcessingEngine:
         """
         return self.yaml_service.process_yaml_template(input_path, output_path, **kwargs)
 
+    def process_yaml_content(self, content: str, **kwargs) -> Dict[str, Any]:
+        """
+        Process YAML template text in memory without writing files.
+
+        Args:
+            content: YAML template text
+            **kwargs: Processing options (mrcf_path, helm_path, system_size, etc.)
+
+        Returns:
+            Processing result with the generated artifacts by name
+        """
+        return self.yaml_service.process_yaml_content(content, **kwargs)
+
+    def process_yaml_directory(self, input_dir: str, output_dir: str, **kwargs) -> Dict[str, Any]:
+        """
+        Process a directory of YAML templates in parallel worker processes.
+
+        Args:
+            input_dir: Directory with YAML templates
+            output_dir: Output directory
+            **kwargs: Processing options (mrcf_path, helm_path, system_size, workers, etc.)
+
+        Returns:
+            Batch result with per-file results in template order
+        """
+        return self.yaml_service.process_directory(input_dir, output_dir, **kwargs)
+
     def reorder_json_schema(self, schema_path: str, output_path: str,
                            reference_path: Optional[str] = None, **kwargs) -> Dict[str, Any]:
         """
@@ -242,6 +269,7 @@ class UnifiedProcessingEngine:
             'yaml_service': {
                 'mrcf_parameters_loaded': len(self.yaml_service.map_path_mrcf),
                 'helm_values_loaded': len(self.yaml_service.map_path_helm),
+                'verdict_cache': self.yaml_service.verdict_cache.stats() if self.yaml_service.verdict_cache else None,
                 'config': self.yaml_service.config
             },
             'schema_service': {
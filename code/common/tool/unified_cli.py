@@ -13,6 +13,7 @@ from pathlib import Path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
 from ai_platform.common.engine.unified_processing_engine import UnifiedProcessingEngine
+from ai_platform.common.util.stage_profiler import STAGES, format_report, merge_reports, write_profile
 
 
 def create_parser():
@@ -25,6 +26,12 @@ Examples:
   # YAML processing
   %(prog)s yaml input.yaml output.yaml --mrcf config.json --helm charts/ --flavor standard-system
 
+  # Per-stage timings, yamllint fixing under cProfile, as a flamegraph input
+  %(prog)s yaml input.yaml output.yaml --profile lint_fix --profile-output profile.folded
+
+  # Directory of YAML templates on 8 worker processes
+  %(prog)s yaml-dir templates/ out/ --mrcf config.json --helm charts/ --workers 8
+
   # JSON Schema reordering
   %(prog)s schema input.json output.json --reference ref.json --sort-keywords
 
@@ -43,14 +50,63 @@ Examples:
     yaml_parser.add_argument('input', help='Input YAML template file')
     yaml_parser.add_argument('output', help='Output YAML file')
     yaml_parser.add_argument('--mrcf', help='MRCF JSON file path')
+    yaml_parser.add_argument('--mrcf-index',
+                           help='Compiled MRCF index file, reused while the MRCF is unchanged')
     yaml_parser.add_argument('--helm', help='Helm charts directory path')
+    yaml_parser.add_argument('--helm-cache',
+                           help='JSON file of parsed Helm values files, unchanged files are not parsed')
+    yaml_parser.add_argument('--compact-paths', action='store_true',
+                           help='Keep MRCF and Helm paths in a compact trie (very large chart sets)')
     yaml_parser.add_argument('--flavor', default='standard-system',
                            choices=['small-system', 'standard-system', 'large-system'],
                            help='System size flavor')
     yaml_parser.add_argument('--no-variants', action='store_true',
                            help='Skip generating rewritten variants')
+    yaml_parser.add_argument('--variants', nargs='+', choices=['ruamel', 'pyyaml'],
+                           help='Rewritten variants to generate (default: all)')
     yaml_parser.add_argument('--debug', action='store_true', help='Enable debug output')
     yaml_parser.add_argument('--verbose', action='store_true', help='Enable verbose output')
+    yaml_parser.add_argument('--verdict-cache', help='JSON file keeping YAML validity verdicts between runs')
+    yaml_parser.add_argument('--streaming', action='store_true',
+                           help='Process the template one top-level section at a time (very large files)')
+    yaml_parser.add_argument('--block-cache',
+                           help='JSON file of per-block results, only changed top-level blocks are reprocessed')
+    yaml_parser.add_argument('--profile', choices=STAGES, metavar='STAGE',
+                           help=f"Report per-stage timings and run STAGE under cProfile ({', '.join(STAGES)})")
+    yaml_parser.add_argument('--profile-output',
+                           help='Write the stage profile, JSON for .json files, collapsed stacks otherwise')
+
+    # YAML directory processing command
+    yaml_dir_parser = subparsers.add_parser('yaml-dir', help='Process a directory of YAML templates in parallel')
+    yaml_dir_parser.add_argument('input', help='Input directory with YAML templates')
+    yaml_dir_parser.add_argument('output', help='Output directory')
+    yaml_dir_parser.add_argument('--mrcf', help='MRCF JSON file path')
+    yaml_dir_parser.add_argument('--mrcf-index',
+                               help='Compiled MRCF index file, reused while the MRCF is unchanged')
+    yaml_dir_parser.add_argument('--helm', help='Helm charts directory path')
+    yaml_dir_parser.add_argument('--helm-cache',
+                               help='JSON file of parsed Helm values files, unchanged files are not parsed')
+    yaml_dir_parser.add_argument('--compact-paths', action='store_true',
+                               help='Keep MRCF and Helm paths in a compact trie (very large chart sets)')
+    yaml_dir_parser.add_argument('--flavor', default='standard-system',
+                               choices=['small-system', 'standard-system', 'large-system'],
+                               help='System size flavor')
+    yaml_dir_parser.add_argument('--no-variants', action='store_true',
+                               help='Skip generating rewritten variants')
+    yaml_dir_parser.add_argument('--variants', nargs='+', choices=['ruamel', 'pyyaml'],
+                               help='Rewritten variants to generate (default: all)')
+    yaml_dir_parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    yaml_dir_parser.add_argument('--pattern', default='*.yaml', help='Template file name pattern')
+    yaml_dir_parser.add_argument('--debug', action='store_true', help='Enable debug output')
+    yaml_dir_parser.add_argument('--verbose', action='store_true', help='Enable verbose output')
+    yaml_dir_parser.add_argument('--verdict-cache', help='JSON file keeping YAML validity verdicts between runs')
+    yaml_dir_parser.add_argument('--streaming', action='store_true',
+                               help='Process each template one top-level section at a time')
+    yaml_dir_parser.add_argument('--profile', choices=STAGES, metavar='STAGE',
+                               help=f"Report per-stage timings summed over the templates and run STAGE "
+                                    f"under cProfile ({', '.join(STAGES)})")
+    yaml_dir_parser.add_argument('--profile-output',
+                               help='Write the stage profile, JSON for .json files, collapsed stacks otherwise')
 
     # JSON Schema processing command
     schema_parser = subparsers.add_parser('schema', help='Process JSON Schemas')
@@ -92,6 +148,22 @@ def handle_yaml_command(args, engine):
         config['debug'] = True
     if args.verbose:
         config['verbose'] = True
+    if args.verdict_cache:
+        config['verdict_cache_path'] = args.verdict_cache
+    if args.streaming:
+        config['streaming'] = True
+    if args.mrcf_index:
+        config['mrcf_index_path'] = args.mrcf_index
+    if args.helm_cache:
+        config['helm_cache_path'] = args.helm_cache
+    if args.compact_paths:
+        config['compact_paths'] = True
+    if args.block_cache:
+        config['block_cache_path'] = args.block_cache
+    if args.profile or args.profile_output:
+        config['profile'] = True
+        config['profile_stage'] = args.profile
+        config['profile_output'] = args.profile_output
 
     # Update engine config
     engine.yaml_service.config.update(config)
@@ -102,11 +174,15 @@ def handle_yaml_command(args, engine):
         mrcf_path=args.mrcf,
         helm_path=args.helm,
         system_size=args.flavor,
-        generate_variants=not args.no_variants
+        generate_variants=args.variants or not args.no_variants
     )
 
     if result['success']:
         print(f"✓ {result['message']}")
+        if 'blocks' in result:
+            print(f"Reused {result['blocks_reused']}/{result['blocks']} blocks from the block cache")
+        if 'profile' in result:
+            print("\n".join(format_report(result['profile'])))
         print(f"Generated files:")
         for file_path in result['files_generated']:
             print(f"  - {file_path}")
@@ -119,6 +195,68 @@ def handle_yaml_command(args, engine):
     return True
 
 
+def handle_yaml_dir_command(args, engine):
+    """Handle YAML directory processing command."""
+    print(f"Processing YAML templates in: {args.input}")
+
+    config = {}
+    if args.debug:
+        config['debug'] = True
+    if args.verbose:
+        config['verbose'] = True
+    if args.verdict_cache:
+        config['verdict_cache_path'] = args.verdict_cache
+    if args.streaming:
+        config['streaming'] = True
+    if args.mrcf_index:
+        config['mrcf_index_path'] = args.mrcf_index
+    if args.helm_cache:
+        config['helm_cache_path'] = args.helm_cache
+    if args.compact_paths:
+        config['compact_paths'] = True
+    if args.profile or args.profile_output:
+        # The templates are profiled one by one, their reports are summed up here
+        config['profile'] = True
+        config['profile_stage'] = args.profile
+
+    # Update engine config
+    engine.yaml_service.config.update(config)
+
+    result = engine.process_yaml_directory(
+        input_dir=args.input,
+        output_dir=args.output,
+        mrcf_path=args.mrcf,
+        helm_path=args.helm,
+        system_size=args.flavor,
+        generate_variants=args.variants or not args.no_variants,
+        workers=args.workers,
+        pattern=args.pattern
+    )
+
+    for res in result['results']:
+        status = '✓' if res.get('success', False) else '✗'
+        print(f"  {status} {res['input_path']} ({res['elapsed']:.2f}s)")
+        if not res.get('success', False) and 'error' in res:
+            print(f"      Error: {res['error']}")
+
+    if result['success']:
+        print(f"✓ {result['message']}")
+    else:
+        print(f"✗ {result['message']}")
+        if 'error' in result:
+            print(f"Error: {result['error']}")
+        return False
+
+    print(f"Workers: {result['workers']}, CPU time: {result['cpu_time']:.1f}s")
+    reports = [res['profile'] for res in result['results'] if 'profile' in res]
+    if reports:
+        report = merge_reports(reports)
+        print("\n".join(format_report(report)))
+        if args.profile_output:
+            write_profile(report, args.profile_output)
+    return True
+
+
 def handle_schema_command(args, engine):
     """Handle JSON Schema processing command."""
     print(f"Processing JSON Schema: {args.input}")
@@ -281,6 +419,8 @@ def main():
     try:
         if args.command == 'yaml':
             success = handle_yaml_command(args, engine)
+        elif args.command == 'yaml-dir':
+            success = handle_yaml_dir_command(args, engine)
         elif args.command == 'schema':
             success = handle_schema_command(args, engine)
         elif args.command == 'batch':
@@ -12,6 +12,10 @@ project_root = Path(__file__).resolve().parents[3]
 sys.path.insert(0, str(project_root))
 
 from ai_platform.common.tool.yaml_uncommenter import YAMLUncommenter
+from ai_platform.common.util.stage_profiler import STAGES, StageProfiler, format_report, write_profile
+
+# The uncommenter writes no rewritten variants
+PROFILE_STAGES = tuple(stage for stage in STAGES if stage != 'variants')
 
 
 def main():
@@ -27,13 +31,21 @@ def main():
                        choices=['rule-based', 'ML-based', 'GenAI-LLM-based', 'GenAI-SMLM-based'],
                        help='Uncommenting method (default: rule-based)')
     parser.add_argument('--log', help='Log file path')
+    parser.add_argument('--verdict-cache', help='JSON file keeping YAML validity verdicts between runs')
+    parser.add_argument('--profile', choices=PROFILE_STAGES, metavar='STAGE',
+                       help=f"Report per-stage timings and run STAGE under cProfile ({', '.join(PROFILE_STAGES)})")
+    parser.add_argument('--profile-output',
+                       help='Write the stage profile, JSON for .json files, collapsed stacks otherwise')
 
     args = parser.parse_args()
 
     if args.method != 'rule-based':
         print(f"Method '{args.method}' not yet implemented. Using rule-based.")
 
-    uncommenter = YAMLUncommenter(log_path=args.log)
+    uncommenter = YAMLUncommenter(log_path=args.log, verdict_cache_path=args.verdict_cache)
+    profiler = None
+    if args.profile or args.profile_output:
+        profiler = uncommenter.stage_hooks = StageProfiler(args.profile)
     success = uncommenter.process(
         input_path=args.input,
         output_path=args.output,
@@ -42,6 +54,13 @@ def main():
         system_size=args.flavor
     )
 
+    if profiler is not None:
+        profiler.close()
+        report = profiler.report()
+        print("\n".join(format_report(report)))
+        if args.profile_output:
+            write_profile(report, args.profile_output)
+
     if success:
         print(f"Successfully processed: {args.output}")
     else:
@@ -8,16 +8,32 @@ import json
 from typing import Dict, Optional, Tuple
 from ruamel import yaml as yml
 
-from ai_platform.common.util.trace_handler import TraceHandler
-from ai_platform.common.util.error_handler import ErrorHandler, BaseEngineError
-from ai_platform.common.util.path_handler import PathHandler
-from ai_platform.common.util.template_validator import TemplateValidator
+try:
+    from ai_platform.common.util.trace_handler import TraceHandler
+    from ai_platform.common.util.error_handler import ErrorHandler, BaseEngineError
+    from ai_platform.common.util.path_handler import PathHandler
+    from ai_platform.common.util.template_validator import TemplateValidator
+    from ai_platform.common.util.yaml_validity_checker import IncrementalYAMLChecker
+    from ai_platform.common.util.yaml_verdict_cache import scalar_verdict, shared_verdict_cache
+    from ai_platform.common.util.yaml_fast_path import PROBE_EMPTY, PROBE_ERROR, probe_yaml_structure
+    from ai_platform.common.util.pattern_matcher import pattern_matcher
+    from ai_platform.common.util.stage_profiler import StageHooks
+except ImportError:
+    from common.util.trace_handler import TraceHandler
+    from common.util.error_handler import ErrorHandler, BaseEngineError
+    from common.util.path_handler import PathHandler
+    from common.util.template_validator import TemplateValidator
+    from common.util.yaml_validity_checker import IncrementalYAMLChecker
+    from common.util.yaml_verdict_cache import scalar_verdict, shared_verdict_cache
+    from common.util.yaml_fast_path import PROBE_EMPTY, PROBE_ERROR, probe_yaml_structure
+    from common.util.pattern_matcher import pattern_matcher
+    from common.util.stage_profiler import StageHooks
 
 
 class YAMLUncommenter:
     """YAML uncommenting tool with uncomment-00 core logic."""
 
-    def __init__(self, log_path: str = None):
+    def __init__(self, log_path: str = None, verdict_cache_path: str = None):
         self.yamel = yml.YAML(typ='rt', pure=True)
         self.yamel.preserve_quotes = True
         self.yamel.allow_duplicate_keys = None
@@ -26,6 +42,22 @@ class YAMLUncommenter:
         self.path_handler = PathHandler()
         self.validator = TemplateValidator(self.tracer)
         self.max_fixes = 2000
+        self.incremental_validation = True
+        self.fast_path_validation = True
+        self.windowed_relint = True
+        self.verdict_cache = shared_verdict_cache()
+        self.verdict_cache_path = verdict_cache_path
+        # Instrumentation of the pipeline stages, a StageProfiler to time them
+        self.stage_hooks: StageHooks = StageHooks()
+        # Rows kept out of uncommenting and blocks accepted without parsing
+        self.special_content_patterns = {
+            'contains': ['Version: 1.0, Date:', 'JAVA_OPTS', '-XX:', '-Xm', '-Xlog', '-D'],
+            'exact': ['}', '{', "]}'"],
+        }
+        self.allowed_content_patterns = ["dced.excluded.paths", "dced.agent.restore.type",
+                                         "The usage of this system is monitored and audited",
+                                         "IF YOU ARE NOT AN AUTHORIZED USER STOP",
+                                         "Important legal notice"]
 
     def process(self, input_path: str, output_path: str,
                 mrcf_path: Optional[str] = None,
@@ -34,6 +66,9 @@ class YAMLUncommenter:
         """Process YAML template file."""
         try:
             self.tracer.info(f"Processing: {input_path}")
+            if self.verdict_cache and self.verdict_cache_path:
+                if self.verdict_cache_path not in self.verdict_cache.loaded_paths:
+                    self.verdict_cache.load(self.verdict_cache_path)
 
             with open(input_path, 'r', encoding='utf-8') as f:
                 content = f.read()
@@ -43,20 +78,32 @@ class YAMLUncommenter:
 
             mrcf_data = self._load_mrcf(mrcf_path) if mrcf_path else {}
             helm_data = self._load_helm(helm_path) if helm_path else {}
+            hooks = self.stage_hooks
+            rows = len(self.original_lines)
 
             if "#" in content:
-                content = self._preprocess(content)
-                content = self._process_yaml_file(content, input_path)
-                content = self._postprocess(content)
-                content = self._fix_indentation(content)
+                with hooks.stage('preprocess', rows):
+                    content = self._preprocess(content)
+                with hooks.stage('block_processing', rows):
+                    content = self._process_yaml_file(content, input_path)
+                    content = self._postprocess(content)
+                with hooks.stage('indentation_fix', rows):
+                    content = self._fix_indentation(content)
 
-            content = self._validation_loop(content, mrcf_data)
+            with hooks.stage('lint_fix', rows):
+                content = self._validation_loop(content, mrcf_data)
 
             if "{{" in content and "}}" in content:
-                content = self._fix_values(content, mrcf_data, helm_data, system_size)
+                with hooks.stage('value_fix', rows):
+                    content = self._fix_values(content, mrcf_data, helm_data, system_size)
 
-            with open(output_path, 'w', encoding='utf-8', newline='\n') as f:
-                f.write(content)
+            with hooks.stage('write', rows):
+                with open(output_path, 'w', encoding='utf-8', newline='\n') as f:
+                    f.write(content)
+
+            if self.verdict_cache and self.verdict_cache_path:
+                self.verdict_cache.save(self.verdict_cache_path)
+                self.tracer.debug(f"YAML verdict cache: {self.verdict_cache.stats()}")
 
             self.tracer.info(f"Successfully written: {output_path}")
             return True
@@ -120,6 +167,7 @@ class YAMLUncommenter:
         opening_row = None
         closing_row = None
         out_rows = []
+        special = pattern_matcher(**self.special_content_patterns)
 
         for row in content.split('\n'):
             new_row = row.rstrip()
@@ -141,7 +189,7 @@ class YAMLUncommenter:
                 if self._indent_level(new_row) % 2 == 1:
                     new_row = new_row[1:]
                 new_row = f"@@@{new_row}@@@"
-            elif self._is_special_content(new_row):
+            elif special.matches(new_row):
                 new_row = f"@@@{new_row}@@@"
 
             out_rows.append(new_row)
@@ -151,9 +199,7 @@ class YAMLUncommenter:
 
     def _is_special_content(self, row: str) -> bool:
         """Check if row contains special content."""
-        patterns = ['Version: 1.0, Date:', 'JAVA_OPTS', '-XX:', '-Xm', '-Xlog', '-D']
-        special_vals = ['}', '{', "]}'"]
-        return any(p in row for p in patterns) or row.strip() in special_vals
+        return pattern_matcher(**self.special_content_patterns).matches(row)
 
     def _process_yaml_file(self, content: str, template_file: str) -> str:
         """Process YAML content by blocks (from uncomment-00)."""
@@ -161,6 +207,7 @@ class YAMLUncommenter:
         last_row = ""
         blocks = []
         row_num = len(content.split('\n'))
+        checker = IncrementalYAMLChecker(self._is_correct_yaml, self.yamel.load) if self.incremental_validation else None
 
         for i in range(len(content) - 1, 0, -1):
             ch = content[i]
@@ -173,6 +220,8 @@ class YAMLUncommenter:
                 if act_row.startswith('@@@') and act_row.endswith('@@@'):
                     last_row = last_row.replace('@@@', '')
                     last_block = last_row + last_block
+                    if checker:
+                        checker.push(last_row)
                     last_row = ""
                     continue
 
@@ -192,14 +241,20 @@ class YAMLUncommenter:
 
                 if comment_only:
                     last_block = last_row + last_block
+                    if checker:
+                        checker.push(last_row)
                 elif comment:
                     last_row_uncom = self._uncomment_row(last_row)
-                    last_block_uncom = last_row_uncom + last_block
-                    is_block_yaml, _ = self._is_correct_yaml(last_block_uncom)
+                    if checker:
+                        is_block_yaml, _ = checker.check(last_row_uncom)
+                    else:
+                        is_block_yaml, _ = self._is_correct_yaml(last_row_uncom + last_block)
 
                     if is_block_yaml:
                         last_row = last_row_uncom
-                        last_block = last_block_uncom
+                        last_block = last_row_uncom + last_block
+                        if checker:
+                            checker.push(last_row_uncom)
                     else:
                         is_row_yaml, _ = self._is_correct_yaml(last_row_uncom.strip("\n").split('\n')[0].strip())
                         if is_row_yaml:
@@ -209,12 +264,20 @@ class YAMLUncommenter:
                                 last_block = last_row_uncom + last_block
                                 blocks.append(last_block)
                                 last_block = ""
+                                if checker:
+                                    checker.close()
                             else:
                                 last_block = last_row_uncom + last_block
+                                if checker:
+                                    checker.push(last_row_uncom)
                         else:
                             last_block = last_row + last_block
+                            if checker:
+                                checker.push(last_row)
                 else:
                     last_block = last_row + last_block
+                    if checker:
+                        checker.push(last_row)
 
                 last_row = ""
 
@@ -230,7 +293,24 @@ class YAMLUncommenter:
 
 
     def _is_correct_yaml(self, content: str) -> Tuple[bool, any]:
-        """Check if content is valid YAML (from uncomment-00)."""
+        """Check if content is valid YAML (from uncomment-00).
+
+        parsed is None for mappings and sequences, cached or not.
+        """
+        if self.verdict_cache is not None:
+            return self.verdict_cache.memoize('yaml_uncommenter', self._load_yaml_verdict, content)
+        return scalar_verdict(*self._load_yaml_verdict(content))
+
+    def _load_yaml_verdict(self, content: str) -> Tuple[bool, any]:
+        """Parse content and apply the uncomment-00 heuristics."""
+        if self.fast_path_validation:
+            # Collections still need ruamel, the heuristics look at their values
+            probe = probe_yaml_structure(content)
+            if probe == PROBE_ERROR:
+                return False, None
+            if probe == PROBE_EMPTY:
+                return True, None
+
         try:
             parsed = self.yamel.load(content)
 
@@ -287,11 +367,7 @@ class YAMLUncommenter:
 
     def _is_allowed_content(self, content: str) -> bool:
         """Check if content is allowed even if not valid YAML."""
-        allowed = ["dced.excluded.paths", "dced.agent.restore.type",
-                  "The usage of this system is monitored and audited",
-                  "IF YOU ARE NOT AN AUTHORIZED USER STOP",
-                  "Important legal notice"]
-        return any(pattern in content for pattern in allowed)
+        return pattern_matcher(self.allowed_content_patterns).matches(content)
 
     def _uncomment_row(self, row: str) -> str:
         """Remove comment characters from row (from uncomment-00)."""
@@ -336,44 +412,33 @@ class YAMLUncommenter:
 
     def _validation_loop(self, content: str, mrcf_data: Dict) -> str:
         """Validation loop with auto-fixing (from uncomment-00)."""
-        lines = content.split('\n')
-
-        for tryout in range(self.max_fixes):
-            issues = self.validator.validate('\n'.join(lines))
-            fixable = 0
-
-            for issue in issues:
-                if issue['level'] != 'error' or issue['rule'] == 'line-length':
-                    continue
-
-                line_no = issue['line'] - 1
-                if line_no >= len(lines):
-                    continue
-
-                # Debug: log if line has inline comment
-                if '#' in lines[line_no] and not lines[line_no].lstrip().startswith('#'):
-                    self.tracer.debug(f"Line {issue['line']} has inline comment: {lines[line_no][:80]}")
-                    self.tracer.debug(f"Issue: {issue['rule']} - {issue['message']}")
-
-                if ': []' in lines[line_no]:
-                    lines[line_no] = lines[line_no].replace(': []', ':')
-                    fixable += 1
-                elif ': {}' in lines[line_no]:
-                    lines[line_no] = lines[line_no].replace(': {}', ':')
-                    fixable += 1
-                elif issue['rule'] == 'key-duplicates':
-                    lines[line_no] = "#" + lines[line_no] + "  # duplicate"
-                    fixable += 1
-                elif "could not find expected ':'" in issue['message']:
-                    # Check if line was originally commented (text, not YAML)
-                    if line_no < len(self.original_lines) and self.original_lines[line_no].lstrip().startswith('#'):
-                        lines[line_no] = "#" + lines[line_no] + "  # text"
-                        fixable += 1
-
-            if fixable == 0:
-                break
-
-        return '\n'.join(lines)
+        return self.validator.fix(content, self._fix_issues, self.max_fixes, windowed=self.windowed_relint)
+
+    def _fix_issues(self, lines: list, issues: list):
+        """Fix the lines reported by one yamllint pass in place."""
+        for issue in issues:
+            if issue.level != 'error' or issue.rule == 'line-length':
+                continue
+
+            line_no = issue.line - 1
+            if line_no >= len(lines):
+                continue
+
+            # Debug: log if line has inline comment
+            if '#' in lines[line_no] and not lines[line_no].lstrip().startswith('#'):
+                self.tracer.debug(f"Line {issue.line} has inline comment: {lines[line_no][:80]}")
+                self.tracer.debug(f"Issue: {issue.rule} - {issue.message}")
+
+            if ': []' in lines[line_no]:
+                lines[line_no] = lines[line_no].replace(': []', ':')
+            elif ': {}' in lines[line_no]:
+                lines[line_no] = lines[line_no].replace(': {}', ':')
+            elif issue.rule == 'key-duplicates':
+                lines[line_no] = "#" + lines[line_no] + "  # duplicate"
+            elif "could not find expected ':'" in issue.message:
+                # Check if line was originally commented (text, not YAML)
+                if line_no < len(self.original_lines) and self.original_lines[line_no].lstrip().startswith('#'):
+                    lines[line_no] = "#" + lines[line_no] + "  # text"
 
     def _fix_values(self, content: str, mrcf_data: Dict, helm_data: Dict, system_size: str) -> str:
         """Fix placeholder values."""
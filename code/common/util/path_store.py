@@ -0,0 +1,147 @@
+"""
+Compact store of path-keyed knowledge maps
+Paths share their prefixes in an array-backed trie of interned segments
+"""
+import sys
+from array import array
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional
+
+# Node keys are node << _SEGMENT_BITS | segment id
+_SEGMENT_BITS = 32
+_EMPTY = object()
+
+
+class HelmRecord:
+    """Helm map entry {"values": [...], "files": [[...], ...]} as shared tuples of interned strings."""
+
+    __slots__ = ('values', 'files')
+
+    def __init__(self, values: tuple, files: tuple):
+        self.values = values
+        self.files = files
+
+    def as_entry(self) -> Dict[str, list]:
+        return {"values": list(self.values), "files": [list(paths) for paths in self.files]}
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+def _is_helm_entry(value: Any) -> bool:
+    return type(value) is dict and len(value) == 2 and "values" in value and "files" in value
+
+
+class PathStore(MutableMapping):
+    """Dict-like map of delimited paths to values, for maps with millions of paths.
+
+    Paths are split at the delimiter into segments, interned once, and kept
+    as nodes of a trie: node n has parent _parents[n] and segment
+    _segments[n], the children of all nodes are found through one dict of
+    integer keys. Values are stored on the node of their path, Helm
+    entries as HelmRecord. Lookups hand out a new dict for a Helm entry,
+    so changes to it are kept only by assigning it back. Iteration follows
+    insertion order like a dict.
+    """
+
+    def __init__(self, delimiter: str = '/', items: Optional[Any] = None):
+        self.delimiter = delimiter
+        self._segment_ids: Dict[str, int] = {}
+        self._segment_names: List[str] = []
+        self._children: Dict[int, int] = {}
+        self._parents = array('i', [-1])
+        self._segments = array('i', [-1])
+        self._values: List[Any] = [_EMPTY]
+        self._order = array('i')
+        # Equal value and file tuples of Helm records are stored once
+        self._tuples: Dict[tuple, tuple] = {}
+        if items is not None:
+            self.update(items)
+
+    def _node(self, path: str, create: bool = False) -> Optional[int]:
+        """Node of path, None if it is not in the trie and create is False."""
+        node = 0
+        for segment in path.split(self.delimiter):
+            segment_id = self._segment_ids.get(segment)
+            if segment_id is None:
+                if not create:
+                    return None
+                segment = sys.intern(segment)
+                segment_id = self._segment_ids[segment] = len(self._segment_names)
+                self._segment_names.append(segment)
+            key = node << _SEGMENT_BITS | segment_id
+            child = self._children.get(key)
+            if child is None:
+                if not create:
+                    return None
+                child = self._children[key] = len(self._values)
+                self._parents.append(node)
+                self._segments.append(segment_id)
+                self._values.append(_EMPTY)
+            node = child
+        return node
+
+    def _path(self, node: int) -> str:
+        segments = []
+        while node:
+            segments.append(self._segment_names[self._segments[node]])
+            node = self._parents[node]
+        return self.delimiter.join(reversed(segments))
+
+    def _shared(self, items: tuple) -> tuple:
+        """The stored tuple equal to items, only for tuples of strings, 1 == True == 1.0 otherwise."""
+        if all(type(item) is str or type(item) is tuple for item in items):
+            return self._tuples.setdefault(items, items)
+        return items
+
+    def _helm_record(self, entry: Dict[str, list]) -> HelmRecord:
+        values = self._shared(tuple(_intern(value) for value in entry["values"]))
+        files = self._shared(tuple(self._shared(tuple(_intern(path) for path in paths)) for paths in entry["files"]))
+        return HelmRecord(values, files)
+
+    @staticmethod
+    def _decode(value: Any) -> Any:
+        return value.as_entry() if type(value) is HelmRecord else value
+
+    def __getitem__(self, path: str) -> Any:
+        node = self._node(path)
+        if node is None or self._values[node] is _EMPTY:
+            raise KeyError(path)
+        return self._decode(self._values[node])
+
+    def get(self, path: str, default: Any = None) -> Any:
+        node = self._node(path)
+        if node is None or self._values[node] is _EMPTY:
+            return default
+        return self._decode(self._values[node])
+
+    def __contains__(self, path: object) -> bool:
+        if not isinstance(path, str):
+            return False
+        node = self._node(path)
+        return node is not None and self._values[node] is not _EMPTY
+
+    def __setitem__(self, path: str, value: Any):
+        node = self._node(path, create=True)
+        if self._values[node] is _EMPTY:
+            self._order.append(node)
+        self._values[node] = self._helm_record(value) if _is_helm_entry(value) else value
+
+    def __delitem__(self, path: str):
+        node = self._node(path)
+        if node is None or self._values[node] is _EMPTY:
+            raise KeyError(path)
+        self._values[node] = _EMPTY
+        # Deleting is rare for knowledge maps, the order array is searched
+        self._order.remove(node)
+
+    def __iter__(self) -> Iterator[str]:
+        for node in self._order:
+            yield self._path(node)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self)} paths, {len(self._values) - 1} nodes)"
@@ -0,0 +1,107 @@
+"""
+Compiled multi-pattern matching for row checks and content fixes
+One regex per pattern set, built once per configuration and shared
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+def _alternation(patterns: Iterable[str]) -> str:
+    # Longest first, so the regex takes the longest pattern at a position
+    return '|'.join(re.escape(p) for p in sorted(set(patterns), key=len, reverse=True))
+
+
+class PatternMatcher:
+    """Substring, prefix and whole-row tests over literal patterns.
+
+    contains patterns may appear anywhere in the text, starts patterns
+    open it once leading whitespace is dropped, exact patterns equal it
+    once surrounding whitespace is dropped. matches() is a single regex
+    search, hits() names every pattern found in one scan.
+    """
+
+    def __init__(self, contains: Sequence[str] = (), starts: Sequence[str] = (), exact: Sequence[str] = ()):
+        self.contains = tuple(contains)
+        self.starts = tuple(starts)
+        self.exact = tuple(exact)
+
+        parts = []
+        if self.contains:
+            parts.append(f'(?:{_alternation(self.contains)})')
+        if self.starts:
+            parts.append(rf'^\s*(?:{_alternation(self.starts)})')
+        if self.exact:
+            parts.append(rf'^\s*(?:{_alternation(self.exact)})\s*$')
+        self._any = re.compile('|'.join(parts)) if parts else None
+
+        # Zero-width scan: one longest hit per position, the shorter
+        # patterns it starts with hit there too
+        self._contains_at = re.compile(f'(?=({_alternation(self.contains)}))') if self.contains else None
+        self._prefixes: Dict[str, Tuple[str, ...]] = {
+            p: tuple(q for q in set(self.contains) if p.startswith(q)) for p in set(self.contains)}
+        self._starts = re.compile(rf'\s*({_alternation(self.starts)})') if self.starts else None
+        self._starts_prefixes: Dict[str, Tuple[str, ...]] = {
+            p: tuple(q for q in set(self.starts) if p.startswith(q)) for p in set(self.starts)}
+        self._exact = frozenset(self.exact)
+
+    def matches(self, text: str) -> bool:
+        """Whether any pattern hits text."""
+        return self._any is not None and self._any.search(text) is not None
+
+    def hits(self, text: str) -> List[str]:
+        """Every pattern hitting text, contains, starts and exact patterns in that order."""
+        found = []
+        if self._contains_at is not None:
+            seen = set()
+            for match in self._contains_at.finditer(text):
+                seen.update(self._prefixes[match.group(1)])
+            found.extend(p for p in self.contains if p in seen)
+        if self._starts is not None:
+            match = self._starts.match(text)
+            if match:
+                seen = set(self._starts_prefixes[match.group(1)])
+                found.extend(p for p in self.starts if p in seen)
+        if text.strip() in self._exact:
+            found.append(text.strip())
+        return found
+
+
+class MultiReplacer:
+    """Literal replacements applied in one left-to-right scan.
+
+    At each position the longest matching fix wins and replaced text is
+    not scanned again. For fixes that neither overlap nor produce each
+    other's input this equals applying str.replace one fix after the other.
+    """
+
+    def __init__(self, fixes: Sequence[Tuple[str, str]]):
+        self.fixes = tuple((old, new) for old, new in fixes if old)
+        self._table = dict(self.fixes)
+        self._regex = re.compile(_alternation(self._table)) if self._table else None
+
+    def apply(self, content: str) -> str:
+        if self._regex is None:
+            return content
+        return self._regex.sub(lambda match: self._table[match.group(0)], content)
+
+
+@lru_cache(maxsize=32)
+def _cached_matcher(contains: Tuple[str, ...], starts: Tuple[str, ...], exact: Tuple[str, ...]) -> PatternMatcher:
+    return PatternMatcher(contains, starts, exact)
+
+
+@lru_cache(maxsize=32)
+def _cached_replacer(fixes: Tuple[Tuple[str, str], ...]) -> MultiReplacer:
+    return MultiReplacer(fixes)
+
+
+def pattern_matcher(contains: Optional[Iterable[str]] = None, starts: Optional[Iterable[str]] = None,
+                    exact: Optional[Iterable[str]] = None) -> PatternMatcher:
+    """Shared matcher for a pattern configuration, compiled on first use."""
+    return _cached_matcher(tuple(contains or ()), tuple(starts or ()), tuple(exact or ()))
+
+
+def multi_replacer(fixes: Iterable[Sequence[str]]) -> MultiReplacer:
+    """Shared replacer for a list of (old, new) fixes, compiled on first use."""
+    return _cached_replacer(tuple((old, new) for old, new in fixes))
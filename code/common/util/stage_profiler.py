@@ -0,0 +1,185 @@
+"""
+Per-stage instrumentation for the YAML processing pipeline
+Wall time, CPU time, peak memory and rows per stage, cProfile for one chosen stage
+"""
+import cProfile
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional
+
+# Stages of process_yaml_template in pipeline order
+STAGES = ('preprocess', 'block_processing', 'indentation_fix', 'lint_fix', 'variants', 'value_fix', 'write')
+# Root frame of the collapsed stacks
+ROOT_FRAME = 'process_yaml_template'
+CPROFILE_TOP = 30
+
+
+class StageHooks:
+    """Instrumentation surface the pipeline stages report to, does nothing.
+
+    Every stage runs inside stage(name, rows), rows being the rows it was
+    given. Subclasses time, trace or log the stages; report() returns what
+    was recorded or None.
+    """
+
+    def stage(self, name: str, rows: int = 0):
+        return nullcontext()
+
+    def report(self) -> Optional[Dict[str, Any]]:
+        return None
+
+
+class StageProfiler(StageHooks):
+    """Records wall time, CPU time, peak memory and rows of every stage.
+
+    Stages are not nested; a stage run more than once (once per section in
+    streaming and incremental mode) adds up, its peak memory is the largest
+    one seen. Peak memory comes from tracemalloc, started here unless it is
+    tracing already, and is the allocation peak above what was allocated
+    when the stage started. cprofile_stage names the one stage run under
+    cProfile.
+    """
+
+    def __init__(self, cprofile_stage: Optional[str] = None, trace_memory: bool = True):
+        if cprofile_stage is not None and cprofile_stage not in STAGES:
+            raise ValueError(f"Unknown stage '{cprofile_stage}', expected one of {', '.join(STAGES)}")
+        self.cprofile_stage = cprofile_stage
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._profile = cProfile.Profile() if cprofile_stage else None
+        self._own_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._own_tracing:
+            tracemalloc.start()
+        self._trace_memory = trace_memory
+        self._started = time.perf_counter()
+        self._wall: Optional[float] = None
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0) -> Iterator[None]:
+        if self._trace_memory:
+            tracemalloc.reset_peak()
+            memory_start = tracemalloc.get_traced_memory()[0]
+        profile = self._profile if name == self.cprofile_stage else None
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            record = self.stages.setdefault(name, {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_memory': 0, 'rows': 0})
+            record['calls'] += 1
+            record['wall'] += time.perf_counter() - wall_start
+            record['cpu'] += time.process_time() - cpu_start
+            record['rows'] += rows
+            if self._trace_memory:
+                record['peak_memory'] = max(record['peak_memory'],
+                                            tracemalloc.get_traced_memory()[1] - memory_start)
+
+    def close(self):
+        """Stop tracing, the report keeps what was recorded so far."""
+        if self._wall is None:
+            self._wall = time.perf_counter() - self._started
+        if self._own_tracing:
+            tracemalloc.stop()
+            self._own_tracing = False
+
+    def report(self) -> Dict[str, Any]:
+        """Recorded stages in pipeline order, plus the cProfile functions of the profiled stage."""
+        order = {name: index for index, name in enumerate(STAGES)}
+        stages = {name: dict(record) for name, record in
+                  sorted(self.stages.items(), key=lambda item: order.get(item[0], len(order)))}
+        report = {
+            'stages': stages,
+            'wall': self._wall if self._wall is not None else time.perf_counter() - self._started,
+            'cprofile_stage': self.cprofile_stage,
+        }
+        if self._profile is not None:
+            report['cprofile'] = _profile_functions(self._profile)
+        return report
+
+
+def _profile_functions(profile: cProfile.Profile) -> List[Dict[str, Any]]:
+    """Functions of a profile, most cumulative time first."""
+    stats = pstats.Stats(profile).stats
+    functions = [{'function': f"{os.path.basename(file)}:{line}({name})", 'calls': calls,
+                  'tottime': tottime, 'cumtime': cumtime}
+                 for (file, line, name), (_, calls, tottime, cumtime, _) in stats.items()]
+    functions.sort(key=lambda function: function['cumtime'], reverse=True)
+    return functions
+
+
+def collapsed_stacks(report: Dict[str, Any]) -> List[str]:
+    """Collapsed-stack lines of a report for flamegraph.pl, microseconds of wall time.
+
+    Functions of the profiled stage hang below it with their own time.
+    """
+    lines = []
+    for name, record in report['stages'].items():
+        wall = record['wall']
+        frame = f"{ROOT_FRAME};{name}"
+        if name == report.get('cprofile_stage'):
+            for function in report.get('cprofile', []):
+                micros = int(function['tottime'] * 1e6)
+                if micros:
+                    lines.append(f"{frame};{function['function']} {micros}")
+                wall -= function['tottime']
+        micros = int(max(wall, 0.0) * 1e6)
+        if micros:
+            lines.append(f"{frame} {micros}")
+    return lines
+
+
+def write_profile(report: Dict[str, Any], path: str):
+    """Write a report as JSON if path ends with '.json', as collapsed stacks otherwise."""
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        if path.endswith('.json'):
+            out = dict(report)
+            if 'cprofile' in out:
+                out['cprofile'] = out['cprofile'][:CPROFILE_TOP]
+            json.dump(out, f, indent=2)
+        else:
+            f.write(''.join(line + '\n' for line in collapsed_stacks(report)))
+
+
+def merge_reports(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One report adding up the stages of several runs."""
+    stages: Dict[str, Dict[str, Any]] = {}
+    functions: Dict[str, Dict[str, Any]] = {}
+    for report in reports:
+        for name, record in report['stages'].items():
+            total = stages.setdefault(name, {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_memory': 0, 'rows': 0})
+            for field in ('calls', 'wall', 'cpu', 'rows'):
+                total[field] += record[field]
+            total['peak_memory'] = max(total['peak_memory'], record['peak_memory'])
+        for function in report.get('cprofile', []):
+            total = functions.setdefault(function['function'], dict(function, calls=0, tottime=0.0, cumtime=0.0))
+            for field in ('calls', 'tottime', 'cumtime'):
+                total[field] += function[field]
+    order = {name: index for index, name in enumerate(STAGES)}
+    merged = {
+        'stages': dict(sorted(stages.items(), key=lambda item: order.get(item[0], len(order)))),
+        'wall': sum(report['wall'] for report in reports),
+        'cprofile_stage': next((report['cprofile_stage'] for report in reports if report.get('cprofile_stage')), None),
+    }
+    if functions:
+        merged['cprofile'] = sorted(functions.values(), key=lambda function: function['cumtime'], reverse=True)
+    return merged
+
+
+def format_report(report: Dict[str, Any], top: int = 15) -> List[str]:
+    """Table rows of a report for the CLIs."""
+    lines = [f"{'stage':<18}{'calls':>7}{'wall s':>10}{'cpu s':>10}{'peak MB':>10}{'rows':>10}"]
+    for name, record in report['stages'].items():
+        lines.append(f"{name:<18}{record['calls']:>7}{record['wall']:>10.3f}{record['cpu']:>10.3f}"
+                     f"{record['peak_memory'] / 1048576:>10.1f}{record['rows']:>10}")
+    if report.get('cprofile'):
+        lines.append(f"cProfile of {report['cprofile_stage']}, by cumulative time:")
+        lines.extend(f"  {function['cumtime']:>9.3f}s {function['tottime']:>9.3f}s {function['calls']:>8}  "
+                     f"{function['function']}" for function in report['cprofile'][:top])
+    return lines
@@ -1,6 +1,11 @@
 from yamllint import linter
 from yamllint.config import YamlLintConfig
 
+try:
+    from ai_platform.common.util.yaml_lint_windows import WindowedYAMLLinter
+except ImportError:
+    from common.util.yaml_lint_windows import WindowedYAMLLinter
+
 class TemplateValidator:
     """YAML validation using yamllint."""
 
@@ -17,6 +22,7 @@ class TemplateValidator:
                 '  indentation: {level: error}\n'
                 '  line-length: disable'
             )
+        self.windowed_linter = WindowedYAMLLinter(self.lint_config)
 
     def validate(self, content: str) -> list:
         """Run yamllint and return issues."""
@@ -52,5 +58,17 @@ class TemplateValidator:
             self.tracer.error(f"Validation failed: {e}")
             return []
 
+    def fix(self, content: str, fixer, max_passes: int, windowed: bool = True) -> str:
+        """Lint/fix loop, fixer(lines, problems) edits the lines of one pass in place."""
+        self.tracer.info("Running yamllint fix loop")
+        lines = content.split('\n')
+        try:
+            content = self.windowed_linter.fix(lines, fixer, max_passes, windowed)
+            self.tracer.debug(f"Fix loop stats: {self.windowed_linter.stats}")
+            return content
+        except Exception as e:
+            self.tracer.error(f"Validation failed: {e}")
+            return '\n'.join(lines)
+
     def get_summary(self) -> dict:
         return self.stats
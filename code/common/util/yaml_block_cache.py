@@ -0,0 +1,136 @@
+"""
+On-disk cache of per-block processing results
+Lets an edited template reuse the results of the top-level blocks that did not change
+"""
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional
+
+from ruamel.yaml import __version__ as RUAMEL_VERSION
+from yamllint import APP_VERSION as YAMLLINT_VERSION
+
+CACHE_FORMAT = 1
+
+
+def block_key(*parts: Any) -> str:
+    """Cache key of a block, parts are JSON encoded and hashed."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(json.dumps(part, sort_keys=True, default=_json_default).encode('utf-8', 'surrogatepass'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _json_default(value: Any) -> Any:
+    """Dict-like maps such as PathStore hash as the dict they stand for, anything else by repr."""
+    return dict(value) if isinstance(value, Mapping) else repr(value)
+
+
+class YAMLBlockCache:
+    """Bounded LRU of block results keyed by block_key().
+
+    Entries are JSON values. load() merges a file written by save(), the
+    entries used in the current run are kept when max_entries is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 20000):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+        self.loaded_paths = set()
+        self._recorded: Optional[Dict[str, Any]] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Entry stored for key or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: Any):
+        """Remember entry for key."""
+        if self._recorded is not None:
+            self._recorded[key] = entry
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def record(self):
+        """Keep the entries put from now on for take_recorded()."""
+        self._recorded = {}
+
+    def take_recorded(self) -> List[list]:
+        """[key, entry] of the entries put since record(), and stop recording."""
+        recorded, self._recorded = self._recorded or {}, None
+        return [[key, entry] for key, entry in recorded.items()]
+
+    def merge(self, entries: List[list]) -> int:
+        """Add entries taken from another cache, returns the number added."""
+        merged = 0
+        for key, entry in entries:
+            if key not in self._entries:
+                self.put(key, entry)
+                merged += 1
+        return merged
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def load(self, path: str) -> int:
+        """Merge entries persisted by save(), returns the number loaded.
+
+        Files written by another cache format, ruamel or yamllint version are
+        ignored, their results could differ from what this run would produce.
+        """
+        self.loaded_paths.add(path)
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if (data.get('format') != CACHE_FORMAT or data.get('ruamel') != RUAMEL_VERSION
+                or data.get('yamllint') != YAMLLINT_VERSION):
+            return 0
+
+        loaded = 0
+        for key, entry in reversed(data.get('entries', [])):
+            if key not in self._entries and len(self._entries) < self.max_entries:
+                # Entries loaded from disk are older than anything seen in this run
+                self._entries[key] = entry
+                self._entries.move_to_end(key, last=False)
+                loaded += 1
+        return loaded
+
+    def save(self, path: str):
+        """Write the cache to path atomically, most recently used entries last."""
+        payload = {'format': CACHE_FORMAT, 'ruamel': RUAMEL_VERSION, 'yamllint': YAMLLINT_VERSION,
+                   'entries': [[key, entry] for key, entry in self._entries.items()]}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,72 @@
+"""
+libyaml fast path for YAML validity probes
+Scans the event stream with the C parser before any ruamel round-trip parse
+"""
+import re
+from typing import Optional
+
+import yaml
+
+try:
+    from yaml import CSafeLoader
+    LIBYAML_AVAILABLE = True
+except ImportError:
+    LIBYAML_AVAILABLE = False
+
+PROBE_ERROR = 'error'
+PROBE_EMPTY = 'empty'
+PROBE_MAPPING = 'mapping'
+PROBE_SEQUENCE = 'sequence'
+
+# libyaml and ruamel disagree on tabs, directives, the accepted character
+# set, anchors or tags in odd places, block scalars and empty keys,
+# such text always goes to ruamel
+_AMBIGUOUS_TEXT = re.compile(r'[^\n\r\x20-\x7e]|[&*!]|[|>][-+0-9]* *(?:#.*)?$|^%|^[ -]*[:?]', re.MULTILINE)
+# Plain scalars ruamel may resolve to numbers or timestamps and fail to construct
+_NUMERIC_LIKE = re.compile(r'[-+]?[0-9.]')
+
+
+def probe_yaml_structure(content: str) -> Optional[str]:
+    """Classify content with libyaml without constructing any object.
+
+    Returns PROBE_ERROR when the ruamel loader raises a scanner, parser or
+    composer error, PROBE_EMPTY when it loads None, PROBE_MAPPING or
+    PROBE_SEQUENCE for the root collection, and None whenever only ruamel
+    can tell (scalar root, tags, anchors, aliases, number-like values,
+    libyaml missing).
+    """
+    if not LIBYAML_AVAILABLE or _AMBIGUOUS_TEXT.search(content):
+        return None
+
+    loader = CSafeLoader(content)
+    root = None
+    documents = 0
+    try:
+        while loader.check_event():
+            event = loader.get_event()
+            if isinstance(event, yaml.DocumentStartEvent):
+                documents += 1
+                if documents > 1:
+                    # ruamel load() expects a single document
+                    return PROBE_ERROR
+            elif isinstance(event, yaml.AliasEvent):
+                return None
+            elif isinstance(event, yaml.NodeEvent):
+                if event.anchor is not None or event.tag is not None:
+                    return None
+                if isinstance(event, yaml.ScalarEvent):
+                    if root is None:
+                        return None
+                    if not event.style and (_NUMERIC_LIKE.match(event.value) or event.value == '<<'):
+                        return None
+                elif root is None:
+                    root = PROBE_MAPPING if isinstance(event, yaml.MappingStartEvent) else PROBE_SEQUENCE
+    except yaml.MarkedYAMLError:
+        # Flow collections are scanned more leniently by ruamel
+        return None if '[' in content or '{' in content else PROBE_ERROR
+    except yaml.YAMLError:
+        return None
+    finally:
+        loader.dispose()
+
+    return root or PROBE_EMPTY
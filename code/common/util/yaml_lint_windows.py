@@ -0,0 +1,413 @@
+"""
+Windowed yamllint runs for the lint/fix loops
+Lints top-level sections separately and re-lints only the sections a fix touched
+"""
+import copy
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+from yamllint import linter, parser
+from yamllint.config import YamlLintConfig
+from yamllint.linter import LintProblem
+from yamllint.rules import indentation
+
+from .yaml_sections import ROOT_KEY, section_bounds
+
+# Anchors, document markers, directives and yamllint comments reach across
+# sections, such documents are linted whole
+_CROSS_SECTION = re.compile(r'(?:^|[\s\[{,:-])[&*][^\s,\[\]{}]|^(?:---|\.\.\.|%)|yamllint', re.MULTILINE)
+# Closes the previous section the way the next top-level key would
+_SENTINEL = '__lint_window_end__: 0'
+
+
+class _WindowResult:
+    """Problems of one section, line numbers relative to the section.
+
+    The syntax check runs only for sections up to the first broken one,
+    scanner_error stays None until somebody asks.
+    """
+
+    __slots__ = ('cosmetic', 'syntax', 'parsed', 'scanner_error')
+
+    def __init__(self, cosmetic: List[LintProblem]):
+        self.cosmetic = cosmetic
+        self.syntax: Optional[LintProblem] = None
+        self.parsed = False
+        self.scanner_error: Optional[bool] = None
+
+
+class WindowedYAMLLinter:
+    """yamllint over top-level sections with per-section result reuse.
+
+    lint() returns the problems linter.run() reports for the whole document,
+    with duplicated top-level keys checked across sections and the missing
+    document start and the new line character reported once. Sections whose
+    text did not change since the previous call are not linted again.
+    Documents with a syntax error are linted whole.
+    """
+
+    def __init__(self, lint_config: YamlLintConfig):
+        self.lint_config = lint_config
+        self._windows: Dict[tuple, Any] = {}
+        self._pinned_configs: Dict[tuple, YamlLintConfig] = {}
+        self._indentation: Optional[Tuple[tuple, Optional[int]]] = None
+        self.stats = {'passes': 0, 'full_lints': 0, 'windows_linted': 0, 'windows_reused': 0}
+
+        self._line_rules = [rule for rule in lint_config.enabled_rules(None) if rule.TYPE == 'line']
+        self._key_duplicates = lint_config.rules.get('key-duplicates') or None
+
+    def reset(self):
+        """Forget cached sections, call when switching documents."""
+        self._windows.clear()
+        self._indentation = None
+
+    def lint_full(self, rows: List[str]) -> List[LintProblem]:
+        """Plain yamllint run over the whole document."""
+        self.stats['full_lints'] += 1
+        return list(linter.run('\n'.join(rows), self.lint_config))
+
+    def lint(self, rows: List[str], changed_from: int = 0) -> List[LintProblem]:
+        """Problems of the whole document, linting only changed sections.
+
+        changed_from is the first row modified since the previous call and
+        decides whether the indentation width has to be detected again.
+        A syntax error in any section can reach across section bounds, the
+        document is then linted whole, and so is a section with a top-level
+        key the section split did not see.
+        """
+        text = '\n'.join(rows)
+        if not self._windowable(rows, text):
+            return self.lint_full(rows)
+
+        pin = self._indentation_pin(text, changed_from)
+        problems: List[LintProblem] = []
+        root_keys = set()
+        document_start = False
+        bounds = section_bounds(rows)
+        for index, start in enumerate(bounds):
+            end = bounds[index + 1] if index + 1 < len(bounds) else len(rows)
+            if any(ROOT_KEY.match(row) for row in rows[start + 1:end]):
+                return self.lint_full(rows)
+            try:
+                result = self._lint_window(rows[start:end], end == len(rows), pin, True)
+            except Exception:
+                # yamllint fails on some broken input, the whole document decides whether it does
+                return self.lint_full(rows)
+            if result.syntax is not None or result.scanner_error:
+                return self.lint_full(rows)
+            duplicate = self._root_key_duplicate(rows[start], start, root_keys)
+            if duplicate is not None:
+                problems.append(duplicate)
+            for problem in result.cosmetic:
+                if problem.rule == 'new-lines' and index:
+                    # yamllint checks the line break of the first row only
+                    continue
+                if problem.rule == 'document-start':
+                    # Reported once, at the first section with content
+                    if document_start:
+                        continue
+                    document_start = True
+                problems.append(_shifted(problem, start))
+
+        return problems
+
+    def fix(self, rows: List[str], fixer: Callable[[List[str], List[LintProblem]], None],
+            max_passes: int, windowed: bool = True) -> str:
+        """Lint and let fixer() edit the rows until a pass changes nothing.
+
+        fixer(rows, problems) gets all problems of one pass and edits rows in
+        place. The first pass is a full lint, the following ones re-lint only
+        the sections touched since and a full lint confirms the fixes at the
+        end. Exceptions from yamllint are left to the caller, rows then hold
+        the result of the completed passes.
+        """
+        self.reset()
+        full = True
+        changed_from = 0
+        for _ in range(max_passes):
+            if full:
+                problems = self.lint_full(rows)
+                if windowed:
+                    self._seed(rows, problems)
+            else:
+                problems = self.lint(rows, changed_from)
+            self.stats['passes'] += 1
+
+            before = list(rows)
+            fixer(rows, problems)
+            changed_from = next((i for i, (old, new) in enumerate(zip(before, rows)) if old != new), None)
+            if changed_from is None and len(before) != len(rows):
+                changed_from = min(len(before), len(rows))
+
+            if changed_from is None:
+                if full:
+                    break
+                # Windowed passes are done, confirm the fixes with one full lint
+                full = True
+            else:
+                full = not windowed
+
+        return '\n'.join(rows)
+
+    def fix_section(self, rows: List[str], fixer: Callable[[List[str], List[LintProblem]], None],
+                    max_passes: int, carry: Dict[str, Any], last: bool) -> str:
+        """fix() for one top-level section of a document fixed section by section.
+
+        A run over the whole document lints all sections in every pass, so
+        what a section gets to see in pass n depends on the sections before
+        it as they were in pass n: the top-level keys seen, whether the
+        document is broken already ('syntax', no more syntax problems) or
+        its tokens ended ('tokens', line rules only), and the column of a
+        syntax error yamllint has not put in place of a later problem yet.
+        carry keeps that state for every pass, pass the same dict for all
+        sections in order. last tells whether more sections follow.
+        """
+        self.reset()
+        states = carry.get('states') or [(None, None, frozenset())]
+        passes = []
+        # Problems reported past the section go to the row the next key is on
+        window = rows if last else rows + [_SENTINEL]
+        for index in range(max_passes):
+            broken, pending_column, root_keys = states[min(index, len(states) - 1)]
+            result = None
+            if broken == 'tokens':
+                cosmetic = self._line_problems(rows, last)
+            else:
+                result = self._lint_window(rows, last, self._indentation_pin('\n'.join(window), 0),
+                                           broken is None)
+                cosmetic = self._with_carried_duplicates(rows, root_keys, result.cosmetic)
+
+            if broken is None:
+                problems = _merge_syntax_error(cosmetic, result.syntax)
+                if result.syntax is not None:
+                    broken = 'syntax'
+                    if not any(result.syntax.line <= problem.line and result.syntax.column <= problem.column
+                               for problem in cosmetic):
+                        pending_column = result.syntax.column
+            else:
+                # The syntax error of an earlier section takes the place of the first problem after it
+                replaced = _replaced(cosmetic, pending_column)
+                problems = [problem for problem in cosmetic if problem is not replaced]
+                if replaced is not None:
+                    pending_column = None
+            if result is not None and result.scanner_error:
+                broken = 'tokens'
+            passes.append((broken, pending_column, self._root_keys(rows, root_keys)))
+            self.stats['passes'] += 1
+
+            before = list(rows)
+            fixer(window, problems)
+            if not last:
+                rows[:] = window[:-1]
+                window = rows + [_SENTINEL]
+            if rows == before and index + 1 >= len(states):
+                break
+
+        carry['states'] = passes
+        return '\n'.join(rows)
+
+    def _root_keys(self, rows: List[str], root_keys: frozenset) -> frozenset:
+        """root_keys with the top-level keys of rows added."""
+        keys = set()
+        for start in section_bounds(rows):
+            match = ROOT_KEY.match(rows[start])
+            if match is not None and match.group(1) not in root_keys:
+                keys.add(match.group(1))
+        return root_keys | keys if keys else root_keys
+
+    def _with_carried_duplicates(self, rows: List[str], root_keys: set,
+                                 cosmetic: List[LintProblem]) -> List[LintProblem]:
+        """cosmetic plus key-duplicates problems for top-level keys of earlier sections."""
+        reported = {problem.line for problem in cosmetic if problem.rule == 'key-duplicates'}
+        problems = list(cosmetic)
+        for start in section_bounds(rows):
+            if start + 1 in reported:
+                continue
+            duplicate = self._root_key_duplicate(rows[start], start, set(root_keys))
+            if duplicate is not None:
+                # The key token comes first on its line
+                at = next((i for i, problem in enumerate(problems) if problem.line >= duplicate.line), len(problems))
+                problems.insert(at, duplicate)
+        return problems
+
+    def _seed(self, rows: List[str], problems: List[LintProblem]):
+        """Keep the sections a full lint found before its syntax error."""
+        text = '\n'.join(rows)
+        if not self._windowable(rows, text):
+            return
+        pin = self._indentation_pin(text, 0)
+        syntax_line = next((problem.line for problem in problems if problem.rule is None), None)
+        bounds = section_bounds(rows)
+        for index, start in enumerate(bounds):
+            last = index + 1 == len(bounds)
+            end = len(rows) if last else bounds[index + 1]
+            if syntax_line is not None and syntax_line <= end + 1:
+                break
+            key = ('\n'.join(rows[start:end]) + ('' if last else '\n' + _SENTINEL), pin)
+            if key in self._windows:
+                continue
+            # Duplicated top-level keys are added back by lint()
+            result = _WindowResult([_shifted(problem, -start) for problem in problems
+                                    if start < problem.line <= end and not (
+                                        index and problem.line == start + 1 and problem.column == 1
+                                        and problem.rule == 'key-duplicates')])
+            result.parsed = True
+            result.scanner_error = False
+            self._windows[key] = result
+
+    def _windowable(self, rows: List[str], text: str) -> bool:
+        """Whether the document can be linted section by section."""
+        if rows and re.match(r'^#\s*yamllint disable-file\s*$', rows[0]):
+            return False
+        return not _CROSS_SECTION.search(text)
+
+    def _root_key_duplicate(self, row: str, start: int, root_keys: set) -> Optional[LintProblem]:
+        """key-duplicates problem for a top-level key seen in an earlier section."""
+        match = ROOT_KEY.match(row)
+        if match is None or self._key_duplicates is None:
+            return None
+        key = match.group(1)
+        if key not in root_keys or (key == '<<' and not self._key_duplicates['forbid-duplicated-merge-keys']):
+            root_keys.add(key)
+            return None
+        problem = LintProblem(start + 1, 1, f'duplication of key "{key}" in mapping', 'key-duplicates')
+        problem.level = self._key_duplicates['level']
+        return problem
+
+    def _lint_window(self, rows: List[str], last: bool, pin: Optional[tuple], parse: bool) -> _WindowResult:
+        text = '\n'.join(rows) + ('' if last else '\n' + _SENTINEL)
+        key = (text, pin)
+        result = self._windows.get(key)
+        if result is not None:
+            self.stats['windows_reused'] += 1
+        else:
+            self.stats['windows_linted'] += 1
+            config = self._pinned_config(pin)
+            result = _WindowResult([problem for problem in linter.get_cosmetic_problems(text, config, None)
+                                    if last or problem.line <= len(rows)])
+            self._windows[key] = result
+
+        if parse and not result.parsed:
+            result.syntax, result.scanner_error = _syntax_error(text)
+            result.parsed = True
+        elif result.scanner_error is None:
+            result.scanner_error = _scanner_error(text)
+        return result
+
+    def _line_problems(self, rows: List[str], last: bool) -> List[LintProblem]:
+        """Problems of the line rules only, as yamllint reports them past a scanner error."""
+        text = '\n'.join(rows) + ('' if last else '\n' + _SENTINEL)
+        key = (text, 'lines')
+        problems = self._windows.get(key)
+        if problems is not None:
+            self.stats['windows_reused'] += 1
+            return problems
+        self.stats['windows_linted'] += 1
+
+        problems = []
+        for line in parser.line_generator(text):
+            if not last and line.line_no > len(rows):
+                break
+            for rule in self._line_rules:
+                rule_conf = self.lint_config.rules[rule.ID]
+                for problem in rule.check(rule_conf, line):
+                    problem.rule = rule.ID
+                    problem.level = rule_conf['level']
+                    problems.append(problem)
+        self._windows[key] = problems
+        return problems
+
+    def _indentation_pin(self, text: str, changed_from: int) -> Optional[tuple]:
+        """Indentation width the whole document settles on, for 'consistent' configs."""
+        rule_conf = self.lint_config.rules.get('indentation')
+        if not rule_conf or (rule_conf['spaces'] != 'consistent' and rule_conf['indent-sequences'] != 'consistent'):
+            return None
+        if self._indentation is not None:
+            pin, settled_line = self._indentation
+            if settled_line is not None and changed_from >= settled_line:
+                return pin
+
+        context = {}
+        settled_line = None
+        for elem in parser.token_or_comment_generator(text):
+            if not isinstance(elem, parser.Token):
+                continue
+            for _ in indentation.check(rule_conf, elem.curr, elem.prev, elem.next, elem.nextnext, context):
+                pass
+            if isinstance(context.get('spaces'), int) and context.get('indent-sequences') != 'consistent':
+                # Lines up to the look-ahead tokens decided it
+                settled_line = max(token.end_mark.line for token in (elem.curr, elem.next, elem.nextnext)
+                                   if token is not None) + 1
+                break
+
+        pin = (context.get('spaces', rule_conf['spaces']), context.get('indent-sequences', rule_conf['indent-sequences']))
+        self._indentation = (pin, settled_line)
+        return pin
+
+    def _pinned_config(self, pin: Optional[tuple]) -> YamlLintConfig:
+        if pin is None:
+            return self.lint_config
+        config = self._pinned_configs.get(pin)
+        if config is None:
+            config = copy.copy(self.lint_config)
+            config.rules = dict(self.lint_config.rules)
+            config.rules['indentation'] = dict(self.lint_config.rules['indentation'])
+            config.rules['indentation']['spaces'], config.rules['indentation']['indent-sequences'] = pin
+            self._pinned_configs[pin] = config
+        return config
+
+
+def _syntax_error(text: str) -> Tuple[Optional[LintProblem], bool]:
+    """yamllint's syntax problem and whether the token stream ends early."""
+    try:
+        for _ in yaml.parse(text, Loader=yaml.BaseLoader):
+            pass
+    except yaml.error.MarkedYAMLError as e:
+        problem = LintProblem(e.problem_mark.line + 1, e.problem_mark.column + 1,
+                              'syntax error: ' + e.problem + ' (syntax)')
+        problem.level = 'error'
+        if isinstance(e, yaml.scanner.ScannerError):
+            return problem, True
+        # The parser stopped first, the scanner may still fail further down
+        return problem, _scanner_error(text)
+    return None, False
+
+
+def _scanner_error(text: str) -> bool:
+    """Whether the token stream yamllint checks ends early."""
+    try:
+        for _ in yaml.scan(text, Loader=yaml.BaseLoader):
+            pass
+    except yaml.scanner.ScannerError:
+        return True
+    return False
+
+
+def _shifted(problem: LintProblem, offset: int) -> LintProblem:
+    if not offset:
+        return problem
+    shifted = LintProblem(problem.line + offset, problem.column, problem.desc, problem.rule)
+    shifted.level = problem.level
+    return shifted
+
+
+def _replaced(cosmetic: List[LintProblem], column: Optional[int]) -> Optional[LintProblem]:
+    """First problem a syntax error from an earlier line takes the place of."""
+    if column is None:
+        return None
+    return next((problem for problem in cosmetic if column <= problem.column), None)
+
+
+def _merge_syntax_error(cosmetic: List[LintProblem], syntax: Optional[LintProblem]) -> List[LintProblem]:
+    """Same ordering and dropping as yamllint's own run."""
+    problems = []
+    for problem in cosmetic:
+        if syntax and syntax.line <= problem.line and syntax.column <= problem.column:
+            problems.append(syntax)
+            syntax = None
+            continue
+        problems.append(problem)
+    if syntax:
+        problems.append(syntax)
+    return problems
@@ -0,0 +1,107 @@
+"""
+Top-level section detection for YAML text
+Finds the rows where a new top-level key starts, outside flows, quotes and block scalars
+"""
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# A plain key at column 0 starts a new top-level section
+ROOT_KEY = re.compile(r'([A-Za-z0-9_$][^#\'"\[\]{}]*?)[ \t]*:(?:\s|$)')
+# Rows that can open a flow collection or a quoted scalar spanning rows
+_FLOW_OR_QUOTE = re.compile(r'[\'"\[\]{}]')
+# Literal or folded block scalar header closing a row
+_BLOCK_SCALAR = re.compile(r'(?:^|[\s:-])[|>][-+0-9]*[ \t]*(?:#.*)?$')
+
+
+class SectionTracker:
+    """Row by row top-level section detection.
+
+    Feed the rows of a document in order, starts_section() tells whether the
+    row opens a new top-level section. Commented rows never do.
+    """
+
+    __slots__ = ('depth', 'quote', 'block_indent', 'rows_seen')
+
+    def __init__(self):
+        self.depth = 0
+        self.quote: Optional[str] = None
+        self.block_indent: Optional[int] = None
+        self.rows_seen = 0
+
+    def starts_section(self, row: str) -> bool:
+        """Whether row opens a new top-level section, updates the state."""
+        first = self.rows_seen == 0
+        self.rows_seen += 1
+        if self.block_indent is not None:
+            # Block scalar text is not YAML, it ends at a less indented row
+            stripped = row.lstrip(' ')
+            if not stripped or len(row) - len(stripped) > self.block_indent:
+                return False
+            self.block_indent = None
+
+        starts = not first and not self.depth and self.quote is None and ROOT_KEY.match(row) is not None
+        if _FLOW_OR_QUOTE.search(row):
+            self.depth, self.quote = scan_flow(row, self.depth, self.quote)
+        if not self.depth and self.quote is None and _BLOCK_SCALAR.search(row):
+            self.block_indent = len(row) - len(row.lstrip(' '))
+        return starts
+
+
+def section_bounds(rows: List[str]) -> List[int]:
+    """First row of each top-level section, the first section starts at row 0."""
+    tracker = SectionTracker()
+    return [0] + [i for i, row in enumerate(rows) if tracker.starts_section(row)]
+
+
+def iter_sections(rows: Iterable[str]) -> Iterator[List[str]]:
+    """Rows grouped by top-level section, rows before the first key join the first section."""
+    tracker = SectionTracker()
+    section: List[str] = []
+    has_key = False
+    for row in rows:
+        if tracker.starts_section(row):
+            if has_key:
+                yield section
+                section = []
+            has_key = True
+        elif tracker.rows_seen == 1:
+            has_key = ROOT_KEY.match(row) is not None
+        section.append(row)
+    if section:
+        yield section
+
+
+def scan_flow(row: str, depth: int, quote: Optional[str]) -> Tuple[int, Optional[str]]:
+    """Flow depth and open quote after row, comments and plain text ignored."""
+    i, n = 0, len(row)
+    prev = ''
+    while i < n:
+        ch = row[i]
+        if quote is not None:
+            if quote == '"' and ch == '\\':
+                i += 2
+                continue
+            if ch == quote:
+                if quote == "'" and i + 1 < n and row[i + 1] == "'":
+                    i += 2
+                    continue
+                quote = None
+                # A new token may follow the closed scalar right away
+                prev = ','
+                i += 1
+                continue
+        elif ch == '#' and (i == 0 or row[i - 1] in ' \t'):
+            break
+        elif ch in '\'"' and prev in ('', ':', '-', '?', ',', '[', '{'):
+            quote = ch
+        elif ch in '[{' and (depth or prev in ('', ':', '-', '?', ',', '[', '{')):
+            depth += 1
+        elif ch in ']}' and depth:
+            depth -= 1
+            prev = ','
+            i += 1
+            continue
+        if ch not in ' \t':
+            prev = ch
+        i += 1
+    return depth, quote
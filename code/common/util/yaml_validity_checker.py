@@ -0,0 +1,338 @@
+"""
+Incremental YAML validity checker for the bottom-up uncommenting loop
+Keeps indentation state per block so a new head row is checked in O(row)
+"""
+import re
+from typing import Any, Callable, List, Optional, Tuple
+
+ROW_IGNORABLE = 0
+ROW_KEY = 1
+ROW_ITEM = 2
+ROW_SCALAR = 3
+ROW_COMPLEX = 4
+
+# Rows starting with these are left to the real parser
+_COMPLEX_START = set('-?:,[]{}&*!|>%@`')
+_COMPLEX_VALUE = set('&*!|>')
+_COMMENT = re.compile(r'\s#')
+
+# Plain 'key:', 'key: value', '- value' and '- key: value' rows need no parser
+_SAFE_KEY = r'[A-Za-z_][\w.\-/]*'
+# Values that may resolve to numbers or timestamps are left to the loader,
+# ruamel raises while constructing some of them (e.g. '._')
+_SAFE_VALUE = (r'(?:[A-Za-z/_][^#:\'"\[\]{},&*!|>%@`\t\r]*?'
+               r'|(?:0|[1-9][0-9]*)(?:\.[0-9]+)?)')
+_SIMPLE_ROW = re.compile(
+    r'^ *(?:(?P<dash>-)(?: +|$))?'
+    r'(?:(?P<key>' + _SAFE_KEY + r'):(?: +(?P<value>' + _SAFE_VALUE + r'))?'
+    r'|(?P<scalar>' + _SAFE_VALUE + r'))? *(?: #.*)?$'
+)
+
+
+class RowShape:
+    """Structural summary of one row: kind, column and whether it is open."""
+
+    __slots__ = ('kind', 'col', 'is_open', 'inner_col', 'text')
+
+    def __init__(self, kind: int, col: int = 0, is_open: bool = False,
+                 inner_col: Optional[int] = None, text: str = ""):
+        self.kind = kind
+        self.col = col
+        self.is_open = is_open
+        self.inner_col = inner_col
+        self.text = text
+
+
+class Group:
+    """Sibling entries at one column, already merged with their children.
+
+    lead_is_item: the topmost entry is a sequence item
+    pending: items are followed by keys at the same column, which is only
+             valid when an open key directly above takes the items
+    """
+
+    __slots__ = ('col', 'lead_is_item', 'pending', 'top')
+
+    def __init__(self, col: int, lead_is_item: bool, pending: bool, top: RowShape):
+        self.col = col
+        self.lead_is_item = lead_is_item
+        self.pending = pending
+        self.top = top
+
+
+class IncrementalYAMLChecker:
+    """Block validity checker behind the (bool, parsed) contract of _is_correct_yaml.
+
+    Rows are pushed bottom-up as the block grows. Plain keys and sequence
+    items only update a stack of indentation groups, so checking a head row
+    against the block costs the size of that row, and the caller's own
+    validator is run on the first row to keep its verdict heuristics.
+    Anything the indentation rules cannot decide (block scalars, flows over
+    several rows, anchors, tags, multi-line plain scalars) falls back to
+    is_correct_yaml on the whole block text.
+    """
+
+    def __init__(self, is_correct_yaml: Callable[..., Tuple[bool, Any]],
+                 loader: Callable[[str], Any], verify_on_close: bool = False):
+        self.is_correct_yaml = is_correct_yaml
+        self.loader = loader
+        self.verify_on_close = verify_on_close
+        self.stats = {'incremental': 0, 'full': 0, 'verified': 0, 'mismatches': 0}
+        self._shapes = {}
+        self.reset()
+
+    def reset(self):
+        """Start a new, empty block."""
+        self.pieces: List[str] = []
+        self._joined = ""
+        self._joined_count = 0
+        self.spine: List[Group] = []
+        self.first_row: Optional[str] = None
+        self.broken = False
+        self.complex = False
+
+    def text(self, head: str = "") -> str:
+        """Block text, optionally with a head piece in front."""
+        if self._joined_count < len(self.pieces):
+            self._joined = ''.join(reversed(self.pieces[self._joined_count:])) + self._joined
+            self._joined_count = len(self.pieces)
+        return head + self._joined
+
+    def push(self, piece: str):
+        """Put piece in front of the block."""
+        self.pieces.append(piece)
+        if self.complex:
+            return
+
+        for row in reversed(piece.split('\n')):
+            shape = self._shape(row)
+            if shape.kind == ROW_IGNORABLE:
+                continue
+            if shape.kind in (ROW_COMPLEX, ROW_SCALAR):
+                self.complex = True
+                return
+            if self.broken:
+                continue
+
+            result = self._prepend(self.spine, shape)
+            if result is None:
+                self.complex = True
+                return
+            if not result:
+                self.broken = True
+            self.first_row = row
+
+        self._shapes = {}
+
+    def check(self, head: str, *args) -> Tuple[bool, Any]:
+        """Same result as is_correct_yaml(head + block text, *args)."""
+        if self.complex:
+            return self._full(head, args)
+
+        spine = list(self.spine)
+        broken = self.broken
+        first_row = self.first_row
+        rows = head.split('\n')
+        self._shapes = {}
+
+        for index in range(len(rows) - 1, -1, -1):
+            shape = self._shape(rows[index])
+            self._shapes[rows[index]] = shape
+            if shape.kind == ROW_IGNORABLE:
+                continue
+            if shape.kind == ROW_COMPLEX:
+                return self._full(head, args)
+            if shape.kind == ROW_SCALAR:
+                if any(self._shape(row).kind != ROW_IGNORABLE for row in rows[:index]):
+                    return self._full(head, args)
+                self.stats['incremental'] += 1
+                if spine or broken:
+                    # A scalar followed by block content is an error or a string
+                    return False, None
+                return self.is_correct_yaml(shape.text, *args)
+            if broken:
+                continue
+
+            result = self._prepend(spine, shape)
+            if result is None:
+                return self._full(head, args)
+            if not result:
+                broken = True
+            first_row = shape.text
+
+        self.stats['incremental'] += 1
+        if broken:
+            return False, None
+        if not spine:
+            return self.is_correct_yaml(head, *args)
+        if len(spine) > 1 or spine[0].pending:
+            return False, None
+        return self.is_correct_yaml(first_row, *args)
+
+    def close(self, *args) -> Optional[bool]:
+        """Close the block; the only place where a full re-parse may happen.
+
+        With verify_on_close the whole block is parsed once and compared
+        with the incremental verdict, the result is returned and counted.
+        """
+        same = None
+        if self.verify_on_close and self.pieces:
+            expected, _ = self.is_correct_yaml(self.text(), *args)
+            actual, _ = self.check("", *args)
+            same = expected == actual
+            self.stats['verified'] += 1
+            if not same:
+                self.stats['mismatches'] += 1
+        self.reset()
+        return same
+
+    def _full(self, head: str, args) -> Tuple[bool, Any]:
+        self.stats['full'] += 1
+        return self.is_correct_yaml(self.text(head), *args)
+
+    def _shape(self, row: str) -> RowShape:
+        """Classify a single row, asking the loader only for content rows."""
+        cached = self._shapes.get(row)
+        if cached is not None:
+            return cached
+
+        stripped = row.strip()
+        if not stripped or stripped.startswith('#'):
+            return RowShape(ROW_IGNORABLE)
+        if '\t' in row or '\r' in row:
+            return RowShape(ROW_COMPLEX)
+
+        col = len(row) - len(row.lstrip(' '))
+        match = _SIMPLE_ROW.match(row)
+        if match:
+            shape = self._simple_shape(match, col, row)
+            if shape is not None:
+                return shape
+        try:
+            parsed = self.loader(row)
+        except Exception:
+            return RowShape(ROW_COMPLEX)
+
+        if stripped[0] == '-' and (len(stripped) == 1 or stripped[1] == ' '):
+            if not isinstance(parsed, list) or len(parsed) != 1:
+                return RowShape(ROW_COMPLEX)
+            inner = stripped[1:].lstrip(' ')
+            if not inner or inner.startswith('#'):
+                return RowShape(ROW_ITEM, col, True, None, row)
+            if inner[0] in _COMPLEX_START:
+                return RowShape(ROW_COMPLEX)
+            item = parsed[0]
+            if isinstance(item, dict):
+                is_open = self._key_is_open(inner, item)
+                if is_open is None:
+                    return RowShape(ROW_COMPLEX)
+                return RowShape(ROW_ITEM, col, is_open, col + len(stripped) - len(inner), row)
+            return RowShape(ROW_ITEM, col, False, None, row)
+
+        if stripped[0] in _COMPLEX_START:
+            return RowShape(ROW_COMPLEX)
+        if isinstance(parsed, dict):
+            is_open = self._key_is_open(stripped, parsed)
+            if is_open is None:
+                return RowShape(ROW_COMPLEX)
+            return RowShape(ROW_KEY, col, is_open, None, row)
+        if parsed is None or isinstance(parsed, list):
+            return RowShape(ROW_COMPLEX)
+        return RowShape(ROW_SCALAR, col, False, None, row)
+
+    @staticmethod
+    def _simple_shape(match, col: int, row: str) -> Optional[RowShape]:
+        """Shape of a row matched by _SIMPLE_ROW, None when the match is ambiguous."""
+        dash, key, value, scalar = match.group('dash', 'key', 'value', 'scalar')
+        if dash is None:
+            if key is None:
+                return None
+            return RowShape(ROW_KEY, col, value is None, None, row)
+        if key is None:
+            return RowShape(ROW_ITEM, col, scalar is None, None, row)
+        return RowShape(ROW_ITEM, col, value is None, match.start('key'), row)
+
+    def _key_is_open(self, content: str, parsed: dict) -> Optional[bool]:
+        """True for 'key:', False for 'key: value', None when not a plain key row."""
+        if len(parsed) != 1 or content[0] in '"\'':
+            return None
+        key, value = next(iter(parsed.items()))
+        if key == '<<':
+            return None
+
+        content = _COMMENT.split(content, 1)[0].rstrip()
+        if ': ' in content:
+            value_text = content.split(': ', 1)[1].lstrip()
+            if value_text and value_text[0] in _COMPLEX_VALUE:
+                return None
+        return value is None and content.endswith(':')
+
+    def _prepend(self, spine: List[Group], shape: RowShape) -> Optional[bool]:
+        """Put shape on top of the spine.
+
+        Returns False when the rows can no longer form one valid document
+        and None when only the real parser can tell.
+        """
+        col = shape.col
+        if not spine or col > spine[-1].col:
+            spine.append(self._new_group(shape))
+            return True
+
+        top = spine[-1]
+        if col == top.col:
+            merged = self._merge(shape, False, top)
+            if merged is None:
+                return False
+            spine[-1] = merged
+            return True
+
+        # The top group is nested below this row
+        inner_col = shape.inner_col
+        if inner_col is None or top.col > inner_col:
+            if not shape.is_open:
+                return self._closed_before(top)
+            if top.pending:
+                return False
+            spine.pop()
+            if inner_col is not None and spine and spine[-1].col == inner_col:
+                if spine[-1].lead_is_item:
+                    return False
+                spine.pop()
+        elif top.col == inner_col:
+            if top.lead_is_item and not shape.is_open:
+                return False
+            spine.pop()
+        else:
+            return False
+
+        if spine and spine[-1].col > col:
+            return False
+        if spine and spine[-1].col == col:
+            merged = self._merge(shape, True, spine[-1])
+            if merged is None:
+                return False
+            spine[-1] = merged
+            return True
+        spine.append(self._new_group(shape))
+        return True
+
+    @staticmethod
+    def _new_group(shape: RowShape) -> Group:
+        return Group(shape.col, shape.kind == ROW_ITEM, False, shape)
+
+    @staticmethod
+    def _merge(shape: RowShape, has_children: bool, group: Group) -> Optional[Group]:
+        """Sibling entry on top of a group at the same column."""
+        if shape.kind == ROW_KEY:
+            if group.lead_is_item and (not shape.is_open or has_children):
+                return None
+            return Group(shape.col, False, False, shape)
+        return Group(shape.col, True, group.pending or not group.lead_is_item, shape)
+
+    @staticmethod
+    def _closed_before(top: Group) -> Optional[bool]:
+        """A row with a value followed by deeper rows."""
+        if top.top.kind == ROW_KEY or top.top.inner_col is not None:
+            return False
+        # Deeper items may still be a multi-line plain scalar
+        return None
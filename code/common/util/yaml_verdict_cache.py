@@ -0,0 +1,200 @@
+"""
+Content-hash memo cache for YAML validity verdicts
+Shared by the uncommenting validators, optionally persisted between runs
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ruamel.yaml import __version__ as RUAMEL_VERSION
+
+CACHE_FORMAT = 1
+_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+class YAMLVerdictCache:
+    """Bounded LRU of validity verdicts keyed by namespace and snippet hash.
+
+    Each entry keeps the verdict, the type name of the parsed document and
+    the parsed value itself when it is a scalar. Mappings and sequences are
+    not kept, memoize() returns None as parsed for them on a miss as on a
+    hit, see scalar_verdict(). Entries are evicted in LRU order once
+    max_entries or max_bytes is exceeded.
+    """
+
+    ENTRY_OVERHEAD = 96
+
+    def __init__(self, max_entries: int = 50000, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, Tuple[bool, str, Any]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.loaded_paths = set()
+        self._recorded: Optional[Dict[str, Tuple[bool, str, Any]]] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(namespace: str, content: str) -> str:
+        """Cache key; leading newlines never change the parse and are dropped."""
+        normalized = content.lstrip('\n').encode('utf-8', 'surrogatepass')
+        return f"{namespace}:{hashlib.blake2b(normalized, digest_size=16).hexdigest()}"
+
+    def lookup(self, namespace: str, content: str) -> Optional[Tuple[bool, Any]]:
+        """(valid, parsed) from the cache or None on a miss."""
+        key = self.key(namespace, content)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry[0], entry[2]
+
+    def store(self, namespace: str, content: str, valid: bool, parsed: Any):
+        """Remember the verdict for content."""
+        scalar = parsed if isinstance(parsed, _SCALAR_TYPES) else None
+        key, entry = self.key(namespace, content), (bool(valid), type(parsed).__name__, scalar)
+        if self._recorded is not None:
+            self._recorded[key] = entry
+        self._insert(key, entry)
+
+    def memoize(self, namespace: str, validator: Callable[..., Tuple[bool, Any]],
+                content: str, *args) -> Tuple[bool, Any]:
+        """scalar_verdict(*validator(content, *args)) through the cache."""
+        cached = self.lookup(namespace, content)
+        if cached is not None:
+            return cached
+        valid, parsed = validator(content, *args)
+        self.store(namespace, content, valid, parsed)
+        return scalar_verdict(valid, parsed)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters used to size the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def record(self):
+        """Keep the verdicts stored from now on for take_recorded()."""
+        self._recorded = {}
+
+    def take_recorded(self) -> List[list]:
+        """Verdicts stored since record(), in the file format, and stop recording."""
+        recorded, self._recorded = self._recorded or {}, None
+        return [[key, *entry] for key, entry in recorded.items()]
+
+    def merge(self, entries: List[list]) -> int:
+        """Add verdicts taken from another cache, returns the number added."""
+        merged = 0
+        for key, valid, type_name, scalar in entries:
+            if key not in self._entries:
+                self._insert(key, (bool(valid), type_name, scalar))
+                merged += 1
+        return merged
+
+    def clear(self):
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.loaded_paths.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def load(self, path: str) -> int:
+        """Merge entries persisted by save(), returns the number loaded.
+
+        Files written by another cache format or ruamel version are ignored.
+        """
+        self.loaded_paths.add(path)
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if data.get('format') != CACHE_FORMAT or data.get('ruamel') != RUAMEL_VERSION:
+            return 0
+
+        loaded = 0
+        for key, valid, type_name, scalar in reversed(data.get('entries', [])):
+            if key not in self._entries:
+                self._insert(key, (bool(valid), type_name, scalar), touch=False)
+                loaded += 1
+        return loaded
+
+    def save(self, path: str):
+        """Write the cache to path atomically, most recently used entries last."""
+        with self._lock:
+            entries = [[key, *entry] for key, entry in self._entries.items()]
+        payload = {'format': CACHE_FORMAT, 'ruamel': RUAMEL_VERSION, 'entries': entries}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _insert(self, key: str, entry: Tuple[bool, str, Any], touch: bool = True):
+        size = self._entry_size(entry)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= self._entry_size(old)
+            self._entries[key] = entry
+            if not touch:
+                # Entries loaded from disk are older than anything seen in this run
+                self._entries.move_to_end(key, last=False)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._entry_size(evicted)
+                self.evictions += 1
+
+    def _entry_size(self, entry: Tuple[bool, str, Any]) -> int:
+        return self.ENTRY_OVERHEAD + (len(entry[2]) if isinstance(entry[2], str) else 0)
+
+
+_shared_cache: Optional[YAMLVerdictCache] = None
+
+
+def scalar_verdict(valid: bool, parsed: Any) -> Tuple[bool, Any]:
+    """(valid, parsed) as the cache returns it, parsed None unless it is a scalar.
+
+    Validators using the cache return this whether it is enabled or not, so
+    callers never see a mapping or sequence as parsed.
+    """
+    return bool(valid), parsed if isinstance(parsed, _SCALAR_TYPES) else None
+
+
+def shared_verdict_cache() -> YAMLVerdictCache:
+    """Process-wide cache shared by all YAML validators."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = YAMLVerdictCache()
+    return _shared_cache
@@ -15,6 +15,12 @@ from box import Box
 from common.trace_handler import TraceHandler
 from common.error_handler import ErrorHandler
 
+try:
+    from ai_platform.common.util.yaml_verdict_cache import shared_verdict_cache
+    VERDICT_CACHE_AVAILABLE = True
+except ImportError:
+    VERDICT_CACHE_AVAILABLE = False
+
 
 class YAMLProcessorEngine:
     """YAML processing engine integrating uncomment-00 functionality."""
@@ -34,6 +40,8 @@ class YAMLProcessorEngine:
         yaml.allow_duplicate_keys = True
         self.yamel.allow_duplicate_keys = None
 
+        self.verdict_cache = shared_verdict_cache() if VERDICT_CACHE_AVAILABLE else None
+
     def _load_default_config(self):
         """Load default configuration."""
         return {
@@ -43,6 +51,7 @@ class YAMLProcessorEngine:
             'stop_on_ruamel_error': False,
             'stop_on_pyyaml_error': False,
             'max_errors_to_fix': 2000,
+            'verdict_cache_path': None,
             'system_size_mapping': {
                 "small-system": "default_small_system_profile",
                 "standard-system": "default_standard_system_profile",
@@ -64,6 +73,9 @@ class YAMLProcessorEngine:
         """Main processing method."""
         try:
             self.tracer.info(f"Processing YAML template: {input_path}")
+            cache_path = self.config['verdict_cache_path']
+            if self.verdict_cache and cache_path and cache_path not in self.verdict_cache.loaded_paths:
+                self.verdict_cache.load(cache_path)
 
             # Load external data
             if mrcf_path:
@@ -93,6 +105,9 @@ class YAMLProcessorEngine:
             with open(output_path, 'w', encoding='utf-8', newline='\n') as f:
                 f.write(content)
 
+            if self.verdict_cache and cache_path:
+                self.verdict_cache.save(cache_path)
+
             self.tracer.info(f"Successfully processed to: {output_path}")
             return True
 
@@ -337,11 +352,16 @@ class YAMLProcessorEngine:
 
     def _is_correct_yaml(self, content: str) -> bool:
         """Check if content is valid YAML."""
+        if self.verdict_cache is not None:
+            return self.verdict_cache.memoize('yaml_processor_engine', self._load_yaml_verdict, content)[0]
+        return self._load_yaml_verdict(content)[0]
+
+    def _load_yaml_verdict(self, content: str):
+        """Parse content, (valid, parsed) as expected by the verdict cache."""
         try:
-            self.yamel.load(content)
-            return True
+            return True, self.yamel.load(content)
         except:
-            return False
+            return False, None
 
     def _is_allowed_content(self, content: str) -> bool:
         """Check if content is allowed even if not valid YAML."""
@@ -0,0 +1,123 @@
+"""
+Regression test for the in-memory processing API
+Artifacts equal the files written, the disk sink writes all of them or none
+"""
+import contextlib
+import io
+import os
+import stat
+import sys
+import tempfile
+import unittest
+import warnings
+from unittest import mock
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from backend.service_layer.yaml_processing import artifact_sink
+from backend.service_layer.yaml_processing.artifact_sink import ArtifactSink, artifact_path
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+
+TEMPLATE = "b: '{{ 1 | 2 | 3 }}'\nc:\n  d: 2\n#  d: 1\na: [1, 2]\n"
+
+
+class TestArtifactSink(unittest.TestCase):
+    """Processing returns text, writing it is up to the sink."""
+
+    def _quiet(self, call, *args, **kwargs):
+        with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+            warnings.simplefilter('ignore')
+            return call(*args, **kwargs)
+
+    def test_artifacts_match_written_files(self):
+        """Every artifact is the text of the file process_yaml_template writes for it."""
+        service = YAMLProcessingService({'verdict_cache': False})
+        result = self._quiet(service.process_yaml_content, TEMPLATE, system_size='large-system')
+        self.assertTrue(result['success'], result.get('error'))
+        self.assertEqual(list(result['artifacts']),
+                         ['main', 'fixed', 'rewritten_ruamel', 'rewritten_pyyaml', 'values_set',
+                          'values_set_rewritten_ruamel', 'values_set_rewritten_pyyaml'])
+        self.assertNotIn('files_generated', result)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = os.path.join(tmp, 'template.yaml')
+            output_path = os.path.join(tmp, 'out.yaml')
+            with open(input_path, 'w', encoding='utf-8') as f:
+                f.write(TEMPLATE)
+            written = self._quiet(YAMLProcessingService({'verdict_cache': False}).process_yaml_template,
+                                  input_path, output_path, system_size='large-system')
+            self.assertEqual(written['files_generated'],
+                             [artifact_path(output_path, name) for name in result['artifacts']])
+            for name, text in result['artifacts'].items():
+                with open(artifact_path(output_path, name), 'r', encoding='utf-8') as f:
+                    self.assertEqual(f.read(), text, name)
+            self.assertEqual(sorted(os.listdir(tmp)),
+                             sorted(['template.yaml'] + [os.path.basename(p) for p in written['files_generated']]))
+
+    def test_failed_write_keeps_old_outputs(self):
+        """A failing rename leaves the previous files and no temp files behind."""
+        with tempfile.TemporaryDirectory() as tmp:
+            output_path = os.path.join(tmp, 'out.yaml')
+            sink = ArtifactSink(output_path, 'utf-8')
+            self.assertEqual(sink.write({'main': 'old\n', 'fixed': 'old fixed\n'}),
+                             [output_path, os.path.join(tmp, 'out_fixed.yaml')])
+
+            replace = os.replace
+            renamed = []
+
+            def failing_replace(src, dst):
+                if renamed:
+                    raise OSError('disk full')
+                renamed.append(dst)
+                replace(src, dst)
+
+            with mock.patch.object(artifact_sink.os, 'replace', side_effect=failing_replace):
+                with self.assertRaises(OSError):
+                    ArtifactSink(output_path, 'utf-8').write({'main': 'new\n', 'fixed': 'new fixed\n'})
+            self.assertEqual(sorted(os.listdir(tmp)), ['out.yaml', 'out_fixed.yaml'])
+            with open(os.path.join(tmp, 'out_fixed.yaml'), 'r', encoding='utf-8') as f:
+                self.assertEqual(f.read(), 'old fixed\n')
+
+    def test_failed_processing_writes_nothing(self):
+        """A template failing half way leaves no partial outputs."""
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = os.path.join(tmp, 'template.yaml')
+            with open(input_path, 'w', encoding='utf-8') as f:
+                f.write(TEMPLATE)
+            service = YAMLProcessingService({'verdict_cache': False})
+            with mock.patch.object(service, '_fix_values_comprehensive', side_effect=ValueError('bad size')):
+                result = self._quiet(service.process_yaml_template, input_path, os.path.join(tmp, 'out.yaml'))
+            self.assertFalse(result['success'])
+            self.assertEqual(os.listdir(tmp), ['template.yaml'])
+
+    def test_output_mode_same_as_streaming(self):
+        """Atomic and streaming outputs get the umask default mode, overwritten files keep theirs."""
+        def modes(tmp, streaming):
+            input_path = os.path.join(tmp, 'template.yaml')
+            with open(input_path, 'w', encoding='utf-8') as f:
+                f.write(TEMPLATE)
+            service = YAMLProcessingService({'verdict_cache': False, 'streaming': streaming})
+            result = self._quiet(service.process_yaml_template, input_path, os.path.join(tmp, 'out.yaml'),
+                                 system_size='large-system')
+            self.assertTrue(result['success'], result.get('error'))
+            return {os.path.basename(path): stat.S_IMODE(os.stat(path).st_mode) for path in result['files_generated']}
+
+        umask = os.umask(0o022)
+        try:
+            with tempfile.TemporaryDirectory() as atomic, tempfile.TemporaryDirectory() as streamed:
+                expected = modes(streamed, True)
+                self.assertEqual(set(expected.values()), {0o644})
+                self.assertEqual(modes(atomic, False), expected)
+
+                os.chmod(os.path.join(atomic, 'out.yaml'), 0o640)
+                os.chmod(os.path.join(streamed, 'out.yaml'), 0o640)
+                self.assertEqual(modes(atomic, False), modes(streamed, True))
+                self.assertEqual(modes(atomic, False)['out.yaml'], 0o640)
+        finally:
+            os.umask(umask)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+Regression test for incremental processing with the block cache
+Reused blocks must stitch into the files a full run writes
+"""
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+import warnings
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+from backend.service_layer.yaml_processing import incremental_blocks
+
+WORDS = ['alpha', 'beta', 'gamma', 'delta', 'kappa']
+VALUES = ['1', 'true', '[]', '"quoted text"', '{{ 1 | 2 | 3 }}', '"{{ small | standard | large }}"']
+
+
+def commented_template(rnd: random.Random, sections: int) -> str:
+    """Values template with commented-out rows, placeholders and some broken indentation."""
+    rows = ['# Header comment']
+    for index in range(sections):
+        section = [f'root{index}:']
+        for _ in range(rnd.randint(1, 4)):
+            key = rnd.choice(WORDS) + str(rnd.randint(0, 9))
+            if rnd.random() < 0.3:
+                section += [f'  {key}:', f'    {rnd.choice(WORDS)}: {rnd.choice(VALUES)}']
+            else:
+                section.append(' ' * rnd.choice([2, 2, 2, 3]) + f'{key}: {rnd.choice(VALUES)}')
+        for i in rnd.sample(range(1, len(section)), rnd.randint(0, len(section) - 1)):
+            section[i] = '#' + section[i]
+        rows += section + ([''] if rnd.random() < 0.5 else [])
+    return '\n'.join(rows) + '\n'
+
+
+class TestBlockCache(unittest.TestCase):
+    """Incremental runs reprocess only what changed and write what a full run writes."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+        self.cache_path = os.path.join(self.tmp, 'blocks.json')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _run(self, content, block_cache_path=None, service=None, system_size='large-system', **sources):
+        service = service or YAMLProcessingService({'verdict_cache': False, 'block_cache_path': block_cache_path})
+        with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+            warnings.simplefilter('ignore')
+            result = service.process_yaml_content(content, system_size=system_size, **sources)
+        self.assertTrue(result['success'], result.get('error'))
+        return result
+
+    def test_incremental_matches_full_run(self):
+        """Artifacts are the same with a cold cache, a warm cache and no cache."""
+        rnd = random.Random(4)
+        for _ in range(15):
+            content = commented_template(rnd, rnd.randint(1, 6))
+            with self.subTest(content=content[:80]):
+                expected = self._run(content)['artifacts']
+                cold = self._run(content, self.cache_path)
+                warm = self._run(content, self.cache_path)
+                self.assertEqual(cold['artifacts'], expected)
+                self.assertEqual(warm['artifacts'], expected)
+                self.assertEqual(warm['blocks_reused'], warm['blocks'])
+
+    def test_edit_reprocesses_changed_block(self):
+        """Editing a value inside one block reuses all the others."""
+        rnd = random.Random(7)
+        content = commented_template(rnd, 8)
+        first = self._run(content, self.cache_path)
+        self.assertEqual(first['blocks'], 8)
+        self.assertEqual(first['blocks_reused'], 0)
+
+        edited = content.replace('root5:\n', 'root5:\n  added: "{{ a | b }}"\n', 1)
+        second = self._run(edited, self.cache_path)
+        self.assertEqual(second['blocks_reused'], 7)
+        self.assertEqual(second['artifacts'], self._run(edited)['artifacts'])
+
+    def test_cache_kept_between_runs(self):
+        """A new service picks the results up from the cache file."""
+        content = commented_template(random.Random(2), 4)
+        self._run(content, self.cache_path)
+        self.assertTrue(os.path.exists(self.cache_path))
+        self.assertEqual(self._run(content, self.cache_path)['blocks_reused'], 4)
+
+        # Other system sizes and configurations do not take results made for another one
+        self.assertEqual(self._run(content, self.cache_path, system_size='small-system')['blocks_reused'], 0)
+        service = YAMLProcessingService({'verdict_cache': False, 'block_cache_path': self.cache_path,
+                                         'max_errors_to_fix': 1})
+        self.assertEqual(self._run(content, service=service)['blocks_reused'], 0)
+
+    def test_knowledge_keyed_by_source_digests(self):
+        """Blocks are keyed on the MRCF and Helm digests, the maps are hashed only when set directly."""
+        content = commented_template(random.Random(5), 3)
+        mrcf_path = os.path.join(self.tmp, 'mrcf.json')
+        helm_path = os.path.join(self.tmp, 'helm')
+        os.makedirs(helm_path)
+        with open(os.path.join(helm_path, 'values.yaml'), 'w', encoding='utf-8') as f:
+            f.write('root0:\n  alpha1: 1\n')
+
+        hashed = []
+        block_key = incremental_blocks.block_key
+
+        def recording_block_key(*parts):
+            hashed.extend(part for part in parts if isinstance(part, dict) and 'root1/beta2' in part)
+            return block_key(*parts)
+
+        incremental_blocks.block_key = recording_block_key
+        try:
+            for default, reused in ((1, 0), (1, 3), (2, 0)):
+                with open(mrcf_path, 'w', encoding='utf-8') as f:
+                    json.dump({'parameters': [{'path': 'root1/beta2', 'default': default}]}, f)
+                result = self._run(content, self.cache_path, mrcf_path=mrcf_path, helm_path=helm_path)
+                self.assertEqual(result['blocks_reused'], reused)
+            self.assertEqual(hashed, [])
+
+            # Maps filled in directly have no source digest
+            service = YAMLProcessingService({'verdict_cache': False, 'block_cache_path': self.cache_path})
+            service.map_path_mrcf.update({'root1/beta2': {'path': 'root1/beta2', 'default': 3}})
+            self.assertEqual(self._run(content, service=service)['blocks_reused'], 0)
+            self.assertIn(service.map_path_mrcf, hashed)
+        finally:
+            incremental_blocks.block_key = block_key
+
+    def test_template_written_from_cache(self):
+        """process_yaml_template writes the stitched files and reports the reused blocks."""
+        content = commented_template(random.Random(3), 3)
+        input_path = os.path.join(self.tmp, 'template.yaml')
+        with open(input_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        service = YAMLProcessingService({'verdict_cache': False, 'block_cache_path': self.cache_path})
+        for reused in (0, 3):
+            with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+                warnings.simplefilter('ignore')
+                result = service.process_yaml_template(input_path, os.path.join(self.tmp, 'out.yaml'))
+            self.assertTrue(result['success'], result.get('error'))
+            self.assertEqual(result['blocks_reused'], reused)
+        with open(os.path.join(self.tmp, 'out.yaml'), 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), self._run(content, system_size='standard-system')['artifacts']['main'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Regression test for the columnar template analysis
+Array features, classifications and confidences match the per-line analysis
+"""
+import logging
+import os
+import random
+import sys
+import unittest
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from common.handler.trace_handler import TraceHandler
+from common.handler.path_handler import PathHandler
+from backend.service_layer.ai_engine.structure_analysis.structure_analysis_engine import StructureAnalysisEngine
+from backend.service_layer.ai_engine.template_analysis.template_analysis_engine import TemplateAnalysisEngine
+
+SAMPLE_TEMPLATE = os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values.yaml')
+HELM_DATA = {'global': {'port': 80, 'hosts': [{'name': 'a'}]}, 'server': {'config': {'path': '/x'}}}
+PIECES = ['#', '# ', '  ', '- ', 'port', 'host', ':', ' ', 'Config', 'MUST', 'Note', 'example', '"q"', "'",
+          '[1]', '{{ .Values.x }}', '\\{\\{', 'É', 'ß', 'ΣΑΣ', '\u2003', '\x1c', '\t', 'word', 'required', '\\s']
+
+
+def analyse(raw_lines, columnar):
+    tracer = TraceHandler("TestPlatform", "1.0", "ColumnarTest")
+    structure = StructureAnalysisEngine(tracer, PathHandler())
+    structure.build_from_sources(HELM_DATA, {'server.config.path': '/x', 'global.port': 80})
+    engine = TemplateAnalysisEngine(tracer, PathHandler(), structure, columnar=columnar)
+    engine.process_template(raw_lines)
+    return engine
+
+
+class TestColumnarTemplateAnalysis(unittest.TestCase):
+    """Columnar against per-line template analysis."""
+
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def assert_same_analysis(self, raw_lines):
+        per_line, columnar = analyse(raw_lines, False), analyse(raw_lines, True)
+        self.assertIsNotNone(columnar.columns)
+        self.assertEqual(len(per_line.lines), len(columnar.lines))
+        for idx, (expected, line) in enumerate(zip(per_line.lines, columnar.lines)):
+            features = {name: columnar.columns[name][idx].item() for name in expected.ai_features}
+            self.assertEqual(features, expected.ai_features, repr(expected.raw_content))
+            self.assertEqual((line.classification, line.confidence, line.identified_path),
+                             (expected.classification, expected.confidence, expected.identified_path),
+                             repr(expected.raw_content))
+            self.assertEqual(columnar.columns["confidence"][idx], line.confidence)
+        self.assertEqual(columnar.stats, per_line.stats)
+        self.assertEqual(columnar.get_classification_summary(), per_line.get_classification_summary())
+
+    def test_sample_template(self):
+        """The sample template is analysed the same."""
+        with open(SAMPLE_TEMPLATE, encoding='utf-8') as f:
+            self.assert_same_analysis(f.readlines())
+
+    def test_random_lines(self):
+        """Random lines of keys, comments, keywords, templates and non-ASCII text are analysed the same."""
+        rnd = random.Random(3)
+        for _ in range(20):
+            raw_lines = [''.join(rnd.choice(PIECES) for _ in range(rnd.randint(0, 8))) + '\n'
+                         for _ in range(rnd.randint(0, 60))]
+            self.assert_same_analysis(raw_lines)
+
+    def test_line_breaks_inside_lines(self):
+        """Lines with line breaks inside fall back to the per-line analysis."""
+        raw_lines = ['a: 1\n', '# b:\n c\n']
+        engine = analyse(raw_lines, True)
+        self.assertIsNone(engine.columns)
+        self.assertEqual([(line.classification, line.confidence) for line in engine.lines],
+                         [(line.classification, line.confidence) for line in analyse(raw_lines, False).lines])
+
+
+if __name__ == '__main__':
+    unittest.main()
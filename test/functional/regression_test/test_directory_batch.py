@@ -0,0 +1,125 @@
+"""
+Regression test for process_directory
+Worker processes must write the same files as processing the templates one by one
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+import warnings
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+
+TEMPLATES = [
+    "# Header comment\nroot0:\n  a: 1\n#  b: 2\n\nroot1:\n  c: '{{ 1 | 2 | 3 }}'\n",
+    "root0:\n#  nested:\n#    key: value\n  other: true\n",
+    "root0: {}\nroot1:\n  - one\n#  - two\n",
+    "a:\n  b: 1\nc:\n  d: '{{ small | standard | large }}'\n",
+]
+
+
+def read_tree(root):
+    files = {}
+    for folder, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(folder, name)
+            with open(path, 'r', encoding='utf-8') as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+class TestDirectoryBatch(unittest.TestCase):
+    """Directory batches and single-template runs agree."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.tmp.name, 'templates')
+        self.names = []
+        for index, content in enumerate(TEMPLATES * 3):
+            name = os.path.join('nested' if index % 3 == 0 else '', f'template{index:02d}.yaml')
+            os.makedirs(os.path.join(self.input_dir, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(self.input_dir, name), 'w', encoding='utf-8') as f:
+                f.write(content)
+            self.names.append(name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _service(self):
+        return YAMLProcessingService({'verdict_cache': False})
+
+    def _quiet(self):
+        stack = contextlib.ExitStack()
+        stack.enter_context(warnings.catch_warnings())
+        warnings.simplefilter('ignore')
+        stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        return stack
+
+    def test_parallel_matches_single_runs(self):
+        """Outputs of two workers equal the template by template outputs, results keep template order."""
+        single_dir = os.path.join(self.tmp.name, 'single')
+        batch_dir = os.path.join(self.tmp.name, 'batch')
+        service = self._service()
+        with self._quiet():
+            for name in self.names:
+                os.makedirs(os.path.join(single_dir, os.path.dirname(name)), exist_ok=True)
+                service.process_yaml_template(os.path.join(self.input_dir, name),
+                                              os.path.join(single_dir, name), system_size='large-system')
+            result = self._service().process_directory(self.input_dir, batch_dir,
+                                                       system_size='large-system', workers=2)
+
+        self.assertEqual(result['workers'], 2)
+        self.assertEqual(result['total'], len(self.names))
+        self.assertEqual([os.path.relpath(res['input_path'], self.input_dir) for res in result['results']],
+                         sorted(self.names))
+        self.assertTrue(all(res['elapsed'] >= 0 for res in result['results']))
+        self.assertEqual(read_tree(batch_dir), read_tree(single_dir))
+
+    def test_worker_caches_merged(self):
+        """Verdicts and block results of the workers end up in the cache files, CPU time is per template."""
+        verdict_path = os.path.join(self.tmp.name, 'verdicts.json')
+        block_path = os.path.join(self.tmp.name, 'blocks.json')
+        results = []
+        # The second batch finds every block of the first one in the cache file
+        for _ in range(2):
+            service = YAMLProcessingService({'verdict_cache': True, 'verdict_cache_path': verdict_path,
+                                             'block_cache_path': block_path})
+            service.verdict_cache.clear()
+            with self._quiet():
+                results.append(service.process_directory(self.input_dir, os.path.join(self.tmp.name, 'out'),
+                                                         workers=2))
+        for path in (verdict_path, block_path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.assertTrue(json.load(f)['entries'])
+
+        second = results[1]
+        self.assertEqual([res['blocks_reused'] for res in second['results']],
+                         [res['blocks'] for res in second['results']])
+        self.assertEqual(second['cpu_time'], sum(res['cpu_time'] for res in second['results']))
+        self.assertTrue(all(0 <= res['cpu_time'] for res in second['results']))
+
+    def test_output_inside_input(self):
+        """Outputs under the input directory are not picked up as templates."""
+        output_dir = os.path.join(self.input_dir, 'out')
+        with self._quiet():
+            first = self._service().process_directory(self.input_dir, output_dir, workers=1)
+            second = self._service().process_directory(self.input_dir, output_dir, workers=1)
+        self.assertEqual(first['total'], len(self.names))
+        self.assertEqual(second['total'], len(self.names))
+
+    def test_same_directory_rejected(self):
+        """Writing outputs over the templates is refused."""
+        result = self._service().process_directory(self.input_dir, self.input_dir)
+        self.assertFalse(result['success'])
+        self.assertEqual(result['results'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
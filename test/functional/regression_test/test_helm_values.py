@@ -0,0 +1,117 @@
+"""
+Regression test for the parallel Helm values ingestion
+Pool, cache and sequential loading must build the same path map
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from backend.service_layer.yaml_processing import helm_values
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+
+CHARTS = {
+    '': "image:\n  repository: umbrella\n  tag: 1\nreplicas: 3\n",
+    'charts/beta': "image:\n  repository: beta\n  tag: 2\nports: [http, 8080]\n"
+                   "notes: |\n  line one\n  line two\n",
+    'charts/alpha': "image:\n  repository: umbrella\n  tag: 5\nports: [grpc]\nsome.key: true\n",
+    'charts/alpha/charts/gamma': "image:\n  repository: gamma\nlist:\n  - name: a\n  - name: b\n",
+}
+
+
+class TestHelmValues(unittest.TestCase):
+    """Helm values files are merged in chart tree order, however they were parsed."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.charts = os.path.join(self._tmp.name, 'umbrella')
+        for chart, values in CHARTS.items():
+            os.makedirs(os.path.join(self.charts, chart), exist_ok=True)
+            with open(os.path.join(self.charts, chart, 'values.yaml'), 'w', encoding='utf-8') as f:
+                f.write(values)
+        self.cache_path = os.path.join(self._tmp.name, 'helm.json')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _load(self, **config):
+        service = YAMLProcessingService(config)
+        with contextlib.redirect_stdout(io.StringIO()):
+            service._load_helm_data(self.charts)
+        return service.map_path_helm
+
+    def test_merged_in_tree_order(self):
+        """Strings collect every chart, other leaves are the last chart's, subcharts depth first by name."""
+        helm = self._load(helm_workers=1)
+        alpha = self.charts + '/alpha'
+        self.assertEqual(helm['/image/repository'], {
+            'values': ['umbrella', 'gamma', 'beta'],
+            'files': [[self.charts, alpha], [alpha + '/gamma'], [self.charts + '/beta']]})
+        self.assertEqual(helm['/image/tag'], {'values': [2], 'files': [[self.charts + '/beta']]})
+        self.assertEqual(helm['/ports[0]'], {'values': ['http'], 'files': [[self.charts + '/beta']]})
+        self.assertEqual(helm['/notes']['values'], ['line one\\nline two\\n'])
+        self.assertEqual(helm['/(some.key)']['values'], [True])
+        self.assertEqual(helm['/list[1]/name']['values'], ['b'])
+
+    def test_pool_and_cache_match_sequential(self):
+        """A process pool, a cold and a warm cache all give the sequential map."""
+        expected = self._load(helm_workers=1)
+        self.assertEqual(self._load(helm_workers=2), expected)
+        self.assertEqual(self._load(helm_workers=2, helm_cache_path=self.cache_path), expected)
+        self.assertTrue(os.path.exists(self.cache_path))
+
+        # A warm run parses nothing
+        with mock.patch.object(helm_values, 'load_values_file', side_effect=AssertionError('parsed')):
+            self.assertEqual(self._load(helm_cache_path=self.cache_path), expected)
+
+    def test_changed_file_parsed_again(self):
+        """Only the values files that changed are parsed on the next run."""
+        self._load(helm_cache_path=self.cache_path)
+        with open(os.path.join(self.charts, 'charts/beta/values.yaml'), 'a', encoding='utf-8') as f:
+            f.write("extra: x\n")
+        parsed = []
+        original = helm_values.load_values_file
+
+        def recording(file_path, encoding):
+            parsed.append(file_path)
+            return original(file_path, encoding)
+
+        with mock.patch.object(helm_values, 'load_values_file', side_effect=recording):
+            helm = self._load(helm_workers=1, helm_cache_path=self.cache_path)
+        self.assertEqual(parsed, [os.path.join(self.charts, 'charts/beta', 'values.yaml')])
+        self.assertEqual(helm['/extra']['values'], ['x'])
+
+    def test_shared_keys_and_deep_trees(self):
+        """Values shared by many charts keep first-seen order, deep trees do not hit the recursion limit."""
+        service = YAMLProcessingService({'verdict_cache': False})
+        helm = {'/image/tag': {'values': ['old'], 'files': [['before']]}}
+        for chart in range(2000):
+            node = {'image': {'repository': f'repo{chart % 3}', 'tag': 'old' if chart % 2 else 'new'}}
+            service._loop_through_nodes(node, None, f'chart{chart}', '/', helm)
+        self.assertEqual(helm['/image/repository']['values'], ['repo0', 'repo1', 'repo2'])
+        self.assertEqual(helm['/image/repository']['files'][1][:2], ['chart1', 'chart4'])
+        self.assertEqual(helm['/image/tag']['values'], ['old', 'new'])
+        self.assertEqual(helm['/image/tag']['files'][0][:3], ['before', 'chart1', 'chart3'])
+        self.assertEqual(len(helm['/image/tag']['files'][1]), 1000)
+
+        deep = leaf = {}
+        for _ in range(sys.getrecursionlimit() + 100):
+            leaf['k'] = {}
+            leaf = leaf['k']
+        leaf['value'] = [1, None, 'x']
+        deep_helm = {}
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            service._loop_through_nodes(deep, None, 'chart', '/', deep_helm)
+        self.assertEqual([path.rsplit('/', 1)[-1] for path in deep_helm], ['value[0]', 'value[2]'])
+        self.assertIn('unexpected node type', out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Regression test for the knowledge model cache of the AI-integrated YAML processing
+A batch builds the model once, changed or invalidated sources build it again
+"""
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from backend.service_layer.format_processing.yaml import KnowledgeModelCache, YAMLProcessingService
+
+TEMPLATE = "server:\n  # port: 8080\n  # host: localhost\n# user: me\n"
+
+
+class TestKnowledgeModelCache(unittest.TestCase):
+    """Knowledge models are reused while the MRCF and Helm sources are unchanged."""
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.tmp = tempfile.mkdtemp()
+        self.mrcf = os.path.join(self.tmp, 'mrcf.json')
+        with open(self.mrcf, 'w') as f:
+            json.dump({'parameters': [{'path': 'server/port', 'default': 8080}], 'server': {'port': 8080}}, f)
+        self.helm = os.path.join(self.tmp, 'helm')
+        os.makedirs(os.path.join(self.helm, 'app', 'charts', 'db'))
+        self._write(os.path.join(self.helm, 'app', 'values.yaml'), "server:\n  host: x\n")
+        self._write(os.path.join(self.helm, 'app', 'charts', 'db', 'values.yaml'), "user: me\n")
+        self.inputs = os.path.join(self.tmp, 'in')
+        os.makedirs(self.inputs)
+        for name in ('a.yaml', 'b.yaml', 'c.yaml'):
+            self._write(os.path.join(self.inputs, name), TEMPLATE)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+        logging.disable(logging.NOTSET)
+
+    @staticmethod
+    def _write(path, text):
+        with open(path, 'w') as f:
+            f.write(text)
+
+    @staticmethod
+    def _read(path):
+        with open(path) as f:
+            return f.read()
+
+    def test_batch_builds_once(self):
+        """A batch of templates builds one model and writes what uncached services write."""
+        service = YAMLProcessingService()
+        out = os.path.join(self.tmp, 'out')
+        results = service.process_batch(self.inputs, out, mrcf_path=self.mrcf, helm_path=self.helm,
+                                        processing_mode='rule')
+        self.assertEqual(results, {'a.yaml': True, 'b.yaml': True, 'c.yaml': True})
+        self.assertEqual(service.knowledge_cache.stats['misses'], 1)
+        self.assertEqual(service.knowledge_cache.stats['hits'], 2)
+
+        for mode in ('rule', 'ai', 'hybrid'):
+            path = os.path.join(self.tmp, mode + '.yaml')
+            service.process_yaml_template(os.path.join(self.inputs, 'a.yaml'), path, self.mrcf, self.helm,
+                                          processing_mode=mode)
+            fresh = os.path.join(self.tmp, mode + '_fresh.yaml')
+            YAMLProcessingService().process_yaml_template(os.path.join(self.inputs, 'a.yaml'), fresh,
+                                                          self.mrcf, self.helm, processing_mode=mode)
+            self.assertEqual(self._read(path), self._read(fresh), mode)
+        self.assertEqual(service.knowledge_cache.stats['misses'], 1)
+        self.assertEqual(self._read(os.path.join(out, 'a.yaml')),
+                         "server:\n  port: 8080\n  host: localhost\nuser: me\n")
+
+    def test_changed_sources(self):
+        """Edited MRCF or Helm files change the key, invalidate() drops the models of a source."""
+        cache = KnowledgeModelCache()
+        key = cache.source_key(self.mrcf, self.helm)
+        self.assertEqual(cache.source_key(self.mrcf, self.helm), key)
+        self.assertNotEqual(cache.source_key(None, self.helm), key)
+
+        values = os.path.join(self.helm, 'app', 'charts', 'db', 'values.yaml')
+        self._write(values, "user: admin\n")
+        os.utime(values, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+        helm_key = cache.source_key(self.mrcf, self.helm)
+        self.assertNotEqual(helm_key, key)
+        with open(self.mrcf, 'a') as f:
+            f.write('\n')
+        self.assertNotEqual(cache.source_key(self.mrcf, self.helm), helm_key)
+
+        cache.put('k1', {}, self.mrcf, None)
+        cache.put('k2', {}, None, self.helm)
+        self.assertEqual(cache.invalidate(helm_path=self.helm), 1)
+        self.assertIsNone(cache.get('k2'))
+        self.assertIsNotNone(cache.get('k1'))
+        self.assertEqual(cache.invalidate(), 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_shared_cache(self):
+        """Services given one cache share its models, invalidation forces a rebuild."""
+        cache = KnowledgeModelCache()
+        first, second = YAMLProcessingService(knowledge_cache=cache), YAMLProcessingService(knowledge_cache=cache)
+        for service in (first, second, first):
+            self.assertTrue(service.process_yaml_template(os.path.join(self.inputs, 'a.yaml'),
+                                                          os.path.join(self.tmp, 'a.yaml'), self.mrcf, self.helm))
+        self.assertEqual((cache.stats['misses'], cache.stats['hits']), (1, 2))
+        self.assertIs(second.structure_engine.root, first.structure_engine.root)
+
+        self.assertEqual(second.invalidate_knowledge_cache(mrcf_path=self.mrcf), 1)
+        first.process_yaml_template(os.path.join(self.inputs, 'b.yaml'), os.path.join(self.tmp, 'b.yaml'),
+                                    self.mrcf, self.helm, processing_mode='rule')
+        self.assertEqual(cache.stats['misses'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+Regression test for the trained line classifier backend of the template analysis
+The classifier trained on the gold files beats the rules, the rules stay the default
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from common.handler.trace_handler import TraceHandler
+from common.handler.path_handler import PathHandler
+from backend.service_layer.ai_engine.structure_analysis.structure_analysis_engine import StructureAnalysisEngine
+from backend.service_layer.ai_engine.template_analysis import line_classifier
+from backend.service_layer.ai_engine.template_analysis.line_classifier import (
+    LineClassifier, default_line_classifier, gold_pairs, training_data)
+from backend.service_layer.ai_engine.template_analysis.template_analysis_engine import (
+    TemplateAnalysisEngine, CLASSIFICATIONS, EMPTY, ACTIVE_DATA, INACTIVE_DATA, DOCUMENTATION)
+from backend.service_layer.format_processing.yaml import YAMLProcessingService
+
+
+def analyse(raw_lines, **options):
+    tracer = TraceHandler("TestPlatform", "1.0", "LineClassifierTest")
+    engine = TemplateAnalysisEngine(tracer, PathHandler(), StructureAnalysisEngine(tracer, PathHandler()), **options)
+    engine.process_template(raw_lines)
+    return engine
+
+
+@unittest.skipUnless(line_classifier.SKLEARN_AVAILABLE, "scikit-learn required")
+class TestLineClassifier(unittest.TestCase):
+    """LineClassifier trained on the data/ gold files against the rule classification."""
+
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+        cls.pairs = gold_pairs()
+        cls.classifier = LineClassifier.train(cls.pairs)
+        with open(cls.pairs[0][0], encoding='utf-8') as f:
+            cls.template_lines = f.readlines()
+        with open(cls.pairs[0][1], encoding='utf-8') as f:
+            cls.gold_lines = f.readlines()
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def test_labels_from_gold(self):
+        """Lines the gold file uncomments are INACTIVE_DATA, live lines ACTIVE_DATA."""
+        template = ["a: 1\n", "# b: 2\n", "\n", "# a note\n", "#   - c: 3\n"]
+        gold = ["a: 1\n", "b: 2\n", "\n", "# a note\n", "  - c: 3\n"]
+        _, codes = training_data(template, gold)
+        self.assertEqual(codes.tolist(), [ACTIVE_DATA, INACTIVE_DATA, EMPTY, DOCUMENTATION, INACTIVE_DATA])
+
+    def test_more_accurate_than_rules(self):
+        """The classifier labels more sample lines as the gold file does, held-out halves included."""
+        columns, codes = training_data(self.template_lines, self.gold_lines)
+        lines = codes != EMPTY
+        rules = analyse(self.template_lines, columnar=True).columns["classification"]
+        trained = analyse(self.template_lines, classifier=self.classifier).columns["classification"]
+        rule_accuracy = np.mean(rules[lines] == codes[lines])
+        self.assertGreater(np.mean(trained[lines] == codes[lines]), rule_accuracy)
+
+        half = len(self.template_lines) // 2
+        first, second = np.flatnonzero(lines[:half]), half + np.flatnonzero(lines[half:])
+        features = self.classifier.feature_matrix(columns)
+        for train_rows, test_rows in ((first, second), (second, first)):
+            model = type(self.classifier.model)(**self.classifier.model.get_params())
+            model.fit(features[train_rows], codes[train_rows])
+            self.assertGreater(np.mean(model.predict(features[test_rows]) == codes[test_rows]), rule_accuracy)
+
+    def test_batch_classification(self):
+        """Lines get the class and probability of one predict_proba over the template."""
+        engine = analyse(self.template_lines, classifier=self.classifier)
+        columns = engine.columns
+        rows = np.flatnonzero(~columns["is_empty"])
+        probabilities = self.classifier.model.predict_proba(self.classifier.feature_matrix(columns)[rows])
+        self.assertEqual(columns["classification"][rows].tolist(),
+                         self.classifier.classes[probabilities.argmax(axis=1)].tolist())
+        for idx, line in enumerate(engine.lines):
+            self.assertEqual(line.classification, CLASSIFICATIONS[columns["classification"][idx]])
+        self.assertEqual(engine.stats["ai_classifications"], len(rows))
+        self.assertEqual(sum(engine.get_classification_summary()["classifications"].values()), len(rows))
+
+    def test_rules_stay_default(self):
+        """Without a classifier, and for lines with line breaks inside, the rules classify."""
+        default, columnar = analyse(self.template_lines), analyse(self.template_lines, columnar=True)
+        self.assertIsNone(default.classifier)
+        self.assertEqual([line.classification for line in default.lines],
+                         [line.classification for line in columnar.lines])
+        raw_lines = ['a: 1\n', '# b:\n c\n']
+        fallback = analyse(raw_lines, classifier=self.classifier)
+        self.assertIsNone(fallback.columns)
+        self.assertEqual([line.classification for line in fallback.lines],
+                         [line.classification for line in analyse(raw_lines).lines])
+
+    def test_loaded_once(self):
+        """Saved models load back, default_line_classifier loads a model once per path."""
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'line_classifier.pkl')
+            self.classifier.save(path)
+            loaded = default_line_classifier(path)
+            self.assertIs(default_line_classifier(path), loaded)
+            columns = analyse(self.template_lines, columnar=True).columns
+            self.assertEqual(loaded.classify(columns)[0].tolist(), self.classifier.classify(columns)[0].tolist())
+
+            service = YAMLProcessingService(line_classifier=loaded)
+            self.assertIs(service.template_engine.classifier, loaded)
+            with open(os.path.join(tmp, 'broken.pkl'), 'wb') as f:
+                f.write(b'not a model')
+            self.assertIsNone(default_line_classifier(os.path.join(tmp, 'broken.pkl')))
+        finally:
+            shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    unittest.main()
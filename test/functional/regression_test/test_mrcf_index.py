@@ -0,0 +1,108 @@
+"""
+Regression test for the compiled MRCF index
+The index fixes values as the raw MRCF does and is only recompiled when the MRCF changes
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from backend.service_layer.yaml_processing.mrcf_index import MRCFIndexStore, compile_mrcf_index
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+
+MRCF = {'parameters': [
+    {'path': '/global/registry/url', 'recommended_value': 'registry.local', 'default': 'unused'},
+    {'path': '/global/list[N]/port', 'default_large_system_profile': 7, 'default_small_system_profile': 1},
+    {'path': '/global/list[0]/name', 'default': 'first'},
+    {'path': '/global/after', 'default_standard_system_profile': 5},
+    {'description': 'no path'},
+]}
+TEMPLATE = """global:
+  registry:
+    url: '{{ a | b | c }}'
+  list:
+  - name: "{{ x_or_y }}"
+    port: {{ 1 | 2 }}
+  after: '{{ 5 | 6 }}'
+"""
+
+
+class TestMRCFIndex(unittest.TestCase):
+    """Values come out the same through the index, which is reused while the MRCF is unchanged."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.mrcf_path = os.path.join(self._tmp.name, 'mrcf.json')
+        self.index_path = os.path.join(self._tmp.name, 'mrcf.index')
+        self._write(MRCF)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write(self, mrcf):
+        with open(self.mrcf_path, 'w', encoding='utf-8') as f:
+            json.dump(mrcf, f)
+
+    def _service(self, **config):
+        service = YAMLProcessingService(dict(config, verdict_cache=False))
+        with contextlib.redirect_stdout(io.StringIO()):
+            service._load_mrcf_data(self.mrcf_path)
+        return service
+
+    def test_index_fixes_like_raw_mrcf(self):
+        """Paths are normalized and per-flavor defaults match the ones looked up in the parameters."""
+        service = self._service()
+        self.assertEqual(sorted(service.map_path_mrcf),
+                         ['/global/after', '/global/list/name', '/global/list/port', '/global/registry/url'])
+        self.assertEqual(service.mrcf_flavor_defaults['/global/list/port'],
+                         {'small-system': 1, 'standard-system': None, 'large-system': 7})
+        self.assertEqual(service.mrcf_flavor_defaults['/global/registry/url'], {})
+        for system_size in service.config['system_size_mapping']:
+            with self.subTest(system_size=system_size):
+                self.assertEqual(service._fix_values_comprehensive(TEMPLATE, system_size),
+                                 service._fix_values(TEMPLATE, service.map_path_mrcf, {}, system_size,
+                                                     service.config['priorities']))
+        self.assertIn('port: 7\n', service._fix_values_comprehensive(TEMPLATE, 'large-system'))
+        with self.assertRaises(ValueError):
+            service._fix_values_comprehensive(TEMPLATE, 'tiny-system')
+
+    def test_reused_until_changed(self):
+        """The index file serves new processes until the MRCF content or the size mapping changes."""
+        mapping = YAMLProcessingService().config['system_size_mapping']
+        index, compiled = MRCFIndexStore().load(self.mrcf_path, self.index_path, 'UTF-8', mapping)
+        self.assertTrue(compiled)
+        self.assertEqual(index['parameters'], compile_mrcf_index(MRCF, mapping)['parameters'])
+
+        store = MRCFIndexStore()
+        self.assertFalse(store.load(self.mrcf_path, self.index_path, 'UTF-8', mapping)[1])
+        # Same content with a new mtime is recognized by its hash
+        stat = os.stat(self.mrcf_path)
+        os.utime(self.mrcf_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertFalse(MRCFIndexStore().load(self.mrcf_path, self.index_path, 'UTF-8', mapping)[1])
+        self.assertFalse(MRCFIndexStore().load(self.mrcf_path, self.index_path, 'UTF-8', mapping)[1])
+
+        self.assertTrue(MRCFIndexStore().load(self.mrcf_path, self.index_path, 'UTF-8',
+                                              dict(mapping, **{'tiny-system': 'default_tiny'}))[1])
+        self._write({'parameters': MRCF['parameters'][:1]})
+        index, compiled = store.load(self.mrcf_path, self.index_path, 'UTF-8', mapping)
+        self.assertTrue(compiled)
+        self.assertEqual(list(index['parameters']), ['/global/registry/url'])
+
+    def test_service_uses_index_file(self):
+        """A service configured with an index path writes it and the next one loads the same maps."""
+        first = self._service(mrcf_index_path=self.index_path)
+        self.assertTrue(os.path.exists(self.index_path))
+        second = self._service(mrcf_index_path=self.index_path, debug=True)
+        self.assertEqual(second.map_path_mrcf, first.map_path_mrcf)
+        self.assertEqual(second.mrcf_flavor_defaults, first.mrcf_flavor_defaults)
+
+
+if __name__ == '__main__':
+    unittest.main()
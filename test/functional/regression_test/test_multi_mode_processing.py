@@ -0,0 +1,94 @@
+"""
+Regression test for the single-pass multi-mode YAML processing
+Each mode of one pass writes what a separate process_yaml_template run writes
+"""
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from backend.service_layer.format_processing.yaml import YAMLProcessingService
+from backend.service_layer.format_processing.yaml.yaml_processing_service import PROCESSING_MODES
+
+SAMPLE_TEMPLATE = os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values.yaml')
+
+
+class TestMultiModeProcessing(unittest.TestCase):
+    """process_yaml_template_modes against one process_yaml_template run per mode."""
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.tmp = tempfile.mkdtemp()
+        self.mrcf = os.path.join(self.tmp, 'mrcf.json')
+        with open(self.mrcf, 'w') as f:
+            json.dump({'parameters': [{'path': 'server/port', 'default': 8080}], 'server': {'port': 8080}}, f)
+        self.helm = os.path.join(self.tmp, 'helm')
+        os.makedirs(os.path.join(self.helm, 'app'))
+        with open(os.path.join(self.helm, 'app', 'values.yaml'), 'w') as f:
+            f.write("server:\n  host: x\n  hosts:\n    - name: a\nuser: me\n")
+        self.template = os.path.join(self.tmp, 'template.yaml')
+        with open(self.template, 'w') as f:
+            f.write("server:\n  # port: 8080\n  # host: localhost\n  # Description: the port\n  hosts:\n"
+                    "  #  - name: b\n# user: me\n# other: 1\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+        logging.disable(logging.NOTSET)
+
+    @staticmethod
+    def _read(path):
+        with open(path) as f:
+            return f.read()
+
+    def _compare_with_separate_runs(self, template):
+        outputs = {mode: os.path.join(self.tmp, f'one_{mode}.yaml') for mode in PROCESSING_MODES}
+        service = YAMLProcessingService()
+        result = service.process_yaml_template_modes(template, outputs, self.mrcf, self.helm)
+        self.assertEqual(result['results'], {mode: True for mode in PROCESSING_MODES})
+        self.assertEqual(service.knowledge_cache.stats['misses'], 1)
+
+        stats = dict.fromkeys(service.stats, 0)
+        for mode in PROCESSING_MODES:
+            separate = YAMLProcessingService()
+            path = os.path.join(self.tmp, f'separate_{mode}.yaml')
+            self.assertTrue(separate.process_yaml_template(template, path, self.mrcf, self.helm, processing_mode=mode))
+            self.assertEqual(self._read(outputs[mode]), self._read(path), mode)
+            for name, count in separate.stats.items():
+                stats[name] += count
+        self.assertEqual(service.stats, stats)
+        return result['comparison']
+
+    def test_matches_separate_runs(self):
+        """Outputs and statistics match, the report lists the lines the modes disagree on."""
+        comparison = self._compare_with_separate_runs(self.template)
+        self.assertEqual(comparison['uncommented_lines'], {'ai': 4, 'rule': 3, 'hybrid': 4})
+        self.assertEqual(comparison['pairwise_differences'], {'ai/rule': 1, 'ai/hybrid': 0, 'rule/hybrid': 1})
+        self.assertEqual([entry['line'] for entry in comparison['disagreements']], [6])
+        self.assertEqual(comparison['disagreements'][0]['uncommented_by'], ['ai', 'hybrid'])
+
+    def test_sample_template(self):
+        """The sample template comes out of one pass as out of three runs."""
+        self._compare_with_separate_runs(SAMPLE_TEMPLATE)
+
+    def test_subset_and_unknown_modes(self):
+        """Only the requested modes are written, unknown modes fail the call."""
+        service = YAMLProcessingService()
+        rule_output = os.path.join(self.tmp, 'rule.yaml')
+        result = service.process_yaml_template_modes(self.template, {'rule': rule_output}, self.mrcf, self.helm)
+        self.assertEqual(result['results'], {'rule': True})
+        self.assertEqual(service.template_engine.lines, [])
+        self.assertIn('  port: 8080\n', self._read(rule_output))
+
+        result = service.process_yaml_template_modes(self.template, {'rule': rule_output, 'fast': rule_output})
+        self.assertEqual(result, {'results': {'rule': False, 'fast': False}, 'comparison': {}})
+
+
+if __name__ == '__main__':
+    unittest.main()
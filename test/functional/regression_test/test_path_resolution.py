@@ -0,0 +1,118 @@
+"""
+Regression test for the path resolution of the template analysis
+Data lines resolve to the paths their keys have in the uncommented YAML
+"""
+import logging
+import os
+import sys
+import unittest
+
+import yaml
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from common.handler.trace_handler import TraceHandler
+from common.handler.path_handler import PathHandler
+from backend.service_layer.ai_engine.structure_analysis.structure_analysis_engine import StructureAnalysisEngine
+from backend.service_layer.ai_engine.template_analysis.template_analysis_engine import TemplateAnalysisEngine
+
+SAMPLE_TEMPLATE = os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values.yaml')
+GOLD_TEMPLATE = os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values_uncommented-by-uncomment-00_fixed-manually.yaml')
+# The gold file parses up to its first misplaced comment, after this line
+GOLD_VALID_LINES = 242
+
+
+def key_paths(node, path=(), paths=None):
+    """Line number -> dotted path of every mapping key of a composed YAML node"""
+    paths = {} if paths is None else paths
+    if isinstance(node, yaml.MappingNode):
+        for key, value in node.value:
+            paths[key.start_mark.line + 1] = '.'.join(path + (key.value,))
+            key_paths(value, path + (key.value,), paths)
+    elif isinstance(node, yaml.SequenceNode):
+        for value in node.value:
+            key_paths(value, path + ('[N]',), paths)
+    return paths
+
+
+def analyse(raw_lines, values, **options):
+    tracer = TraceHandler("TestPlatform", "1.0", "PathResolutionTest")
+    structure = StructureAnalysisEngine(tracer, PathHandler())
+    structure.build_from_sources(values, {})
+    engine = TemplateAnalysisEngine(tracer, PathHandler(), structure, **options)
+    engine.process_template(raw_lines)
+    return engine
+
+
+class TestPathResolution(unittest.TestCase):
+    """Paths from the indent-indexed context stack against the YAML the lines come from."""
+
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+        with open(SAMPLE_TEMPLATE, encoding='utf-8') as f:
+            cls.template_lines = f.readlines()
+        with open(GOLD_TEMPLATE, encoding='utf-8') as f:
+            cls.gold_lines = f.readlines()
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def assert_paths(self, engine, expected):
+        resolved = {line_no: engine.lines[line_no - 1].identified_path for line_no in expected}
+        self.assertEqual(resolved, expected)
+
+    def test_sample_template(self):
+        """Keys of the active sample template, list elements included, resolve to their YAML paths."""
+        text = ''.join(self.template_lines)
+        expected = key_paths(yaml.compose(text))
+        for columnar in (False, True):
+            engine = analyse(self.template_lines, yaml.safe_load(text), columnar=columnar)
+            self.assert_paths(engine, expected)
+            self.assertGreaterEqual(engine.stats["path_resolutions"], len(expected))
+
+    def test_commented_keys(self):
+        """Commented-out keys resolve to the paths the gold file has them at."""
+        template, gold = self.template_lines[:GOLD_VALID_LINES], self.gold_lines[:GOLD_VALID_LINES]
+        expected = key_paths(yaml.compose(''.join(gold)))
+        commented = [line_no for line_no in expected if template[line_no - 1].lstrip().startswith('#')]
+        self.assertGreater(len(commented), 30)
+        engine = analyse(template, yaml.safe_load(''.join(gold)))
+        self.assert_paths(engine, expected)
+        for line_no in commented:
+            self.assertIsNotNone(engine.lines[line_no - 1].structure_node)
+
+    def test_deep_nesting(self):
+        """Dedents close frames in place, the stack never holds more than the open keys."""
+        depth = 300
+        values = node = {}
+        raw_lines = []
+        for level in range(depth):
+            node[f'k{level}'] = node = {}
+            raw_lines.append('  ' * level + f'k{level}:\n')
+        node['leaf'] = 1
+        raw_lines += ['  ' * depth + '# leaf: 1\n', 'k0:\n', '  k1:\n']
+        engine = analyse(raw_lines, values)
+        self.assertEqual(engine.lines[depth].identified_path, '.'.join(f'k{level}' for level in range(depth)) + '.leaf')
+        self.assertEqual(engine.lines[-1].identified_path, 'k0.k1')
+        self.assertEqual(len(engine.context_stack), 3)
+        self.assertEqual([frame['indent'] for frame in engine.context_stack], [-1, 0, 2])
+
+    def test_backtracking_and_lists(self):
+        """Keys misindented by '# ' go to the ancestor that has them, dashes may sit at their key's indent."""
+        values = {'server': {'port': 80, 'hosts': [{'name': 'a', 'port': 1}]}, 'user': 'me'}
+        raw_lines = ['server:\n', '  hosts:\n', '  - name: a\n', '    port: 1\n', '  # port: 80\n', '# user: me\n']
+        engine = analyse(raw_lines, values)
+        self.assertEqual([line.identified_path for line in engine.lines],
+                         ['server', 'server.hosts', 'server.hosts.[N].name', 'server.hosts.[N].port',
+                          'server.port', 'user'])
+        self.assertIs(engine.lines[3].structure_node,
+                      engine.structure_engine.root.children['server'].children['hosts'].children['[N]']
+                      .children['port'])
+
+
+if __name__ == '__main__':
+    unittest.main()
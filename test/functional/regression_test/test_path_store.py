@@ -0,0 +1,88 @@
+"""
+Regression test for the compact path store
+A PathStore behaves like the dict it replaces, values come out as they went in
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import unittest
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from common.util.path_store import PathStore
+from common.util.yaml_block_cache import block_key
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+
+SEGMENTS = ['', 'global', 'image', 'tag', '(a/b)', 'list[0]', 'x']
+VALUES = [1, True, 1.0, None, 'text', {'default': 1}, {'values': ['a', 'a'], 'files': [['c1', 'c2']]},
+          {'values': [1, True], 'files': [['c'], ['c']]}]
+
+
+class TestPathStore(unittest.TestCase):
+    """PathStore against a dict under random operations."""
+
+    def test_matches_dict(self):
+        """Assignments, deletions, lookups and iteration order match a dict."""
+        rnd = random.Random(8)
+        for _ in range(30):
+            store, expected = PathStore('/'), {}
+            for _ in range(200):
+                path = '/'.join(rnd.choice(SEGMENTS) for _ in range(rnd.randint(1, 4)))
+                if expected and rnd.random() < 0.1:
+                    removed = rnd.choice(list(expected))
+                    del store[removed], expected[removed]
+                else:
+                    expected[path] = rnd.choice(VALUES)
+                    store[path] = expected[path]
+                probe = '/'.join(rnd.choice(SEGMENTS) for _ in range(rnd.randint(1, 4)))
+                self.assertEqual(probe in store, probe in expected)
+                self.assertEqual(store.get(probe, 'missing'), expected.get(probe, 'missing'))
+            self.assertEqual(list(store), list(expected))
+            self.assertEqual(list(store.values()), list(expected.values()))
+            self.assertEqual(store, expected)
+            self.assertEqual(len(store), len(expected))
+            self.assertEqual(block_key(store), block_key(expected))
+
+    def test_values_keep_their_types(self):
+        """Helm entries sharing equal tuples keep 1, True and 1.0 apart, lookups hand out fresh dicts."""
+        store = PathStore()
+        store['/a'] = {'values': [1], 'files': [['c']]}
+        store['/b'] = {'values': [True], 'files': [['c']]}
+        store['/c'] = {'values': [1.0], 'files': [['c']]}
+        self.assertEqual([type(store[path]['values'][0]) for path in ('/a', '/b', '/c')], [int, bool, float])
+        store['/a']['values'].append(2)
+        self.assertEqual(store['/a']['values'], [1])
+        with self.assertRaises(KeyError):
+            store['/a/missing']
+
+    def test_service_with_compact_paths(self):
+        """Values are fixed the same with compact maps, turning the option on later moves the maps."""
+        template = "image:\n  tag: '{{ x }}'\n  pull: '{{ y }}'\n"
+        helm = {'/image/tag': {'values': ['1.2'], 'files': [['chart']]}}
+        mrcf = {'/image/pull': {'default': 'Always'}}
+        fixed = []
+        for compact in (False, True):
+            service = YAMLProcessingService({'verdict_cache': False, 'compact_paths': compact,
+                                             'priorities': ['HELM.default', 'MRCF.default']})
+            service.map_path_helm.update(helm)
+            service.map_path_mrcf.update(mrcf)
+            self.assertEqual(isinstance(service.map_path_helm, PathStore), compact)
+            fixed.append(service._fix_values_comprehensive(template, 'standard-system'))
+        self.assertEqual(fixed[0], fixed[1])
+        self.assertEqual(fixed[1], 'image:\n  tag: "1.2"\n  pull: "Always"\n')
+
+        service = YAMLProcessingService({'verdict_cache': False})
+        service.map_path_helm.update(helm)
+        service.config['compact_paths'] = True
+        with contextlib.redirect_stdout(io.StringIO()):
+            service._load_knowledge(None, None)
+        self.assertIsInstance(service.map_path_helm, PathStore)
+        self.assertEqual(service.map_path_helm, helm)
+
+
+if __name__ == '__main__':
+    unittest.main()
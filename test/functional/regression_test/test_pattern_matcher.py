@@ -0,0 +1,92 @@
+"""
+Regression test for the compiled pattern matcher
+Same answers as the any() loops over the pattern lists it replaces
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import unittest
+import warnings
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from common.util.pattern_matcher import MultiReplacer, PatternMatcher, multi_replacer, pattern_matcher
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+
+SAMPLE_TEMPLATE = os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values.yaml')
+
+
+class TestPatternMatcher(unittest.TestCase):
+    """One regex scan answers like the pattern loops."""
+
+    def setUp(self):
+        self.service = YAMLProcessingService({'verdict_cache': False})
+        self.patterns = self.service.config['special_content_patterns']
+
+    def _rows(self):
+        with open(SAMPLE_TEMPLATE, 'r', encoding='utf-8') as f:
+            rows = f.read().split('\n')
+        rnd = random.Random(5)
+        pieces = [p for kind in self.patterns.values() for p in kind] + ['  ', 'a: ', '#', '"']
+        rows += [''.join(rnd.choice(pieces) for _ in range(rnd.randint(0, 4))) for _ in range(3000)]
+        return rows
+
+    def test_matches_like_pattern_loops(self):
+        """matches() and hits() agree with the substring, prefix and exact loops."""
+        matcher = pattern_matcher(**self.patterns)
+        for row in self._rows():
+            expected = ([p for p in self.patterns['contains'] if p in row] +
+                        [p for p in self.patterns['starts'] if row.lstrip().startswith(p)] +
+                        [p for p in self.patterns['exact'] if row.strip() == p])
+            self.assertEqual(matcher.hits(row), expected, row)
+            self.assertEqual(matcher.matches(row), bool(expected), row)
+
+    def test_shared_per_configuration(self):
+        """Equal pattern lists give the same compiled matcher."""
+        self.assertIs(pattern_matcher(['a', 'b']), pattern_matcher(('a', 'b')))
+        self.assertIsNot(pattern_matcher(['a', 'b']), pattern_matcher(['a']))
+        self.assertFalse(PatternMatcher().matches('anything'))
+
+    def test_replacer_like_sequential_replace(self):
+        """One scan applies the fixes as str.replace one after the other does."""
+        fixes = self.service.config['content_fixes']
+        rnd = random.Random(9)
+        pieces = [old for old, _ in fixes] + ['\n', 'key: value', '  #']
+        for _ in range(500):
+            content = ''.join(rnd.choice(pieces) for _ in range(rnd.randint(0, 8)))
+            expected = content
+            for old, new in fixes:
+                expected = expected.replace(old, new)
+            self.assertEqual(multi_replacer(fixes).apply(content), expected)
+        self.assertEqual(MultiReplacer([('ab', 'x'), ('abc', 'y')]).apply('abcab'), 'yx')
+
+    def test_configurable_patterns(self):
+        """Pattern lists and fixes come from the service configuration."""
+        service = YAMLProcessingService({'special_content_patterns': {'contains': ['KEEP']},
+                                         'allowed_content_patterns': ['legacy blob'],
+                                         'content_fixes': [('#  fixme:', 'fixme:')]})
+        self.assertTrue(service._should_mark_special_content('  KEEP: 1'))
+        self.assertFalse(service._should_mark_special_content('  JAVA_OPTS: 1'))
+        self.assertTrue(service._is_allowed_content('a legacy blob'))
+        self.assertEqual(service._preprocess_yaml_file2b('a:\n#  fixme: 1\n'), 'a:\nfixme: 1\n')
+
+    def test_content_fixes_on_real_newlines(self):
+        """The shipped fixes match rows joined by newlines and put the key at its level."""
+        template = ("network:\n    policy:\n        enabled: true\n        #    egress:\n"
+                    "        #      - to: 10.0.0.0/8\n        ingress: []\n")
+        self.assertEqual(self.service._preprocess_yaml_file2b(template),
+                         template.replace("\n        #    egress:", "\n        egress:"))
+        with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+            warnings.simplefilter('ignore')
+            result = self.service.process_yaml_content(template, generate_variants=[])
+        self.assertEqual(result['artifacts']['main'],
+                         "\nnetwork:\n    policy:\n        enabled: true\n        egress:\n"
+                         "              - to: 10.0.0.0/8\n        ingress: []\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
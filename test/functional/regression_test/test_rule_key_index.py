@@ -0,0 +1,84 @@
+"""
+Regression test for the inverted key index of the rule-based uncomment decisions
+Index lookups decide like the scans of the flat JSON paths and the Helm data did
+"""
+import json
+import logging
+import os
+import random
+import sys
+import unittest
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from backend.service_layer.format_processing.yaml.yaml_processing_service import YAMLProcessingService
+
+KEYS = ['alpha', 'beta', 'gamma', 'delta', 'port', 'host', 'a.b', '1', 'true']
+
+
+def random_data(rnd, depth=0):
+    """Nested mappings and lists, keys of any type."""
+    if depth > 3 or rnd.random() < 0.3:
+        return rnd.choice([1, 'text', None, True])
+    if rnd.random() < 0.25:
+        return [random_data(rnd, depth + 1) for _ in range(rnd.randint(0, 3))]
+    keys = KEYS + [1, True]
+    return {rnd.choice(keys): random_data(rnd, depth + 1) for _ in range(rnd.randint(0, 4))}
+
+
+def key_in_data(key, data):
+    """Whether key is a mapping key anywhere in data, the walk the index replaced."""
+    if isinstance(data, dict):
+        return key in data or any(key_in_data(key, value) for value in data.values())
+    if isinstance(data, list):
+        return any(key_in_data(key, item) for item in data)
+    return False
+
+
+class TestRuleKeyIndex(unittest.TestCase):
+    """Commented keys are looked up in the key index of the knowledge model."""
+
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+        cls.service = YAMLProcessingService("TestPlatform", "1.0")
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def test_matches_scans(self):
+        """Decisions match scanning the flat JSON path segments and walking the Helm data."""
+        rnd = random.Random(5)
+        service = self.service
+        for _ in range(40):
+            data, helm = random_data(rnd), random_data(rnd)
+            # MRCF data comes from JSON, its keys are strings
+            data = json.loads(json.dumps(data)) if isinstance(data, dict) else {}
+            flat = service.json_io._flatten_dict(data)
+            helm = helm if isinstance(helm, dict) else {}
+            model = {'flat_json_data': flat, 'helm_data': helm,
+                     'key_index': service._build_key_index(flat, helm)}
+            for key in KEYS + ['unknown']:
+                expected = (any(key in path.split('.') for path in flat)
+                            or key_in_data(key, helm))
+                for row in (f"  # {key}: 1", f"#{key}:", f"## {key} : x"):
+                    with self.subTest(row=row, flat=flat, helm=helm):
+                        self.assertEqual(service._should_uncomment_rule_based(row, model), expected)
+
+    def test_rows(self):
+        """Only commented key rows qualify, models without an index get one."""
+        model = {'flat_json_data': {'data.port': 8080}, 'helm_data': {'server': {'host': 'x'}}}
+        decide = self.service._should_uncomment_rule_based
+        self.assertTrue(decide("  # port: 8080", model))
+        self.assertEqual(model['key_index']['host'], ['server.host'])
+        self.assertTrue(decide("# host: localhost", model))
+        self.assertFalse(decide("  port: 8080", model))
+        self.assertFalse(decide("# just a comment", model))
+        self.assertFalse(decide("# user: me", model))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+Regression test for the rule-based uncommenting of the AI-integrated YAML processing
+Commented keys known from the MRCF or the Helm values are uncommented, other comments stay
+"""
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from backend.service_layer.format_processing.yaml import YAMLProcessingService
+
+TEMPLATE = ("server:\n  # port: 8080\n  # host: localhost\n  # Description: the port\n  #timeout: 5\n"
+            "# user: me\n# other: 1\n#  - item\n")
+
+
+class TestRuleModeUncommenting(unittest.TestCase):
+    """Rule mode output on a template of known, unknown and documentation comments."""
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.tmp = tempfile.mkdtemp()
+        self.mrcf = os.path.join(self.tmp, 'mrcf.json')
+        with open(self.mrcf, 'w') as f:
+            json.dump({'parameters': [{'path': 'server/port', 'default': 8080}], 'server': {'port': 8080}}, f)
+        self.helm = os.path.join(self.tmp, 'helm')
+        os.makedirs(os.path.join(self.helm, 'app'))
+        with open(os.path.join(self.helm, 'app', 'values.yaml'), 'w') as f:
+            f.write("server:\n  host: x\nuser: me\n")
+        self.template = os.path.join(self.tmp, 'template.yaml')
+        with open(self.template, 'w') as f:
+            f.write(TEMPLATE)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+        logging.disable(logging.NOTSET)
+
+    def test_known_keys_uncommented(self):
+        """port (MRCF), host and user (Helm) are uncommented in place, the rest is kept."""
+        service = YAMLProcessingService()
+        output = os.path.join(self.tmp, 'rule.yaml')
+        self.assertTrue(service.process_yaml_template(self.template, output, self.mrcf, self.helm,
+                                                      processing_mode='rule'))
+        with open(output) as f:
+            self.assertEqual(f.read(), "server:\n  port: 8080\n  host: localhost\n  # Description: the port\n"
+                                       "  #timeout: 5\nuser: me\n# other: 1\n#  - item\n")
+        self.assertEqual((service.stats['lines_uncommented'], service.stats['rule_decisions']), (3, 3))
+
+    def test_without_sources(self):
+        """Without MRCF and Helm sources no key is known and the template is kept."""
+        output = os.path.join(self.tmp, 'rule.yaml')
+        self.assertTrue(YAMLProcessingService().process_yaml_template(self.template, output,
+                                                                      processing_mode='rule'))
+        with open(output) as f:
+            self.assertEqual(f.read(), TEMPLATE)
+
+
+if __name__ == '__main__':
+    unittest.main()
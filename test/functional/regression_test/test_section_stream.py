@@ -0,0 +1,111 @@
+"""
+Regression test for the streaming mode of process_yaml_template
+Section by section processing must write the same files as the whole-file run
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import unittest
+import warnings
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from common.util.yaml_sections import ROOT_KEY, iter_sections
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+
+SAMPLE_TEMPLATE = os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values.yaml')
+
+WORDS = ['alpha', 'beta', 'gamma', 'delta', 'kappa', 'sigma', 'omega']
+VALUES = ['1', 'true', '{}', '[]', '"quoted text"', 'plain value', '{{ 1 | 2 | 3 }}', '"{{ small | standard | large }}"']
+
+
+def commented_templates(count: int, seed: int = 0):
+    """Small values templates with commented-out parts, placeholders and typical breakage."""
+    rnd = random.Random(seed)
+
+    def mapping(indent, depth, rows):
+        for _ in range(rnd.randint(1, 4)):
+            key = rnd.choice(WORDS) + str(rnd.randint(0, 9))
+            if depth < 3 and rnd.random() < 0.35:
+                rows.append(' ' * indent + key + ':')
+                mapping(indent + 2, depth + 1, rows)
+            elif rnd.random() < 0.3:
+                rows.append(' ' * indent + key + ':')
+                rows.extend(' ' * (indent + rnd.choice([0, 2])) + '- ' + rnd.choice(WORDS)
+                            for _ in range(rnd.randint(1, 3)))
+            else:
+                rows.append(' ' * indent + key + ': ' + rnd.choice(VALUES))
+
+    for _ in range(count):
+        rows = ['# Header comment'] if rnd.random() < 0.5 else []
+        for index in range(rnd.randint(1, 8)):
+            section = [f'root{index}:']
+            mapping(2, 1, section)
+            for _ in range(rnd.randint(0, 3)):
+                start = rnd.randrange(1, len(section))
+                for i in range(start, min(len(section), start + rnd.randint(1, 4))):
+                    section[i] = '#' + section[i]
+            if rnd.random() < 0.2:
+                section[0] += ' []'
+            if rnd.random() < 0.2:
+                section = ['#' + row for row in section]
+            rows.extend(section)
+            if rnd.random() < 0.7:
+                rows.append('')
+        yield '\n'.join(rows) + ('\n' if rnd.random() < 0.8 else '')
+
+
+class TestSectionStream(unittest.TestCase):
+    """Streaming and whole-file processing agree."""
+
+    def _run(self, content, streaming):
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = os.path.join(tmp, 'template.yaml')
+            with open(input_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            service = YAMLProcessingService({'verdict_cache': False, 'streaming': streaming})
+            with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+                warnings.simplefilter('ignore')
+                result = service.process_yaml_template(input_path, os.path.join(tmp, 'out.yaml'),
+                                                       system_size='large-system')
+            files = {}
+            for name in sorted(os.listdir(tmp)):
+                with open(os.path.join(tmp, name), 'r', encoding='utf-8') as f:
+                    files[name] = f.read()
+            generated = [os.path.basename(path) for path in result.get('files_generated', [])]
+            return result['success'], generated, files
+
+    def test_sections_cover_template(self):
+        """Sections give back the template rows, each one after the first opens with a key."""
+        with open(SAMPLE_TEMPLATE, 'r', encoding='utf-8') as f:
+            rows = f.read().split('\n')
+        sections = list(iter_sections(rows))
+        self.assertGreater(len(sections), 1)
+        self.assertEqual([row for section in sections for row in section], rows)
+        for section in sections[1:]:
+            self.assertIsNotNone(ROOT_KEY.match(section[0]))
+
+    def test_streaming_matches_whole_file(self):
+        """Main, fixed, values and variant files are the same in both modes."""
+        for content in commented_templates(40):
+            with self.subTest(content=content[:80]):
+                self.assertEqual(self._run(content, True), self._run(content, False))
+
+    def test_streaming_without_comments(self):
+        """Templates with nothing to uncomment are copied section by section."""
+        content = "a:\n  b: 1\nc:\n  d: '{{ 1 | 2 | 3 }}'\n\ne: [1, 2]"
+        success, generated, files = self._run(content, True)
+        self.assertTrue(success)
+        self.assertEqual(files['out.yaml'], content)
+        self.assertIn('out_values_set.yaml', generated)
+        self.assertEqual(files['out_rewritten_pyyaml.yaml'], "a:\n  b: 1\nc:\n  d: ' 1 | 2 | 3 '\ne:\n- 1\n- 2\n")
+        self.assertFalse([name for name in files if name.endswith('.part')])
+
+
+if __name__ == '__main__':
+    unittest.main()
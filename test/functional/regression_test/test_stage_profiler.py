@@ -0,0 +1,136 @@
+"""
+Regression test for the per-stage profiling hooks
+Every stage reports, profiling does not change the artifacts
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+import warnings
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from common.util.stage_profiler import STAGES, StageHooks, StageProfiler, collapsed_stacks, merge_reports
+from common.tool.yaml_uncommenter import YAMLUncommenter
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+
+TEMPLATE = "# header\nb: '{{ 1 | 2 | 3 }}'\nc:\n   d: 2\n#  e: 1\na: [1, 2]\n"
+
+
+class RecordingHooks(StageHooks):
+    """Keeps the stages in the order they ran."""
+
+    def __init__(self):
+        self.seen = []
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=0):
+        self.seen.append((name, rows))
+        yield
+
+
+class TestStageProfiler(unittest.TestCase):
+    """The pipeline reports its stages to the hooks."""
+
+    def _run(self, **config):
+        service = YAMLProcessingService(dict(config, verdict_cache=False))
+        with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+            warnings.simplefilter('ignore')
+            result = service.process_yaml_content(TEMPLATE, system_size='large-system')
+        self.assertTrue(result['success'], result.get('error'))
+        return result
+
+    def test_stages_reported(self):
+        """All stages show up with time, rows and memory, the chosen one with its functions."""
+        result = self._run(profile_stage='lint_fix')
+        profile = result['profile']
+        self.assertEqual(list(profile['stages']), [stage for stage in STAGES if stage != 'write'])
+        for name, record in profile['stages'].items():
+            self.assertGreaterEqual(record['wall'], 0.0, name)
+            self.assertEqual(record['rows'], record['calls'] * 7, name)
+        self.assertEqual(profile['stages']['variants']['calls'], 2)
+        self.assertGreater(profile['stages']['block_processing']['peak_memory'], 0)
+        self.assertTrue(any('fix_lint_problems' in function['function'] or 'linter' in function['function']
+                            for function in profile['cprofile']))
+        self.assertEqual(result['artifacts'], self._run()['artifacts'])
+        self.assertNotIn('profile', self._run())
+
+    def test_section_modes_add_up(self):
+        """Incremental mode reports the stages once per block, rows adding up."""
+        with tempfile.TemporaryDirectory() as tmp:
+            result = self._run(profile=True, block_cache_path=os.path.join(tmp, 'blocks.json'))
+        self.assertEqual(result['profile']['stages']['lint_fix']['calls'], result['blocks'])
+        self.assertEqual(result['profile']['stages']['lint_fix']['rows'], 8)
+
+    def test_outputs(self):
+        """Reports are written as JSON or as collapsed stacks."""
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, 'profile.json')
+            report = self._run(profile_stage='value_fix', profile_output=json_path)['profile']
+            with open(json_path, 'r', encoding='utf-8') as f:
+                self.assertEqual(list(json.load(f)['stages']), list(report['stages']))
+
+            folded_path = os.path.join(tmp, 'profile.folded')
+            self._run(profile=True, profile_output=folded_path)
+            with open(folded_path, 'r', encoding='utf-8') as f:
+                for line in f.read().splitlines():
+                    stack, micros = line.rsplit(' ', 1)
+                    self.assertTrue(stack.startswith('process_yaml_template;'))
+                    self.assertGreater(int(micros), 0)
+
+        lines = collapsed_stacks(report)
+        self.assertTrue(any(line.startswith('process_yaml_template;value_fix;') for line in lines))
+        merged = merge_reports([report, report])
+        self.assertEqual(merged['stages']['lint_fix']['calls'], 2 * report['stages']['lint_fix']['calls'])
+
+    def test_pluggable_hooks(self):
+        """Any object with stage() can be plugged in, unknown stages are refused by the profiler."""
+        service = YAMLProcessingService({'verdict_cache': False})
+        hooks = service.stage_hooks = RecordingHooks()
+        with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+            warnings.simplefilter('ignore')
+            service.process_yaml_content(TEMPLATE, generate_variants=[])
+        self.assertEqual([name for name, _ in hooks.seen],
+                         ['preprocess', 'block_processing', 'indentation_fix', 'lint_fix', 'value_fix'])
+        with self.assertRaises(ValueError):
+            StageProfiler('parse')
+        self.assertFalse(YAMLProcessingService({'profile_stage': 'parse'}).process_yaml_content(TEMPLATE)['success'])
+
+    def test_uncommenter_stages(self):
+        """The uncommenter tool reports its stages too, profiling does not change its output."""
+        def uncomment(hooks, output_path):
+            uncommenter = YAMLUncommenter()
+            uncommenter.verdict_cache = None
+            uncommenter.stage_hooks = hooks
+            with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+                warnings.simplefilter('ignore')
+                self.assertTrue(uncommenter.process(input_path, output_path))
+            with open(output_path, 'r', encoding='utf-8') as f:
+                return f.read()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = os.path.join(tmp, 'template.yaml')
+            with open(input_path, 'w', encoding='utf-8') as f:
+                f.write(TEMPLATE)
+            hooks = RecordingHooks()
+            plain = uncomment(hooks, os.path.join(tmp, 'plain.yaml'))
+            profiler = StageProfiler('lint_fix')
+            profiled = uncomment(profiler, os.path.join(tmp, 'profiled.yaml'))
+            profiler.close()
+
+        self.assertEqual(hooks.seen, [(name, 7) for name in
+                                      ('preprocess', 'block_processing', 'indentation_fix', 'lint_fix',
+                                       'value_fix', 'write')])
+        self.assertEqual(profiled, plain)
+        report = profiler.report()
+        self.assertEqual(list(report['stages']), [name for name, _ in hooks.seen])
+        self.assertTrue(report['cprofile'])
+
+
+if __name__ == '__main__':
+    unittest.main()
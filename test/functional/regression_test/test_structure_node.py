@@ -0,0 +1,104 @@
+"""
+Regression test for the slotted structure nodes and template lines
+The metadata and children views behave like the dicts the nodes used to carry
+"""
+import os
+import pickle
+import random
+import sys
+import unittest
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from backend.service_layer.ai_engine.structure_analysis.structure_analysis_engine import StructureNode
+from backend.service_layer.ai_engine.template_analysis.template_analysis_engine import TemplateLine
+
+DEFAULT_METADATA = {
+    "source": None, "origin": "inferred", "data_type": "unknown", "mandatory": "no", "depth": 2,
+    "description": None, "is_array_element": False, "confidence": 1.0, "usage_count": 0
+}
+VALUES = [None, 'helm', 'both', 'yes', 'no', True, 1, 1.0, 0.5, 'custom', ['unhashable'], {'a': 1}, '']
+
+
+class TestStructureNode(unittest.TestCase):
+    """StructureNode metadata and children against plain dicts."""
+
+    def test_metadata_matches_dict(self):
+        """Random assignments and updates read back as from a dict, extra keys included."""
+        rnd = random.Random(4)
+        keys = list(DEFAULT_METADATA) + ['origin_file', 'note']
+        for _ in range(50):
+            node, expected = StructureNode('port', 'key', 2), dict(DEFAULT_METADATA)
+            self.assertEqual(dict(node.metadata), expected)
+            for _ in range(30):
+                key, value = rnd.choice(keys), rnd.choice(VALUES)
+                if rnd.random() < 0.2:
+                    node.metadata.update({key: value})
+                else:
+                    node.metadata[key] = value
+                expected[key] = value
+                self.assertEqual(node.metadata[key], value)
+                self.assertIs(type(node.metadata[key]), type(value))
+            self.assertEqual(dict(node.metadata), expected)
+            self.assertEqual(node.metadata, expected)
+            self.assertEqual(node.depth, expected['depth'])
+
+    def test_fields_and_view_agree(self):
+        """Attributes and metadata are the same fields, extra keys can be deleted, fields cannot."""
+        node = StructureNode('image')
+        node.source = 'json_params'
+        node.metadata['usage_count'] += 3
+        node.is_array_element = True
+        self.assertEqual((node.metadata['source'], node.usage_count, node.metadata['is_array_element']),
+                         ('json_params', 3, True))
+        node.metadata['note'] = 'x'
+        del node.metadata['note']
+        self.assertNotIn('note', node.metadata)
+        with self.assertRaises(KeyError):
+            node.metadata['note']
+        with self.assertRaises(TypeError):
+            del node.metadata['source']
+        self.assertEqual(node.metadata.get('missing', 'default'), 'default')
+
+    def test_children_allocated_on_first_child(self):
+        """Leaves have no children dict, the first child added creates it."""
+        parent, child = StructureNode('root'), StructureNode('a')
+        self.assertNotIn('a', parent.children)
+        self.assertEqual(len(parent.children), 0)
+        self.assertIsNone(parent._children)
+        parent.children['a'] = child
+        self.assertIs(parent.children['a'], child)
+        self.assertEqual(list(parent.children.items()), [('a', child)])
+        parent.children = {}
+        self.assertEqual(dict(parent.children), {})
+
+    def test_pickle_round_trip(self):
+        """Nodes with coded, uncoded and extra metadata survive pickling."""
+        root, leaf = StructureNode('root'), StructureNode('leaf', 'string', 1)
+        root.children['leaf'] = leaf
+        root = pickle.loads(pickle.dumps(root))
+        leaf = root.children['leaf']
+        leaf.metadata.update({'source': 'both', 'mandatory': ['list'], 'note': 1, 'confidence': 0.25})
+        state = pickle.dumps(root)
+        self.assertIn(b'both', state)
+        copy = pickle.loads(state)
+        self.assertEqual(dict(copy.children['leaf'].metadata), dict(leaf.metadata))
+        self.assertIsNone(copy.children['leaf']._children)
+
+    def test_template_line(self):
+        """line_number aliases line_no, ai_features is allocated on first use."""
+        line = TemplateLine('  # port: 80\n', 7)
+        self.assertEqual((line.line_number, line.indent_level), (7, 2))
+        line.line_number = 8
+        self.assertEqual(line.line_no, 8)
+        self.assertIsNone(line._ai_features)
+        line.ai_features['has_colon'] = True
+        self.assertEqual(line.ai_features, {'has_colon': True})
+        with self.assertRaises(AttributeError):
+            line.unknown = 1
+
+
+if __name__ == '__main__':
+    unittest.main()
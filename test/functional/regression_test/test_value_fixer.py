@@ -0,0 +1,133 @@
+"""
+Regression test for the placeholder value fixer
+Row paths match the parsed document, values follow the priorities
+"""
+import os
+import random
+import sys
+import time
+import unittest
+
+import yaml
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+
+TEMPLATE = """global:
+  registry:
+    url: '{{ a | b | c }}'   # registry
+  list:
+  - name: "{{ x_or_y }}"
+    port: {{ 1 | 2 }}
+  script: |
+    echo: '{{ 1 }}'
+  after: '{{ 5 }}'
+
+"quoted.key": '{{ 10 | 20 | 30 }}'
+color: '{{ "#fff" | "#000" }}' # theme
+"""
+
+
+class IndentedDumper(yaml.SafeDumper):
+    """Dumps list dashes indented under their key."""
+
+    def increase_indent(self, flow=False, indentless=False):
+        return super().increase_indent(flow, False)
+
+
+def random_document(rnd, depth=0):
+    """Nested mappings and lists of mappings with scalar leaves."""
+    document = {}
+    for _ in range(rnd.randint(1, 4)):
+        key = rnd.choice(['alpha', 'beta', 'gamma', 'delta']) + str(rnd.randint(0, 99))
+        roll = rnd.random()
+        if depth < 3 and roll < 0.3:
+            document[key] = random_document(rnd, depth + 1)
+        elif depth < 3 and roll < 0.45:
+            document[key] = [random_document(rnd, depth + 1) for _ in range(rnd.randint(1, 2))]
+        else:
+            document[key] = rnd.choice([1, 'text', True, 'multi word'])
+    return document
+
+
+def leaf_paths(node, path=''):
+    """Paths of the scalar leaves, list items add no path element."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from leaf_paths(value, f"{path}/{key}")
+    elif isinstance(node, list):
+        for item in node:
+            yield from leaf_paths(item, path)
+    else:
+        yield path
+
+
+class TestValueFixer(unittest.TestCase):
+    """Placeholder values are found by full path and replaced in place."""
+
+    def setUp(self):
+        self.service = YAMLProcessingService({'verdict_cache': False})
+
+    def _fix(self, content, mrcf=None, helm=None, system_size='large-system', priorities=None):
+        return self.service._fix_values(content, mrcf or {}, helm or {}, system_size,
+                                        priorities or self.service.config['priorities'])
+
+    def test_paths_match_parsed_document(self):
+        """Every scalar row gets the path of its value in the parsed document."""
+        rnd = random.Random(3)
+        for _ in range(50):
+            document = random_document(rnd)
+            for dumper in (yaml.SafeDumper, IndentedDumper):
+                rows = yaml.dump(document, Dumper=dumper, sort_keys=False).split('\n')
+                found = [path for _, path, _, _, _ in self.service._iter_value_rows(rows)]
+                self.assertEqual(found, list(leaf_paths(document)))
+
+    def test_priorities(self):
+        """MRCF, flavor and Helm values land in the right rows, block scalars stay as they are."""
+        mrcf = {'/global/registry/url': {'recommended_value': 'registry.local', 'default': 'unused'},
+                '/global/list/port': {'default_large_system_profile': 7}}
+        helm = {'/global/after': {'values': ['helm'], 'files': [['chart']]}}
+        fixed = self._fix(TEMPLATE, mrcf, helm)
+        self.assertEqual(fixed, TEMPLATE
+                         .replace("'{{ a | b | c }}'", '"registry.local"')
+                         .replace('"{{ x_or_y }}"', '"y"')
+                         .replace('{{ 1 | 2 }}', '7')
+                         .replace("after: '{{ 5 }}'", 'after: 5')
+                         .replace("'{{ 10 | 20 | 30 }}'", '30')
+                         .replace("""'{{ "#fff" | "#000" }}'""", '"#000"'))
+
+        helm_first = self._fix(TEMPLATE, mrcf, helm, priorities=['HELM.default', 'YAML.default_per_flavor'])
+        self.assertIn('after: "helm"\n', helm_first)
+        self.assertIn('url: "c"   # registry\n', helm_first)
+        self.assertIn("echo: '{{ 1 }}'\n", helm_first)
+
+    def test_flavors(self):
+        """Each system size takes its alternative, a shorter list falls back to its last one."""
+        content = "a: '{{ 1 | 2 | 3 }}'\nb: '{{ x | y }}'\n"
+        self.assertEqual(self._fix(content, system_size='small-system'), 'a: 1\nb: "x"\n')
+        self.assertEqual(self._fix(content, system_size='standard-system'), 'a: 2\nb: "y"\n')
+        self.assertEqual(self._fix(content, system_size='large-system'), 'a: 3\nb: "y"\n')
+
+    def test_unsupported_system_size(self):
+        """Per-flavor MRCF defaults need a known system size."""
+        with self.assertRaises(ValueError):
+            self._fix("a: '{{ 1 }}'\n", {'/a': {'default_tiny_system_profile': 1}}, system_size='tiny-system')
+
+    def test_large_file(self):
+        """Paths of deep rows are found in a 100k-row template without scanning back."""
+        rows = ['root:']
+        for i in range(25000):
+            rows += [f'  group{i}:', f'    nested{i}:', f"      leaf: '{{{{ {i} | {i + 1} }}}}'", '      other: 1']
+        mrcf = {'/root/group24999/nested24999/leaf': {'recommended_value': 'last'}}
+        started = time.perf_counter()
+        fixed = self._fix('\n'.join(rows), mrcf).split('\n')
+        self.assertLess(time.perf_counter() - started, 30)
+        self.assertEqual(fixed[-2], '      leaf: "last"')
+        self.assertEqual(fixed[3], '      leaf: 1')
+
+
+if __name__ == '__main__':
+    unittest.main()
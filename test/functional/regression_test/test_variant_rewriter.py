@@ -0,0 +1,79 @@
+"""
+Regression test for the rewritten variants
+Only requested variants are written, forked rewrites give the same text
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+import warnings
+from unittest import mock
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from backend.service_layer.yaml_processing import variant_rewriter
+from backend.service_layer.yaml_processing.variant_rewriter import variant_plan
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+
+TEMPLATE = "b: '{{ 1 | 2 | 3 }}'\nc:\n  d: 2\n#  d: 1\na: [1, 2]\n"
+
+
+class TestVariantRewriter(unittest.TestCase):
+    """Variant generation does only the work asked for."""
+
+    def _run(self, generate_variants, **config):
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = os.path.join(tmp, 'template.yaml')
+            with open(input_path, 'w', encoding='utf-8') as f:
+                f.write(TEMPLATE)
+            service = YAMLProcessingService(dict(config, verdict_cache=False))
+            with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+                warnings.simplefilter('ignore')
+                result = service.process_yaml_template(input_path, os.path.join(tmp, 'out.yaml'),
+                                                       system_size='large-system',
+                                                       generate_variants=generate_variants)
+            return sorted(os.path.basename(path) for path in result['files_generated'])
+
+    def test_plan(self):
+        """Booleans keep the force_rewriting behaviour, lists are taken as they are."""
+        config = {'variants': ['ruamel', 'pyyaml'], 'force_rewriting': True}
+        self.assertEqual(variant_plan(True, config), (('ruamel', 'pyyaml'), ('ruamel', 'pyyaml')))
+        self.assertEqual(variant_plan(False, config), (('ruamel', 'pyyaml'), ()))
+        self.assertEqual(variant_plan(False, dict(config, force_rewriting=False)), ((), ()))
+        self.assertEqual(variant_plan([], config), ((), ()))
+        self.assertEqual(variant_plan(['pyyaml'], config), (('pyyaml',), ('pyyaml',)))
+        with self.assertRaises(ValueError):
+            variant_plan(['json'], config)
+
+    def test_requested_variants_only(self):
+        """Variants nobody asked for are neither made nor written, in both modes."""
+        for streaming in (False, True):
+            with self.subTest(streaming=streaming):
+                self.assertEqual(self._run([], streaming=streaming),
+                                 ['out.yaml', 'out_fixed.yaml', 'out_values_set.yaml'])
+                self.assertEqual(self._run(['pyyaml'], streaming=streaming),
+                                 ['out.yaml', 'out_fixed.yaml', 'out_rewritten_pyyaml.yaml', 'out_values_set.yaml',
+                                  'out_values_set_rewritten_pyyaml.yaml'])
+                self.assertEqual(len(self._run(True, streaming=streaming)), 7)
+                self.assertEqual(len(self._run(False, streaming=streaming)), 5)
+
+    def test_forked_rewrite_matches(self):
+        """PyYAML rewritten in a forked child gives the in-process text."""
+        content = ''.join(f"key{i}:\n  value: '{{{{ {i} | 2 }}}}'\n  list: [a, b]\n" for i in range(200))
+        expected = YAMLProcessingService({'verdict_cache': False}).variant_rewriter.rewrite_all(
+            ['ruamel', 'pyyaml'], content)
+        service = YAMLProcessingService({'verdict_cache': False, 'variant_fork_threshold': 0})
+        with mock.patch.object(variant_rewriter.os, 'cpu_count', return_value=4), \
+                mock.patch.object(variant_rewriter, 'ProcessPoolExecutor',
+                                  wraps=variant_rewriter.ProcessPoolExecutor) as executor:
+            forked = service.variant_rewriter.rewrite_all(['ruamel', 'pyyaml'], content)
+        self.assertEqual(forked, expected)
+        self.assertEqual(executor.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Differential test for the row-based block engine of YAMLProcessingService
+Compares it byte by byte with the legacy character-by-character scan
+"""
+import os
+import sys
+import unittest
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+
+SAMPLE_TEMPLATE = os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values.yaml')
+
+
+class TestRowBlockEngine(unittest.TestCase):
+    """Row engine must reproduce the character scan exactly."""
+
+    def setUp(self):
+        self.rows_service = YAMLProcessingService({'block_engine': 'rows'})
+        self.chars_service = YAMLProcessingService({'block_engine': 'chars'})
+
+        with open(SAMPLE_TEMPLATE, 'r', encoding='utf-8') as f:
+            self.sample = f.read()
+
+    def _run(self, service, content):
+        """Return ('ok', output) or ('error', message) for one engine."""
+        try:
+            return 'ok', service._process_yaml_file2(content, SAMPLE_TEMPLATE)
+        except Exception as e:
+            return 'error', str(e)
+
+    def _preprocess(self, content):
+        content = self.rows_service._preprocess_yaml_file2(content)
+        return self.rows_service._preprocess_yaml_file2b(content)
+
+    def _assert_same(self, content):
+        expected = self._run(self.chars_service, content)
+        actual = self._run(self.rows_service, content)
+        self.assertEqual(expected, actual)
+        return actual
+
+    def _top_level_sections(self, content):
+        sections = []
+        current = []
+        for row in content.split('\n'):
+            if row and not row[0].isspace() and not row.startswith('#') and current:
+                sections.append('\n'.join(current) + '\n')
+                current = []
+            current.append(row)
+        if current:
+            sections.append('\n'.join(current))
+        return sections
+
+    def test_sample_template(self):
+        """Whole sample template gives the same output or the same error."""
+        self._assert_same(self._preprocess(self.sample))
+
+    def test_sample_template_sections(self):
+        """Every top-level section of the sample gives the same result."""
+        sections = self._top_level_sections(self.sample)
+        self.assertGreater(len(sections), 10)
+
+        processed = 0
+        for section in sections:
+            outcome, _ = self._assert_same(self._preprocess(section))
+            if outcome == 'ok':
+                processed += 1
+
+        # Most sections must be processed without error, otherwise the
+        # comparison would only exercise the error path
+        self.assertGreater(processed, len(sections) // 2)
+
+    def test_edge_cases(self):
+        """Degenerate inputs follow the character scan quirks."""
+        for content in ["", "\n", "#", "#\n", "\na: 1\n", "a: 1\nb: 2",
+                        "#\n# only comment #\n", "#\n#a: 1\n#b: 2\n",
+                        "#\nroot:\n  # child: 1\n  # text here\n"]:
+            with self.subTest(content=content):
+                self._assert_same(content)
+
+
+if __name__ == '__main__':
+    unittest.main()
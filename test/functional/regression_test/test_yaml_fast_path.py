@@ -0,0 +1,89 @@
+"""
+Regression test for the libyaml fast path of the YAML validity probes
+The fast path may only answer what the ruamel parse would answer
+"""
+import os
+import sys
+import unittest
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from ruamel import yaml as yml
+
+from common.util.yaml_fast_path import LIBYAML_AVAILABLE, probe_yaml_structure
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+
+SAMPLE_TEMPLATE = os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values.yaml')
+
+SNIPPETS = [
+    "", "# comment", "a: 1", "a:\n  b: [1, 2]\n  c: {d: e}", "- x\n- y", "a: 1\n  - x",
+    "- a: 1\n b: 2", "a: 1\n---\nb: 2", "plain text", "123", ":", "&x a: 1", "a: ._",
+    "<<: {}", "a: |\n  \n    text", "- |#x", "key: 'quoted: value'", "[1 1:]",
+    "a: 'unterminated", "a: b: c", "\ttab: 1", "%YAML 1.2\n---\na: 1", "a: \u00e9",
+]
+
+
+@unittest.skipUnless(LIBYAML_AVAILABLE, "libyaml not available")
+class TestYAMLFastPath(unittest.TestCase):
+    """Fast path answers agree with the ruamel round-trip loader."""
+
+    def setUp(self):
+        self.yamel = yml.YAML(typ='rt', pure=True)
+        self.yamel.allow_duplicate_keys = None
+
+    def _ruamel_outcome(self, content):
+        try:
+            parsed = self.yamel.load(content)
+        except (yml.scanner.ScannerError, yml.composer.ComposerError, yml.parser.ParserError):
+            return 'error'
+        except Exception as e:
+            return type(e).__name__
+        if parsed is None:
+            return 'empty'
+        if isinstance(parsed, dict):
+            return 'mapping'
+        if isinstance(parsed, list):
+            return 'sequence'
+        return 'scalar'
+
+    def test_snippets(self):
+        """Every decided snippet matches ruamel, ambiguous ones are left to it."""
+        for content in SNIPPETS:
+            probe = probe_yaml_structure(content)
+            if probe is not None:
+                with self.subTest(content=content):
+                    self.assertEqual(probe, self._ruamel_outcome(content))
+
+    def test_common_cases_decided(self):
+        """Plain documents and plain errors never reach ruamel."""
+        self.assertEqual(probe_yaml_structure("# comment"), 'empty')
+        self.assertEqual(probe_yaml_structure("a:\n  b: text"), 'mapping')
+        self.assertEqual(probe_yaml_structure("- x\n- y"), 'sequence')
+        self.assertEqual(probe_yaml_structure("a: text\n  - x"), 'mapping')
+        self.assertEqual(probe_yaml_structure("a: b: c"), 'error')
+        self.assertEqual(probe_yaml_structure("a: x\n---\nb: y"), 'error')
+        self.assertIsNone(probe_yaml_structure("plain text"))
+
+    def test_service_results_unchanged(self):
+        """Uncommenting the sample sections gives the same output with the fast path."""
+        with open(SAMPLE_TEMPLATE, 'r', encoding='utf-8') as f:
+            sections = f.read().split('\n\n')
+
+        fast = YAMLProcessingService({'verdict_cache': False, 'fast_path_validator': True})
+        slow = YAMLProcessingService({'verdict_cache': False, 'fast_path_validator': False})
+
+        for section in sections:
+            section = slow._preprocess_yaml_file2b(slow._preprocess_yaml_file2(section))
+            outcomes = []
+            for service in (slow, fast):
+                try:
+                    outcomes.append(service._process_yaml_file2(section, SAMPLE_TEMPLATE))
+                except Exception as e:
+                    outcomes.append(str(e))
+            self.assertEqual(outcomes[0], outcomes[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
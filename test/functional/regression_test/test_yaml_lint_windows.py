@@ -0,0 +1,145 @@
+"""
+Regression test for the windowed yamllint fix loop
+Re-linting only the touched sections must not change what gets fixed
+"""
+import os
+import random
+import sys
+import unittest
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from yamllint import linter
+from yamllint.config import YamlLintConfig
+
+from common.util.yaml_lint_windows import WindowedYAMLLinter
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+
+SAMPLE_TEMPLATE = os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values.yaml')
+
+CONFIGS = [
+    "extends: relaxed\nrules:\n  indentation:\n    spaces: 2\n    indent-sequences: 'whatever'",
+    "extends: relaxed\nrules:\n  indentation: {level: error}\n  line-length: disable",
+    "extends: default",
+]
+
+# Row pieces of the fuzzed documents: open and stray flows, quotes, block scalars, tabs, CRLF
+PIECES = ['{}', '[1,', '2]', '{a: [1,', ']}', 'x', '|', '>-', '>+', '|2', '"q', 'q"', "'s'", '""', '[]',
+          '{a: 1}', '- x', '- - x', '- ', '? x', ': x', '!!str x', '\tx', 'x\r', '', '1 ', 'x  ']
+# Fix loop input a full re-lint once fixed differently
+REPORTED = ('k: {}\n  txt: x\nt: |\n      txt: x\n  k: [1,\n  #c\n    #c\nt: |\n  txt: x\n    k: {}\n'
+            '      txt: x\n    txt: x\n  2]\n')
+
+
+def broken_documents(count: int, seed: int = 0):
+    """Sample template slices, half uncommented and with typical breakage."""
+    with open(SAMPLE_TEMPLATE, 'r', encoding='utf-8') as f:
+        rows = f.read().split('\n')
+    rnd = random.Random(seed)
+    for _ in range(count):
+        start = rnd.randrange(len(rows))
+        doc = [row.replace('#', '', 1) if row.lstrip().startswith('#') and rnd.random() < 0.5 else row
+               for row in rows[start:start + rnd.choice([20, 80, 300])]]
+        for _ in range(rnd.randint(1, 8)):
+            if not doc:
+                break
+            i = rnd.randrange(len(doc))
+            doc[i:i + 1] = rnd.choice([
+                [doc[i].rstrip() + ': []'], [doc[i], doc[i]], [' ' + doc[i]],
+                ['some plain text here', doc[i]], [doc[i] + ' {'], [doc[i].replace(': ', ': "', 1)],
+            ])
+        yield '\n'.join(doc) + '\n'
+
+
+def fuzzed_documents(count: int, seed: int = 0):
+    """Short documents of random keys, pieces, comments and indentation."""
+    rnd = random.Random(seed)
+    for _ in range(count):
+        rows = []
+        for _ in range(rnd.randint(1, 14)):
+            indent = ' ' * rnd.choice([0, 0, 0, 1, 2, 2, 4, 6])
+            kind = rnd.random()
+            if kind < 0.6:
+                rows.append(indent + rnd.choice(['k', 't', 'txt', 'a', 'b']) + ': ' + rnd.choice(PIECES))
+            elif kind < 0.7:
+                rows.append(indent + '#c')
+            elif kind < 0.8:
+                rows.append(indent + '- ' + rnd.choice(PIECES))
+            elif kind < 0.9:
+                rows.append(indent + rnd.choice(PIECES))
+            else:
+                rows.append('')
+        yield '\n'.join(rows) + '\n'
+
+
+def lint_outcome(lint, content: str):
+    """Problems of a lint run, or the type of the exception yamllint raised."""
+    try:
+        return [repr(problem) for problem in lint(content)]
+    except Exception as e:
+        return type(e).__name__
+
+
+class TestWindowedYAMLLinter(unittest.TestCase):
+    """Windowed passes report and fix exactly what full passes do."""
+
+    def _fixer(self, rows, problems):
+        for problem in problems:
+            if problem.level != 'error' or not 1 < problem.line <= len(rows):
+                continue
+            # Syntax errors show up on the row after the broken one
+            row_num = problem.line - (2 if problem.rule is None else 1)
+            if ': []' in rows[row_num]:
+                rows[row_num] = rows[row_num].replace(': []', ':')
+            elif problem.rule == 'key-duplicates' or "could not find expected ':'" in problem.message:
+                rows[row_num] = '#' + rows[row_num]
+
+    def test_lint_matches_yamllint(self):
+        """Merged section problems equal one yamllint run over the document."""
+        for config_str in CONFIGS:
+            config = YamlLintConfig(config_str)
+            for content in broken_documents(40):
+                with self.subTest(config=config_str, content=content[:80]):
+                    expected = [repr(problem) for problem in linter.run(content, config)]
+                    windowed = WindowedYAMLLinter(config)
+                    self.assertEqual([repr(problem) for problem in windowed.lint(content.split('\n'))], expected)
+
+    def test_fuzzed_lint_matches_yamllint(self):
+        """Seeded differential fuzz of windowed and full lints, exceptions included."""
+        for index, content in enumerate(fuzzed_documents(600)):
+            config = YamlLintConfig(CONFIGS[index % len(CONFIGS)])
+            with self.subTest(index=index, content=content):
+                self.assertEqual(lint_outcome(lambda text: WindowedYAMLLinter(config).lint(text.split('\n')), content),
+                                 lint_outcome(lambda text: linter.run(text, config), content))
+
+    def test_fix_matches_full_passes(self):
+        """Fix loop gives the same rows with and without windows."""
+        config = YamlLintConfig(CONFIGS[1])
+        for content in broken_documents(30, seed=1):
+            full = WindowedYAMLLinter(config).fix(content.split('\n'), self._fixer, 2000, windowed=False)
+            windowed = WindowedYAMLLinter(config)
+            self.assertEqual(windowed.fix(content.split('\n'), self._fixer, 2000), full)
+
+    def test_untouched_sections_reused(self):
+        """After a fix only the touched section is linted again."""
+        content = "a:\n  b: 1\nc: []\n  d: 2\ne:\n  f: 3\ng:\n  h: 4\n"
+        windowed = WindowedYAMLLinter(YamlLintConfig(CONFIGS[0]))
+        self.assertEqual(windowed.fix(content.split('\n'), self._fixer, 2000),
+                         "a:\n  b: 1\nc:\n  d: 2\ne:\n  f: 3\ng:\n  h: 4\n")
+        self.assertEqual(windowed.stats['full_lints'], 2)
+        self.assertEqual((windowed.stats['windows_reused'], windowed.stats['windows_linted']), (1, 3))
+
+    def test_service_fixes_unchanged(self):
+        """Seeded differential fuzz of backend error fixing with and without windows."""
+        windowed = YAMLProcessingService({'verdict_cache': False, 'windowed_relint': True, 'max_errors_to_fix': 50})
+        full = YAMLProcessingService({'verdict_cache': False, 'windowed_relint': False, 'max_errors_to_fix': 50})
+        documents = [REPORTED] + list(fuzzed_documents(200, seed=1)) + list(broken_documents(15, seed=2))
+        for content in documents:
+            with self.subTest(content=content):
+                self.assertEqual(windowed._fix_yaml_errors_comprehensive(content),
+                                 full._fix_yaml_errors_comprehensive(content))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Regression test for the YAMLUncommenter optimizations
+Incremental validation, verdict cache, fast path and windowed re-lint must not change the output
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import unittest
+import warnings
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from common.tool.yaml_uncommenter import YAMLUncommenter
+from common.util.yaml_verdict_cache import YAMLVerdictCache
+
+SAMPLE_TEMPLATE = os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values.yaml')
+
+# Switch -> value turning the optimization off
+SWITCHES = {
+    'incremental_validation': False,
+    'verdict_cache': None,
+    'fast_path_validation': False,
+    'windowed_relint': False,
+}
+
+
+def fuzzed_templates(rows, count, seed):
+    """Templates of sample rows, rows commented in and out, shifted and moved."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        start = rng.randrange(len(rows))
+        template = rows[start:start + rng.randint(20, 200)]
+        for index, row in enumerate(template):
+            roll = rng.random()
+            if roll < 0.08:
+                template[index] = row[1:] if row.startswith('#') else '#' + row
+            elif roll < 0.12:
+                template[index] = '  ' + row
+            elif roll < 0.14:
+                template[index] = row.lstrip()
+            elif roll < 0.16 and index:
+                template[index - 1], template[index] = row, template[index - 1]
+        yield '\n'.join(template) + '\n'
+
+
+class TestYAMLUncommenterSwitches(unittest.TestCase):
+    """Output is byte-identical with every optimization on or off."""
+
+    def _uncomment(self, input_path, output_path, switch=None):
+        uncommenter = YAMLUncommenter()
+        uncommenter.verdict_cache = YAMLVerdictCache()
+        if switch is not None:
+            setattr(uncommenter, switch, SWITCHES[switch])
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+            warnings.simplefilter('ignore')
+            success = uncommenter.process(input_path, output_path)
+        if not success:
+            return None
+        with open(output_path, 'rb') as f:
+            return f.read()
+
+    def _check(self, input_path, tmp):
+        output_path = os.path.join(tmp, 'output.yaml')
+        expected = self._uncomment(input_path, output_path)
+        for switch in SWITCHES:
+            with self.subTest(switch=switch):
+                self.assertEqual(self._uncomment(input_path, output_path, switch), expected)
+        return expected
+
+    def test_sample_template(self):
+        """The sample comes out the same with each optimization off."""
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsNotNone(self._check(SAMPLE_TEMPLATE, tmp))
+
+    def test_fuzzed_templates(self):
+        """Fuzzed templates come out the same with each optimization off."""
+        with open(SAMPLE_TEMPLATE, 'r', encoding='utf-8') as f:
+            rows = f.read().split('\n')
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = os.path.join(tmp, 'template.yaml')
+            for index, template in enumerate(fuzzed_templates(rows, 25, seed=2)):
+                with open(input_path, 'w', encoding='utf-8', newline='\n') as f:
+                    f.write(template)
+                with self.subTest(template=index):
+                    self._check(input_path, tmp)
+
+
+if __name__ == '__main__':
+    unittest.main()
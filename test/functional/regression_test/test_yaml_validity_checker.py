@@ -0,0 +1,79 @@
+"""
+Regression test for the incremental YAML validity checker
+Every verdict must match a full parse of head + block
+"""
+import os
+import sys
+import unittest
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+
+SAMPLE_TEMPLATE = os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values.yaml')
+
+BLOCKS = [
+    "", "\n# comment", "\na: 1", "\na:\n  b: 1", "\n- x\n- y", "\n- x\na: 1",
+    "\n  a: 1\nb: 2", "\n    b: 1\n  c: 2", "\n  - x\n  b: 1", "\n- k: 1\n  m: 2",
+    "\n  b: 1\n- x", "\n  - x", "\n  txt", "\nx: |\n  a: 1", "\n    deep: 1",
+]
+HEADS = [
+    "\n# c", "\na:", "\na: 1", "\n  a:", "\n  a: 1", "\n- x", "\n-", "\n- k:",
+    "\n- k: 1", "\n  - k:", "\nplain words", "\n123", "\nx: |", "\nk: [1, 2]",
+    "\ne: &an 1", "\n'q': 1", "\n- a b c d", "\nKey: Some long text",
+]
+
+
+class TestIncrementalYAMLChecker(unittest.TestCase):
+    """Incremental verdicts follow the full parse."""
+
+    def setUp(self):
+        self.service = YAMLProcessingService({'verify_closed_blocks': True})
+
+    def _full(self, text):
+        return self.service._is_correct_yaml(text, 0)[0]
+
+    def test_heads_on_blocks(self):
+        """Every head on every block gives the full parse verdict."""
+        for block in BLOCKS:
+            checker = self.service._new_validity_checker()
+            for row in reversed(block.split('\n')[1:]):
+                checker.push('\n' + row)
+            for head in HEADS:
+                with self.subTest(block=block, head=head):
+                    self.assertEqual(self._full(head + block), checker.check(head, 0)[0])
+
+    def test_plain_rows_skip_full_parse(self):
+        """Plain key rows are checked without parsing the block again."""
+        checker = self.service._new_validity_checker()
+        for i in range(200):
+            self.assertTrue(checker.check(f"\n  key{i}: value", 0)[0])
+            checker.push(f"\n  key{i}: value")
+        self.assertTrue(checker.check("\nroot:", 0)[0])
+        self.assertEqual(checker.stats['full'], 0)
+
+    def test_sample_blocks_verified_on_close(self):
+        """Closed blocks of the sample template agree with a full parse."""
+        with open(SAMPLE_TEMPLATE, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+        checkers = []
+        new_checker = self.service._new_validity_checker
+        self.service._new_validity_checker = lambda: checkers.append(new_checker()) or checkers[-1]
+
+        sections = content.split('\n\n')
+        for section in sections:
+            section = self.service._preprocess_yaml_file2b(self.service._preprocess_yaml_file2(section))
+            try:
+                self.service._process_yaml_file2(section, SAMPLE_TEMPLATE)
+            except Exception:
+                pass
+
+        self.assertGreater(sum(c.stats['verified'] for c in checkers), 0)
+        self.assertEqual(sum(c.stats['mismatches'] for c in checkers), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Regression test for the YAML verdict cache
+Bounded LRU behaviour, persistence and unchanged processing results
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from common.util.yaml_verdict_cache import YAMLVerdictCache
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+
+SAMPLE_TEMPLATE = os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values.yaml')
+
+
+class TestYAMLVerdictCache(unittest.TestCase):
+    """Verdict cache must only save parsing, never change a verdict."""
+
+    def _validator(self, content):
+        self.calls += 1
+        return content.startswith('a'), content.strip()
+
+    def setUp(self):
+        self.calls = 0
+
+    def test_hits_and_misses(self):
+        """Same snippet is validated once, leading newlines are ignored."""
+        cache = YAMLVerdictCache()
+        self.assertEqual(cache.memoize('ns', self._validator, 'a: 1'), (True, 'a: 1'))
+        self.assertEqual(cache.memoize('ns', self._validator, '\n\na: 1'), (True, 'a: 1'))
+        cache.memoize('other', self._validator, 'a: 1')
+
+        self.assertEqual(self.calls, 2)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 2, 2))
+
+    def test_lru_eviction(self):
+        """Least recently used entries are evicted by count and by size."""
+        cache = YAMLVerdictCache(max_entries=2)
+        cache.store('ns', 'a', True, None)
+        cache.store('ns', 'b', True, None)
+        cache.lookup('ns', 'a')
+        cache.store('ns', 'c', True, None)
+        self.assertIsNotNone(cache.lookup('ns', 'a'))
+        self.assertIsNone(cache.lookup('ns', 'b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+        cache = YAMLVerdictCache(max_bytes=3 * YAMLVerdictCache.ENTRY_OVERHEAD)
+        cache.store('ns', 'long', False, 'x' * YAMLVerdictCache.ENTRY_OVERHEAD)
+        cache.store('ns', 'short', True, None)
+        cache.store('ns', 'short2', True, None)
+        self.assertIsNone(cache.lookup('ns', 'long'))
+        self.assertLessEqual(cache.stats()['bytes'], cache.max_bytes)
+
+    def test_persistence(self):
+        """Saved verdicts are reused by a new cache, foreign files are ignored."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'verdicts.json')
+            cache = YAMLVerdictCache()
+            cache.memoize('ns', self._validator, 'a: 1')
+            cache.memoize('ns', self._validator, 'plain text')
+            cache.save(path)
+
+            restored = YAMLVerdictCache()
+            self.assertEqual(restored.load(path), 2)
+            self.assertEqual(restored.memoize('ns', self._validator, 'plain text'), (False, 'plain text'))
+            self.assertEqual(self.calls, 2)
+
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            data['ruamel'] = '0.0.0'
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            self.assertEqual(YAMLVerdictCache().load(path), 0)
+
+    def test_service_results_unchanged(self):
+        """Uncommenting the sample sections gives the same output with the cache."""
+        with open(SAMPLE_TEMPLATE, 'r', encoding='utf-8') as f:
+            sections = f.read().split('\n\n')
+
+        cached = YAMLProcessingService({'verdict_cache': True})
+        cached.verdict_cache.clear()
+        plain = YAMLProcessingService({'verdict_cache': False})
+
+        for _ in range(2):
+            for section in sections:
+                section = plain._preprocess_yaml_file2b(plain._preprocess_yaml_file2(section))
+                outcomes = []
+                for service in (plain, cached):
+                    try:
+                        outcomes.append(service._process_yaml_file2(section, SAMPLE_TEMPLATE))
+                    except Exception as e:
+                        outcomes.append(str(e))
+                self.assertEqual(outcomes[0], outcomes[1])
+
+        self.assertGreater(cached.verdict_cache.stats()['hits'], 0)
+
+    def test_parsed_same_on_hit_and_miss(self):
+        """parsed is the same on a hit, a miss and without cache, None for collections."""
+        snippets = ['a: 1', '- x', 'a:\n  b: 1', 'plain words', '42', "'q'", '', '# c', 'a: [1', 'k: {a: 1}']
+        for fast_path in (True, False):
+            plain = YAMLProcessingService({'verdict_cache': False, 'fast_path_validator': fast_path})
+            cached = YAMLProcessingService({'fast_path_validator': fast_path})
+            cached.verdict_cache = YAMLVerdictCache()
+            for snippet in snippets:
+                with self.subTest(fast_path=fast_path, snippet=snippet):
+                    expected = plain._is_correct_yaml(snippet, 0)
+                    self.assertNotIsInstance(expected[1], (dict, list))
+                    self.assertEqual(cached._is_correct_yaml(snippet, 0), expected)
+                    self.assertEqual(cached._is_correct_yaml(snippet, 0), expected)
+            self.assertEqual(cached.verdict_cache.stats()['hits'], len(snippets))
+        self.assertEqual(plain._is_correct_yaml('plain words', 0), (False, 'plain words'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark of the knowledge maps on a generated umbrella chart set
+Helm and MRCF maps as plain dicts vs PathStore: traced size, build and lookup time
+"""
+import argparse
+import contextlib
+import gc
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+
+SHARED_VALUES = ['true', 'false', 'IfNotPresent', '100m', '128Mi', '500m', '512Mi', 'ClusterIP', '1.2.3']
+
+
+def generate_charts(charts: int, sections: int, keys: int, seed: int = 1):
+    """Values trees of an umbrella chart set as (values, chart path), subcharts sharing the common keys."""
+    rnd = random.Random(seed)
+    chart_set = []
+    for chart in range(charts):
+        values = {
+            'image': {'repository': f'registry/chart{chart}', 'tag': rnd.choice(SHARED_VALUES),
+                      'pullPolicy': 'IfNotPresent'},
+            'resources': {'limits': {'cpu': '500m', 'memory': '512Mi'},
+                          'requests': {'cpu': '100m', 'memory': '128Mi'}},
+            'env': [{'name': f'VAR_{index}', 'value': str(index)} for index in range(10)],
+            f'chart{chart}': {
+                f'section{section}': {f'key{key}': rnd.choice(SHARED_VALUES + [f'value{chart}.{key}'])
+                                      for key in range(keys)}
+                for section in range(sections)
+            },
+        }
+        chart_set.append((values, f'umbrella/charts/chart{chart}'))
+    return chart_set
+
+
+def mrcf_parameters(chart_set):
+    """MRCF parameters for the first leaf paths of every chart."""
+    parameters = {}
+    for values, _ in chart_set:
+        for section, keys in list(values.items())[-1][1].items():
+            for key in list(keys)[:5]:
+                path = f"/{list(values)[-1]}/{section}/{key}"
+                parameters[path] = {'path': path, 'default': keys[key], 'type': 'string',
+                                    'description': f'Setting {key} of {section}'}
+    return parameters
+
+
+def measure(compact: bool, chart_set, parameters):
+    """(traced MB, build seconds, lookup microseconds, paths) of the maps of one service."""
+    service = YAMLProcessingService({'verdict_cache': False, 'compact_paths': compact})
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for values, chart in chart_set:
+            service._loop_through_nodes(values, None, chart, '/', service.map_path_helm)
+        service.map_path_mrcf.update(parameters)
+    build = time.perf_counter() - started
+    gc.collect()
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    paths = list(service.map_path_helm)
+    probes = [paths[index] for index in random.Random(2).sample(range(len(paths)), min(100000, len(paths)))]
+    started = time.perf_counter()
+    for path in probes:
+        service.map_path_helm.get(path)
+    lookup = (time.perf_counter() - started) / len(probes) * 1e6
+    return traced / 1048576, build, lookup, len(service.map_path_helm) + len(service.map_path_mrcf)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Knowledge map memory benchmark')
+    parser.add_argument('--charts', type=int, default=300, help='Subcharts of the generated umbrella chart')
+    parser.add_argument('--sections', type=int, default=25, help='Sections per subchart')
+    parser.add_argument('--keys', type=int, default=20, help='Keys per section')
+    args = parser.parse_args()
+
+    chart_set = generate_charts(args.charts, args.sections, args.keys)
+    parameters = mrcf_parameters(chart_set)
+    print(f"{args.charts} charts, {args.sections} sections x {args.keys} keys each, {len(parameters)} MRCF parameters")
+    print(f"{'maps':<12}{'paths':>10}{'MB':>10}{'build s':>10}{'lookup us':>11}")
+    results = {}
+    for compact in (False, True):
+        name = 'PathStore' if compact else 'dict'
+        results[name] = measure(compact, chart_set, parameters)
+        size, build, lookup, paths = results[name]
+        print(f"{name:<12}{paths:>10}{size:>10.1f}{build:>10.2f}{lookup:>11.2f}")
+    print(f"PathStore keeps the maps in {100 * results['PathStore'][0] / results['dict'][0]:.0f}% of the memory")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark of the structure model on a generated flat path set
+Slotted StructureNode vs the dict-backed node layout: traced size, build time, template analysis
+"""
+import argparse
+import gc
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from common.handler.trace_handler import TraceHandler
+from common.handler.path_handler import PathHandler
+from backend.service_layer.ai_engine.structure_analysis import structure_analysis_engine
+from backend.service_layer.ai_engine.structure_analysis.structure_analysis_engine import StructureAnalysisEngine
+from backend.service_layer.ai_engine.template_analysis.template_analysis_engine import TemplateAnalysisEngine
+
+SAMPLE_TEMPLATE = os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values.yaml')
+LEAF_VALUES = ['true', 8080, 1.5, None, 'IfNotPresent', ['a'], {'k': 'v'}]
+
+
+class DictStructureNode:
+    """The node layout before the slots: instance dict, a metadata dict and a children dict per node."""
+
+    def __init__(self, name: str, node_type: str = "key", depth: int = 0):
+        self.name = name
+        self.node_type = node_type
+        self.depth = depth
+        self.children = {}
+        self.metadata = {
+            "source": None,
+            "origin": "inferred",
+            "data_type": "unknown",
+            "mandatory": "no",
+            "depth": depth,
+            "description": None,
+            "is_array_element": False,
+            "confidence": 1.0,
+            "usage_count": 0
+        }
+
+
+def _metadata_field(key: str) -> property:
+    return property(lambda self: self.metadata[key], lambda self, value: self.metadata.__setitem__(key, value))
+
+
+for _field in ("source", "origin", "data_type", "mandatory", "description", "is_array_element", "confidence",
+               "usage_count"):
+    setattr(DictStructureNode, _field, _metadata_field(_field))
+
+
+def generate_paths(paths: int, seed: int = 1):
+    """Flat JSON paths of services, sections and keys, and MRCF parameters for a tenth of them."""
+    rnd = random.Random(seed)
+    flat, parameters = {}, []
+    services = max(1, paths // 2000)
+    for index in range(paths):
+        service, section, key = index % services, index // services % 40, index // services // 40
+        path = f"service{service}.section{section}.key{key}"
+        flat[path] = rnd.choice(LEAF_VALUES)
+        if index % 10 == 0:
+            parameters.append({'path': path.replace('.', '/') + '/limit', 'mandatory': rnd.choice(['yes', 'no']),
+                               'format': rnd.choice(['string', 'integer']), 'description': f'Limit of {key}'})
+    return flat, parameters
+
+
+def measure(node_class, flat, parameters, template_lines):
+    """(traced MB, nodes, build seconds, analysis seconds) of one structure model."""
+    structure_analysis_engine.StructureNode = node_class
+    tracer = TraceHandler("Benchmark", "1.0", "StructureModel")
+    engine = StructureAnalysisEngine(tracer, PathHandler())
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    engine.build_from_sources({}, flat)
+    engine.ingest_json_parameters(parameters)
+    build = time.perf_counter() - started
+    gc.collect()
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    template_engine = TemplateAnalysisEngine(tracer, PathHandler(), engine)
+    started = time.perf_counter()
+    template_engine.process_template(template_lines)
+    analysis = time.perf_counter() - started
+    return traced / 1048576, engine.stats["nodes_created"], build, analysis
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Structure model memory benchmark')
+    parser.add_argument('--paths', type=int, default=500000, help='Flat JSON paths of the generated model')
+    parser.add_argument('--template', default=SAMPLE_TEMPLATE, help='Template analysed against the model')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    flat, parameters = generate_paths(args.paths)
+    with open(args.template, encoding='utf-8') as f:
+        template_lines = f.readlines()
+    compact_class = structure_analysis_engine.StructureNode
+    print(f"{len(flat)} paths, {len(parameters)} parameters, template of {len(template_lines)} lines")
+    print(f"{'nodes':<10}{'count':>10}{'MB':>10}{'B/node':>10}{'build s':>10}{'analysis s':>12}")
+    results = {}
+    try:
+        for name, node_class in (('dict', DictStructureNode), ('slots', compact_class)):
+            results[name] = measure(node_class, flat, parameters, template_lines)
+            size, nodes, build, analysis = results[name]
+            print(f"{name:<10}{nodes:>10}{size:>10.1f}{size * 1048576 / nodes:>10.0f}{build:>10.2f}{analysis:>12.3f}")
+    finally:
+        structure_analysis_engine.StructureNode = compact_class
+    print(f"Slotted nodes keep the model in {100 * results['slots'][0] / results['dict'][0]:.0f}% of the memory")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Throughput and accuracy benchmark of the YAML uncommenters
+Each implementation against the manually fixed gold file, on the sample and scaled copies of it
+"""
+import argparse
+import contextlib
+import difflib
+import io
+import logging
+import multiprocessing
+import os
+import re
+import resource
+import sys
+import tempfile
+import time
+import warnings
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from common.util.yaml_sections import ROOT_KEY, iter_sections
+
+SAMPLE_TEMPLATE = os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values.yaml')
+GOLD_TEMPLATE = os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values_uncommented-by-uncomment-00_fixed-manually.yaml')
+REFERENCE_OUTPUTS = {
+    'uncomment-00': os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values_uncommented-by-uncomment-00.yaml'),
+    'ai-platform (stored)': os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values_uncommented-by-ai-platform.yaml'),
+}
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+# Top-level key at column 0, commented out or not
+_TOP_LEVEL_KEY = re.compile(r'^(#?)([A-Za-z0-9_]+)(:(?:\s|$))')
+# The sample is anonymized, its JWKS block lost the key names the special content patterns look for
+SAMPLE_SPECIAL_STARTS = ['"kbh":"', '"jsp":"', '"yuo":"', "tuoy: '{"]
+
+
+def scaled_rows(rows: List[str], target: int) -> List[str]:
+    """Copies of rows up to at least target rows, top-level keys renamed per copy.
+
+    Input and gold scaled alike stay aligned, so accuracy can be measured
+    at every size.
+    """
+    if rows and rows[-1] == '':
+        rows = rows[:-1]
+    out = list(rows)
+    copy = 1
+    while len(out) < target:
+        out.extend(_TOP_LEVEL_KEY.sub(lambda match: f"{match.group(1)}{match.group(2)}_{copy}{match.group(3)}", row)
+                   for row in rows)
+        copy += 1
+    return out + ['']
+
+
+def line_accuracy(output: List[str], gold: List[str]) -> float:
+    """Share of gold lines the output has in place, matched top-level section by section.
+
+    Sections are paired by their key, rows of sections only one side has
+    count as misses. Matching per section keeps this linear in the size.
+    """
+    def by_key(rows):
+        sections = {}
+        for section in iter_sections(rows):
+            match = ROOT_KEY.match(section[0])
+            sections.setdefault(match.group(1) if match else '', []).extend(section)
+        return sections
+
+    output_sections = by_key(output)
+    matched = 0
+    for key, gold_rows in by_key(gold).items():
+        rows = output_sections.get(key)
+        if rows:
+            matcher = difflib.SequenceMatcher(None, rows, gold_rows, autojunk=False)
+            matched += sum(block.size for block in matcher.get_matching_blocks())
+    return matched / max(len(output), len(gold), 1)
+
+
+def _backend(extra_starts: List[str]) -> Callable[[str, str], str]:
+    def run(input_path: str, output_path: str) -> str:
+        from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+        config = {'verdict_cache': False}
+        if extra_starts:
+            patterns = YAMLProcessingService().config['special_content_patterns']
+            config['special_content_patterns'] = dict(patterns, starts=patterns['starts'] + extra_starts)
+        service = YAMLProcessingService(config)
+        with open(input_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        result = service.process_yaml_content(content, generate_variants=[], template_name=input_path)
+        if not result['success']:
+            raise RuntimeError(result['error'])
+        return result['artifacts']['main']
+    return run
+
+
+def _format_processing(mode: str) -> Callable[[str, str], Optional[str]]:
+    def run(input_path: str, output_path: str) -> Optional[str]:
+        from backend.service_layer.format_processing.yaml import YAMLProcessingService
+        if not YAMLProcessingService().process_yaml_template(input_path, output_path, processing_mode=mode):
+            raise RuntimeError(f"{mode} mode processing failed")
+        return None
+    return run
+
+
+def _tool(input_path: str, output_path: str) -> Optional[str]:
+    from common.tool.yaml_uncommenter import YAMLUncommenter
+    if not YAMLUncommenter().process(input_path, output_path):
+        raise RuntimeError("processing failed")
+    return None
+
+
+# Name -> run(input_path, output_path), returning the output text or None if it is in output_path
+IMPLEMENTATIONS: Dict[str, Callable[[str, str], Optional[str]]] = {
+    'backend': _backend([]),
+    'format-rule': _format_processing('rule'),
+    'format-ai': _format_processing('ai'),
+    'format-hybrid': _format_processing('hybrid'),
+    'tool': _tool,
+}
+# Runs with settings tuned to the sample, reported apart from the default settings runs
+TUNED_IMPLEMENTATIONS: Dict[str, Callable[[str, str], Optional[str]]] = {
+    'backend+starts': _backend(SAMPLE_SPECIAL_STARTS),
+}
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _measure(name: str, input_path: str, output_path: str, connection):
+    """Child process: run one implementation, send back (elapsed, peak RSS, error)."""
+    warnings.simplefilter('ignore')
+    logging.disable(logging.CRITICAL)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            start = time.perf_counter()
+            text = dict(IMPLEMENTATIONS, **TUNED_IMPLEMENTATIONS)[name](input_path, output_path)
+            elapsed = time.perf_counter() - start
+        if text is not None:
+            with open(output_path, 'w', encoding='utf-8', newline='\n') as f:
+                f.write(text)
+        connection.send((elapsed, _peak_rss_mb(), None))
+    except Exception as e:
+        connection.send((None, _peak_rss_mb(), f"{type(e).__name__}: {e}"))
+    finally:
+        connection.close()
+
+
+def run_one(name: str, input_path: str, output_path: str, timeout: float) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+    """(elapsed, peak RSS MB, error) of one run in a fresh interpreter."""
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_measure, args=(name, input_path, output_path, sender))
+    process.start()
+    sender.close()
+    if not receiver.poll(timeout):
+        process.terminate()
+        process.join()
+        return None, None, f"timeout after {timeout:.0f}s"
+    result = receiver.recv()
+    process.join()
+    return result
+
+
+def report(names: List[str], inputs: List[Tuple[str, List[str], List[str], str]], workdir: str, timeout: float):
+    """Print one row per implementation and input, inputs given as (label, rows, gold rows, path)."""
+    print(f"{'implementation':<16}{'rows':>10}{'accuracy':>10}{'seconds':>10}{'rows/s':>11}{'peak RSS MB':>13}")
+    for label, rows, gold, input_path in inputs:
+        for name in names:
+            output_path = os.path.join(workdir, f"{name}_{label}.yaml")
+            elapsed, peak_rss, error = run_one(name, input_path, output_path, timeout)
+            if error is not None:
+                peak = f"{peak_rss:>13.1f}" if peak_rss is not None else f"{'-':>13}"
+                print(f"{name:<16}{len(rows):>10}{'-':>10}{'-':>10}{'-':>11}{peak}  {error}")
+                continue
+            with open(output_path, 'r', encoding='utf-8') as f:
+                accuracy = line_accuracy(f.read().split('\n'), gold)
+            print(f"{name:<16}{len(rows):>10}{100 * accuracy:>9.2f}%{elapsed:>10.2f}"
+                  f"{len(rows) / max(elapsed, 1e-9):>11.0f}{peak_rss:>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='YAML uncommenter throughput and accuracy benchmark')
+    parser.add_argument('--template', default=SAMPLE_TEMPLATE, help='Input template')
+    parser.add_argument('--gold', default=GOLD_TEMPLATE, help='Expected output of the template')
+    parser.add_argument('--sizes', type=int, nargs='*', default=DEFAULT_SIZES,
+                        help='Rows of the scaled templates, the template itself always runs first')
+    parser.add_argument('--implementations', nargs='+', choices=list(IMPLEMENTATIONS), default=list(IMPLEMENTATIONS))
+    parser.add_argument('--tuned', nargs='+', choices=list(TUNED_IMPLEMENTATIONS), default=[],
+                        help='Also run these implementations tuned to the sample, reported separately')
+    parser.add_argument('--timeout', type=float, default=1800, help='Seconds per run before it is given up')
+    parser.add_argument('--keep', help='Directory to keep the scaled templates and outputs in')
+    args = parser.parse_args()
+
+    with open(args.template, 'r', encoding='utf-8') as f:
+        template_rows = f.read().split('\n')
+    with open(args.gold, 'r', encoding='utf-8') as f:
+        gold_rows = f.read().split('\n')
+
+    print(f"Template: {args.template} ({len(template_rows)} rows)")
+    print(f"Gold: {args.gold}")
+    print(f"Unchanged input accuracy: {100 * line_accuracy(template_rows, gold_rows):.2f}%")
+    for name, path in REFERENCE_OUTPUTS.items():
+        with open(path, 'r', encoding='utf-8') as f:
+            print(f"Stored {name} output accuracy: {100 * line_accuracy(f.read().split(chr(10)), gold_rows):.2f}%")
+
+    workdir = args.keep or tempfile.mkdtemp(prefix='uncommenter-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        inputs = [('sample', template_rows, gold_rows, args.template)]
+        for size in args.sizes:
+            rows = scaled_rows(template_rows, size)
+            input_path = os.path.join(workdir, f"template_{size}.yaml")
+            with open(input_path, 'w', encoding='utf-8', newline='\n') as f:
+                f.write('\n'.join(rows))
+            inputs.append((str(size), rows, scaled_rows(gold_rows, size), input_path))
+
+        print("\nDefault settings")
+        report(args.implementations, inputs, workdir, args.timeout)
+        if args.tuned:
+            print(f"\nTuned to the sample: extra special content starts {SAMPLE_SPECIAL_STARTS}")
+            report(args.tuned, inputs, workdir, args.timeout)
+    finally:
+        if not args.keep:
+            for entry in os.listdir(workdir):
+                os.remove(os.path.join(workdir, entry))
+            os.rmdir(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark of YAML validity probes on the sample template
+Per-row probe cost of the ruamel parse alone vs the libyaml fast path
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import warnings
+
+# Add code root to path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(REPO_ROOT, 'code'))
+
+from backend.service_layer.yaml_processing.yaml_processing_service import YAMLProcessingService
+from common.util.yaml_fast_path import LIBYAML_AVAILABLE, probe_yaml_structure
+
+SAMPLE_TEMPLATE = os.path.join(REPO_ROOT, 'data', 'cire-xxxx-values.yaml')
+
+
+def collect_probes(template_path: str):
+    """Texts probed by the uncommenting loop, section by section."""
+    service = YAMLProcessingService({'verdict_cache': False, 'fast_path_validator': False})
+    probes = []
+    validate = service._load_yaml_verdict
+
+    def record(content):
+        probes.append(content)
+        return validate(content)
+
+    service._load_yaml_verdict = record
+
+    with open(template_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    rows = 0
+    for section in content.split('\n\n'):
+        section = service._preprocess_yaml_file2b(service._preprocess_yaml_file2(section))
+        rows += section.count('\n')
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                service._process_yaml_file2(section, template_path)
+        except Exception:
+            pass
+
+    return probes, rows
+
+
+def time_probes(probes, fast_path: bool, repeat: int) -> float:
+    """Best wall time of validating all probes."""
+    service = YAMLProcessingService({'verdict_cache': False, 'fast_path_validator': fast_path})
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in probes:
+            service._load_yaml_verdict(content)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='YAML probe benchmark')
+    parser.add_argument('--template', default=SAMPLE_TEMPLATE, help='Template to probe')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per variant, best is reported')
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    probes, rows = collect_probes(args.template)
+    decided = sum(1 for content in probes if probe_yaml_structure(content) is not None)
+
+    print(f"Template: {args.template}")
+    print(f"libyaml available: {LIBYAML_AVAILABLE}")
+    print(f"Rows: {rows}, probes: {len(probes)}, answered by fast path: {decided} "
+          f"({100.0 * decided / max(len(probes), 1):.1f}%)")
+
+    results = {}
+    for name, fast_path in (('ruamel only', False), ('fast path', True)):
+        elapsed = time_probes(probes, fast_path, args.repeat)
+        results[name] = elapsed
+        print(f"{name:12s} total {elapsed:8.3f}s  per probe {1e6 * elapsed / max(len(probes), 1):8.1f}us  "
+              f"per row {1e6 * elapsed / max(rows, 1):8.1f}us")
+
+    if results['fast path']:
+        print(f"Speedup: {results['ruamel only'] / results['fast path']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()